@@ -1,32 +1,113 @@
+import logging
+import os
 from flask import Flask
-from flasgger import Swagger
-from app.config import swagger_config, swagger_template
+from app.config import env_flag, swagger_config, swagger_template, PREBUILT_APISPEC_PATH, RATES_STREAM_URL
 from app.extensions import limiter
+from app import assets, logs, metrics, profiling, tracing
 
+logger = logging.getLogger(__name__)
 
-def create_app():
+
+def create_app(config=None):
     """
     Application factory pattern
-    """
-    app = Flask(__name__)
 
-    # Initialize extensions
-    limiter.init_app(app)
+    Args:
+        config (dict): Optional Flask config overrides, applied before
+                       extensions are initialized (e.g. RATELIMIT_ENABLED, or
+                       RATES_STREAM_URL to redirect /rates/stream to the stream service)
+    """
+    app = _create_base_app(config, RATES_STREAM_URL=RATES_STREAM_URL)
+    profiling.init_app(app)
+    assets.init_app(app)
 
     # Initialize Swagger
-    Swagger(app, config=swagger_config, template=swagger_template)
+    _init_docs(app)
 
     # Register blueprints
     from app.routes.rates import rates_bp
+    from app.routes.stream import stream_bp
     from app.routes.p2p import p2p_bp
+    from app.routes.spread import spread_bp
     from app.routes.home import home_bp
     from app.routes.calculator import calculator_bp
     from app.routes.health import health_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.webhooks import webhooks_bp
+    from app.routes.debug import debug_bp
+    from app.routes.api_keys import api_keys_bp
 
     app.register_blueprint(rates_bp)
+    app.register_blueprint(stream_bp)
     app.register_blueprint(p2p_bp)
+    app.register_blueprint(spread_bp)
     app.register_blueprint(home_bp)
     app.register_blueprint(calculator_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(webhooks_bp)
+    app.register_blueprint(debug_bp)
+    app.register_blueprint(api_keys_bp)
+
+    if app.config.get('WARM_START', True):
+        from app.services.warm_start import restore_caches
+        restore_caches()
 
     return app
+
+
+def create_stream_app(config=None):
+    """
+    Application for the stream service (stream_api.py): only /rates/stream
+    and the health checks, run on an evented worker so each open stream is a
+    greenlet instead of a gthread thread
+
+    Args:
+        config (dict): Optional Flask config overrides, as for create_app
+    """
+    app = _create_base_app(config)
+
+    from app.routes.stream import stream_bp
+    from app.routes.health import health_bp
+
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(health_bp)
+
+    if app.config.get('WARM_START', True):
+        from app.services.warm_start import restore_caches
+        restore_caches()
+
+    return app
+
+
+def _create_base_app(config, **defaults):
+    """Create the Flask app with the extensions every entry point needs"""
+    app = Flask(__name__)
+    app.config.update(defaults)
+    if config:
+        app.config.update(config)
+
+    # Initialize extensions (logging first, so every request gets its id before
+    # anything logs; metrics next, so limiter rejections are timed too; then
+    # tracing, so the limiter's checks run inside the request's trace)
+    logs.init_app(app)
+    metrics.init_app(app)
+    tracing.init_app(app, limiter)
+    limiter.init_app(app)
+    return app
+
+
+def _init_docs(app):
+    """
+    Serve the OpenAPI spec and docs UI. In fast-start mode the prebuilt
+    apispec.json is served as-is, so flasgger is never imported at boot.
+    """
+    if env_flag('FAST_START'):
+        if os.path.exists(PREBUILT_APISPEC_PATH):
+            from app.routes.docs import docs_bp
+            app.register_blueprint(docs_bp)
+            return
+        logger.warning("FAST_START is set but %s is missing; building the spec at runtime", PREBUILT_APISPEC_PATH)
+
+    from flasgger import Swagger
+    Swagger(app, config=swagger_config, template=swagger_template)
@@ -0,0 +1,101 @@
+"""
+Calculator static assets
+
+build_assets.py bundles and minifies the calculator's ES modules and
+stylesheet into content-hashed files under app/dist/ and writes a manifest
+mapping source names (e.g. 'js/main.js') to them. init_app resolves the
+manifest once at startup, so templates build asset URLs without touching
+the filesystem. Fingerprinted files are served from /assets/ as immutable
+(see routes/calculator.py).
+
+Without a manifest (local development) the unbundled files under static/
+are served as-is, with a modulepreload hint for every module so the import
+waterfall is still fetched in parallel.
+"""
+import glob
+import hashlib
+import json
+import os
+from flask import url_for
+from app.config import ASSET_MANIFEST_PATH
+
+# Source files that make up the calculator, relative to the static folder
+SOURCE_PATTERNS = ('css/*.css', 'js/*.js')
+
+_assets = {}  # source name -> fingerprinted file name in app/dist/, or None to serve the source
+_preload = []  # source names of the modules to emit modulepreload hints for
+_version = None
+
+
+def _load_manifest():
+    with open(ASSET_MANIFEST_PATH, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return manifest['assets'], manifest['preload'], manifest['version']
+
+
+def _scan_sources(static_folder):
+    """Development fallback: every source file as-is, versioned by a hash of their contents"""
+    names = sorted(
+        os.path.relpath(path, static_folder).replace(os.sep, '/')
+        for pattern in SOURCE_PATTERNS
+        for path in glob.glob(os.path.join(static_folder, pattern))
+    )
+
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            digest.update(name.encode())
+            digest.update(f.read())
+
+    return dict.fromkeys(names), [name for name in names if name.endswith('.js')], digest.hexdigest()[:12]
+
+
+def init_app(app):
+    """Resolve the asset manifest and make asset_url/modulepreload_urls available to templates"""
+    global _assets, _preload, _version
+
+    if os.path.exists(ASSET_MANIFEST_PATH):
+        _assets, _preload, _version = _load_manifest()
+    else:
+        _assets, _preload, _version = _scan_sources(app.static_folder)
+
+    app.add_template_global(asset_url)
+    app.add_template_global(modulepreload_urls)
+
+
+def asset_url(name):
+    """
+    Args:
+        name (str): Source name relative to the static folder, e.g. 'js/main.js'
+
+    Returns:
+        str: URL of the fingerprinted bundle if one was built, else of the source file
+    """
+    built = _assets.get(name)
+    if built:
+        return url_for('calculator.asset', filename=built)
+    return url_for('static', filename=name)
+
+
+def modulepreload_urls():
+    """
+    Returns:
+        list: URLs of the JavaScript modules the calculator page loads
+    """
+    return [asset_url(name) for name in _preload]
+
+
+def shell_urls():
+    """
+    Returns:
+        list: URLs of every calculator asset, for the service worker to precache
+    """
+    return sorted({asset_url(name) for name in _assets})
+
+
+def version():
+    """
+    Returns:
+        str: Changes whenever any asset changes
+    """
+    return _version
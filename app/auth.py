@@ -1,25 +1,152 @@
 """
-API key authentication decorator
+API key authentication decorators, and the rate limiter's per-key identity
 """
+import hmac
+import inspect
 import os
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
+from flask_limiter.util import get_remote_address
+from app.config import API_KEY_DEFAULT_QUOTA
+from app.profiling import admin_key_matches
+from app.services import api_keys
+from app.tracing import traced
+
+
+def current_api_key():
+    """
+    Returns:
+        dict: The API key the current request was sent with, or None if it
+              has none or it isn't valid (looked up once per request)
+    """
+    if '_api_key' not in g:
+        g._api_key = api_keys.lookup(request.headers.get("X-API-Key"))
+    return g._api_key
+
+
+def _issued_api_key():
+    """
+    Returns:
+        dict: The current API key if it was issued through /api-keys, else None.
+              The built-in API_KEY is shipped to every calculator visitor, so
+              it identifies nobody.
+    """
+    api_key = current_api_key()
+    if api_key and api_key['id'] != api_keys.DEFAULT_KEY_ID:
+        return api_key
+    return None
+
+
+def rate_limit_key():
+    """Rate limit requests per issued API key, or per address for any other request"""
+    api_key = _issued_api_key()
+    return f"key:{api_key['id']}" if api_key else get_remote_address()
+
+
+def api_key_quota():
+    """The current API key's quota, applied across every route"""
+    api_key = _issued_api_key()
+    return (api_key and api_key['quota']) or API_KEY_DEFAULT_QUOTA
+
+
+def without_issued_api_key():
+    return _issued_api_key() is None
+
+
+@traced('auth.api_key')
+def _check_api_key():
+    """Returns an error response if the request isn't authorized, else None"""
+    if current_api_key() is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unauthorized'
+        }), 401
+
+    return None
 
 
 def require_api_key(f):
+    # Async views must stay coroutine functions so Flask runs them in an event loop
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            error = _check_api_key()
+            if error:
+                return error
+            return await f(*args, **kwargs)
+        return decorated_async
+
     @wraps(f)
     def decorated(*args, **kwargs):
-        api_key = os.environ.get("API_KEY")
+        error = _check_api_key()
+        if error:
+            return error
+        return f(*args, **kwargs)
+    return decorated
+
 
-        if not api_key:
+def require_issued_api_key(f):
+    """
+    Restrict a (sync) view to keys issued through /api-keys. The built-in
+    API_KEY is public, so it can't own anything.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = _check_api_key()
+        if error:
+            return error
+
+        if _issued_api_key() is None:
             return jsonify({
                 'success': False,
-                'error': 'API key not configured on server'
+                'error': 'This endpoint needs an API key issued through /api-keys'
+            }), 403
+
+        return f(*args, **kwargs)
+    return decorated
+
+
+def _metrics_token_matches(header):
+    token = os.environ.get("METRICS_TOKEN")
+    scheme, _, client_token = (header or '').partition(' ')
+    return bool(token and scheme.lower() == 'bearer' and hmac.compare_digest(client_token.encode(), token.encode()))
+
+
+def require_metrics_token(f):
+    """
+    Restrict a (sync) view to Prometheus scrapes sending Authorization: Bearer
+    METRICS_TOKEN, or to requests carrying X-Admin-Key matching ADMIN_API_KEY
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not os.environ.get("METRICS_TOKEN") and not os.environ.get("ADMIN_API_KEY"):
+            return jsonify({
+                'success': False,
+                'error': 'Metrics token not configured on server'
             }), 500
 
-        client_key = request.headers.get("X-API-Key")
+        if not (_metrics_token_matches(request.headers.get("Authorization"))
+                or admin_key_matches(request.headers.get("X-Admin-Key"))):
+            return jsonify({
+                'success': False,
+                'error': 'Unauthorized'
+            }), 401
+
+        return f(*args, **kwargs)
+    return decorated
+
+
+def require_admin_key(f):
+    """Restrict a (sync) view to requests carrying X-Admin-Key matching ADMIN_API_KEY"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not os.environ.get("ADMIN_API_KEY"):
+            return jsonify({
+                'success': False,
+                'error': 'Admin API key not configured on server'
+            }), 500
 
-        if not client_key or client_key != api_key:
+        if not admin_key_matches(request.headers.get("X-Admin-Key")):
             return jsonify({
                 'success': False,
                 'error': 'Unauthorized'
@@ -0,0 +1,182 @@
+"""
+Concurrency limits and load shedding for routes that wait on an upstream
+
+Rate limits count requests per client over time; they don't stop a burst
+from many clients parking every gunicorn thread on slow BCV or Binance
+calls. Each upstream-bound route group gets a fixed number of slots and a
+short bounded queue. A request that finds the queue full, or waits longer
+than CONCURRENCY_QUEUE_TIMEOUT for a slot, is shed: it gets the group's
+stale cached value without contacting the upstream (X-Load-Shed: stale), or
+503 with Retry-After if there is nothing cached yet.
+"""
+import asyncio
+import contextvars
+import inspect
+import threading
+from functools import wraps
+from flask import jsonify, make_response
+from app.config import CONCURRENCY_QUEUE_TIMEOUT, LOAD_SHED_RETRY_AFTER
+from app.metrics import LOAD_SHED, register_collector
+
+# True while a shed request runs its view: the scrapers then answer from
+# their cache without contacting the upstream (see serving_stale)
+_serving_stale = contextvars.ContextVar('serving_stale', default=False)
+
+
+def serving_stale():
+    """
+    Returns:
+        bool: True if the current request was shed and must not wait on an upstream
+    """
+    return _serving_stale.get()
+
+
+class ConcurrencyLimit:
+    def __init__(self, name, max_active, max_queued, queue_timeout=CONCURRENCY_QUEUE_TIMEOUT):
+        """
+        Args:
+            name (str): Route group, used in metrics
+            max_active (int): Requests of the group allowed to run at once
+            max_queued (int): Further requests allowed to wait for a slot
+            queue_timeout (float): Longest a queued request waits for a slot, in seconds
+        """
+        self.name = name
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_active)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+
+    def try_acquire(self):
+        """Take a free slot without waiting"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._active += 1
+        return True
+
+    def enqueue(self):
+        """Reserve a place in the queue, False if it is full"""
+        with self._lock:
+            if self._queued >= self.max_queued:
+                return False
+            self._queued += 1
+            return True
+
+    def wait(self):
+        """Wait for a slot after enqueue(), False if none freed up in time"""
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._queued -= 1
+        if acquired:
+            with self._lock:
+                self._active += 1
+        return acquired
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def snapshot(self):
+        with self._lock:
+            return {'active': self._active, 'queued': self._queued,
+                    'max_active': self.max_active, 'max_queued': self.max_queued}
+
+
+_limits = {}
+_registry_lock = threading.Lock()
+
+
+def get_limit(name, **kwargs):
+    """Get the concurrency limit for a route group, creating it with kwargs on first use"""
+    with _registry_lock:
+        if name not in _limits:
+            _limits[name] = ConcurrencyLimit(name, **kwargs)
+        return _limits[name]
+
+
+@register_collector
+def _collect_concurrency_metrics():
+    with _registry_lock:
+        snapshots = {name: limit.snapshot() for name, limit in _limits.items()}
+    lines = []
+    for metric, key, help_text in (
+        ('concurrency_active_requests', 'active', 'Requests holding a concurrency slot, by route group'),
+        ('concurrency_queued_requests', 'queued', 'Requests waiting for a concurrency slot, by route group')
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} gauge')
+        for name, snapshot in sorted(snapshots.items()):
+            lines.append(f'{metric}{{group="{name}"}} {snapshot[key]}')
+    return lines
+
+
+def _overloaded():
+    return jsonify({
+        'success': False,
+        'error': 'Server busy, retry later'
+    }), 503, {'Retry-After': str(LOAD_SHED_RETRY_AFTER)}
+
+
+def _mark_stale(response):
+    response = make_response(response)
+    response.headers['X-Load-Shed'] = 'stale'
+    return response
+
+
+def limit_concurrency(limit, has_stale):
+    """
+    Run the view in one of the limit's slots, shedding the request when none
+    is free in time.
+
+    Args:
+        limit (ConcurrencyLimit): The route group's limit
+        has_stale (callable): Returns True if a cached value exists to serve a shed request
+    """
+    def decorator(f):
+        # Async views must stay coroutine functions so Flask runs them in an event loop
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def limited_async(*args, **kwargs):
+                # Waiting blocks, so it happens off the event loop
+                if limit.try_acquire() or (limit.enqueue() and await asyncio.to_thread(limit.wait)):
+                    try:
+                        return await f(*args, **kwargs)
+                    finally:
+                        limit.release()
+
+                if not has_stale():
+                    LOAD_SHED.inc(group=limit.name, outcome='rejected')
+                    return _overloaded()
+                LOAD_SHED.inc(group=limit.name, outcome='stale')
+                token = _serving_stale.set(True)
+                try:
+                    return _mark_stale(await f(*args, **kwargs))
+                finally:
+                    _serving_stale.reset(token)
+            return limited_async
+
+        @wraps(f)
+        def limited(*args, **kwargs):
+            if limit.try_acquire() or (limit.enqueue() and limit.wait()):
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    limit.release()
+
+            if not has_stale():
+                LOAD_SHED.inc(group=limit.name, outcome='rejected')
+                return _overloaded()
+            LOAD_SHED.inc(group=limit.name, outcome='stale')
+            token = _serving_stale.set(True)
+            try:
+                return _mark_stale(f(*args, **kwargs))
+            finally:
+                _serving_stale.reset(token)
+        return limited
+    return decorator
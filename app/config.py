@@ -1,12 +1,60 @@
 """
 Configuration for Swagger/OpenAPI documentation and rate limiting
 """
+import os
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def env_flag(name, default=False):
+    """
+    Read a boolean environment variable: 1, true, yes or on (any case) is
+    True, anything else set (0, false, no, off, "") is False
+
+    Returns:
+        bool: The flag, or default if the variable isn't set
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in _TRUE_VALUES
+
 
 # Rate limits per endpoint group
 RATE_LIMIT_SCRAPE = "30 per minute"    # endpoints that hit BCV website
 RATE_LIMIT_P2P = "20 per minute"       # endpoints that hit Binance P2P
 RATE_LIMIT_HISTORY = "60 per minute"   # endpoints that read local history file
 RATE_LIMIT_HEALTH = "120 per minute"   # health/home endpoints
+RATE_LIMIT_STREAM = "10 per minute"    # opening /rates/stream connections
+RATE_LIMIT_WEBHOOKS = "20 per minute"  # webhook subscription management
+RATE_LIMIT_DEBUG = "30 per minute"     # stored request profiles
+RATE_LIMIT_ADMIN = "30 per minute"     # API key management
+
+# Quota across all routes for API keys created without one of their own
+API_KEY_DEFAULT_QUOTA = os.environ.get('API_KEY_DEFAULT_QUOTA', "10000 per day")
+
+# Requests per upstream-bound route group allowed to run at once, and to
+# queue for a slot; the rest are shed (see app/concurrency.py)
+CONCURRENCY_LIMIT_SCRAPE = int(os.environ.get('CONCURRENCY_LIMIT_SCRAPE', 8))
+CONCURRENCY_QUEUE_SCRAPE = int(os.environ.get('CONCURRENCY_QUEUE_SCRAPE', 16))
+CONCURRENCY_LIMIT_P2P = int(os.environ.get('CONCURRENCY_LIMIT_P2P', 4))
+CONCURRENCY_QUEUE_P2P = int(os.environ.get('CONCURRENCY_QUEUE_P2P', 8))
+CONCURRENCY_QUEUE_TIMEOUT = float(os.environ.get('CONCURRENCY_QUEUE_TIMEOUT', 3.0))  # seconds
+LOAD_SHED_RETRY_AFTER = 5  # seconds, sent with 503s when there is nothing cached to serve
+
+# Base URL of the stream service (stream_api.py in render.yaml). When set,
+# the gthread app answers /rates/stream with a redirect there instead of
+# holding one of its threads for every open stream
+RATES_STREAM_URL = os.environ.get('RATES_STREAM_URL')
+
+# Prebuilt OpenAPI spec served in fast-start mode (FAST_START=1) instead of
+# importing flasgger and building it from route docstrings; see build_apispec.py
+PREBUILT_APISPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'apispec.json')
+
+# Bundled, minified and content-hashed calculator assets written by
+# build_assets.py, and the manifest mapping source names to them
+ASSET_DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist')
+ASSET_MANIFEST_PATH = os.path.join(ASSET_DIST_DIR, 'manifest.json')
 
 swagger_config = {
     "headers": [],
@@ -39,6 +87,11 @@ swagger_template = {
             "type": "apiKey",
             "in": "header",
             "name": "X-API-Key"
+        },
+        "AdminKeyAuth": {
+            "type": "apiKey",
+            "in": "header",
+            "name": "X-Admin-Key"
         }
     },
     "tags": [
@@ -50,9 +103,44 @@ swagger_template = {
             "name": "P2P Prices",
             "description": "Binance P2P cryptocurrency prices"
         },
+        {
+            "name": "Spread",
+            "description": "Gap between the BCV official USD rate and the Binance P2P USDT rate"
+        },
+        {
+            "name": "Webhooks",
+            "description": "Subscriptions notified when BCV publishes a new rate"
+        },
         {
             "name": "General",
             "description": "General API information"
+        },
+        {
+            "name": "API Keys",
+            "description": "API keys and their rate limit quotas (admin key required)"
+        },
+        {
+            "name": "Debug",
+            "description": "Request profiles (admin key required)"
+        }
+    ],
+    # Shared responses, referenced from route docstrings with $ref: "#/responses/<name>"
+    "responses": {
+        "ServerBusy": {
+            "description": "Too many concurrent requests and nothing cached to serve (stale values are served instead when available, with X-Load-Shed: stale)",
+            "headers": {
+                "Retry-After": {
+                    "type": "integer",
+                    "description": "Seconds to wait before retrying"
+                }
+            },
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean", "example": False},
+                    "error": {"type": "string", "example": "Server busy, retry later"}
+                }
+            }
         }
-    ]
+    }
 }
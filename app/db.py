@@ -1,11 +1,111 @@
 """
 MongoDB Atlas connection (shared client)
+
+Pool sizing and timeouts come from the environment:
+    MONGODB_MIN_POOL_SIZE                (default 1)
+    MONGODB_MAX_POOL_SIZE                (default 10)
+    MONGODB_MAX_IDLE_TIME_MS             (default 300000)
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS  (default 5000)
 """
+import logging
 import os
-from pymongo import MongoClient
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 _client = None
 _db = None
+_lock = threading.Lock()
+
+
+class _PoolStats:
+    """Connection pool counters fed by a pymongo ConnectionPoolListener"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.max_size = None
+        self.open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'max_pool_size': self.max_size,
+                'open_connections': self.open,
+                'checked_out': self.checked_out,
+                'total_checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures
+            }
+
+
+pool_stats = _PoolStats()
+
+
+def _pool_listener():
+    from pymongo import monitoring
+
+    class PoolListener(monitoring.ConnectionPoolListener):
+        def pool_created(self, event):
+            pass
+
+        def pool_ready(self, event):
+            pass
+
+        def pool_cleared(self, event):
+            pass
+
+        def pool_closed(self, event):
+            pass
+
+        def connection_created(self, event):
+            pool_stats.add(open=1)
+
+        def connection_ready(self, event):
+            pass
+
+        def connection_closed(self, event):
+            pool_stats.add(open=-1)
+
+        def connection_check_out_started(self, event):
+            pass
+
+        def connection_check_out_failed(self, event):
+            pool_stats.add(checkout_failures=1)
+
+        def connection_checked_out(self, event):
+            pool_stats.add(checked_out=1, checkouts=1)
+
+        def connection_checked_in(self, event):
+            pool_stats.add(checked_out=-1)
+
+    return PoolListener()
+
+
+def _client_options():
+    return {
+        'minPoolSize': int(os.environ.get('MONGODB_MIN_POOL_SIZE', 1)),
+        'maxPoolSize': int(os.environ.get('MONGODB_MAX_POOL_SIZE', 10)),
+        'maxIdleTimeMS': int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', 5 * 60 * 1000)),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'event_listeners': [_pool_listener()]
+    }
+
+
+def is_configured():
+    """
+    Returns:
+        bool: True if MongoDB is available (MONGODB_URI is set or a handle was
+              injected), False for deployments without it, e.g. SQLite history
+    """
+    return _db is not None or bool(os.environ.get("MONGODB_URI"))
 
 
 def get_db():
@@ -13,13 +113,90 @@ def get_db():
     global _client, _db
 
     if _db is None:
-        uri = os.environ.get("MONGODB_URI")
-        if not uri:
-            raise RuntimeError("MONGODB_URI environment variable is not set")
+        with _lock:
+            if _db is None:
+                uri = os.environ.get("MONGODB_URI")
+                if not uri:
+                    raise RuntimeError("MONGODB_URI environment variable is not set")
+
+                # Deferred import: pymongo is only loaded once history is first needed
+                from pymongo import MongoClient
 
-        db_name = os.environ.get("MONGODB_DB_NAME", "bcv_scrape")
-        _client = MongoClient(uri)
-        _db = _client[db_name]
-        _db["rates_history"].create_index("date", unique=True)
+                db_name = os.environ.get("MONGODB_DB_NAME", "bcv_scrape")
+                options = _client_options()
+                pool_stats.max_size = options['maxPoolSize']
+                _client = MongoClient(uri, **options)
+                db = _client[db_name]
+                ensure_indexes(db)
+                _db = db
 
     return _db
+
+
+def ensure_indexes(db):
+    """Create the collections and indexes the services rely on (idempotent)"""
+    db["rates_history"].create_index("date", unique=True)
+    db["rates_history"].create_index("day")
+    _ensure_p2p_history(db)
+    db["spread_history"].create_index("timestamp")
+    db["webhook_subscriptions"].create_index("id", unique=True)
+    db["webhook_subscriptions"].create_index("owner")
+    db["api_keys"].create_index("key_hash", unique=True)
+    db["api_keys"].create_index("id", unique=True)
+
+
+def _ensure_p2p_history(db):
+    """
+    Create p2p_history as a time-series collection where the server supports
+    it (MongoDB 5.0+), otherwise as a plain collection with a compound index
+    """
+    from pymongo import ASCENDING
+    from pymongo.errors import CollectionInvalid, OperationFailure
+
+    try:
+        db.create_collection("p2p_history", timeseries={
+            "timeField": "timestamp",
+            "metaField": "meta",
+            "granularity": "minutes"
+        })
+    except CollectionInvalid:
+        pass  # Already exists
+    except OperationFailure:
+        pass  # Time-series collections not supported; fall back to the index below
+
+    options = db["p2p_history"].options()
+    if "timeseries" not in options:
+        db["p2p_history"].create_index([
+            ("meta.asset", ASCENDING),
+            ("meta.fiat", ASCENDING),
+            ("timestamp", ASCENDING)
+        ])
+
+
+def ping():
+    """
+    Round-trip a ping command to the server
+
+    Returns:
+        float: Latency in milliseconds
+    """
+    db = get_db()
+    started = time.perf_counter()
+    db.command('ping')
+    return (time.perf_counter() - started) * 1000
+
+
+def warm_up():
+    """
+    Connect, ensure indexes and open the minimum pool so the first history
+    request doesn't pay for DNS, TLS and server selection. No-op when
+    MONGODB_URI is not set.
+    """
+    if not os.environ.get("MONGODB_URI"):
+        return
+
+    try:
+        latency = ping()
+        logger.info("MongoDB warm-up complete (ping %.1f ms)", latency)
+    except Exception as e:
+        logger.warning("MongoDB warm-up failed: %s", e)
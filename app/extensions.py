@@ -1,11 +1,18 @@
 """
 Shared Flask extensions — initialized here, bound to the app in create_app()
 """
+import os
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from app.auth import api_key_quota, rate_limit_key, without_issued_api_key
 
+# Limits are counted per issued API key (per address for other requests).
+# Set RATELIMIT_STORAGE_URI (e.g. redis://...) to share the counters between
+# workers; if that storage goes down, limits are counted in memory meanwhile.
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     default_limits=["200 per day", "60 per hour"],
-    storage_uri="memory://",
+    application_limits=[api_key_quota],
+    application_limits_exempt_when=without_issued_api_key,
+    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", "memory://"),
+    in_memory_fallback_enabled=True,
 )
@@ -0,0 +1,188 @@
+"""
+Structured JSON logging that never blocks a request on stdout
+
+Loggers under "app" (every module logs to logging.getLogger(__name__)) hand
+their records to a bounded in-memory queue; a background QueueListener
+thread formats them as one JSON object per line and writes them to stdout.
+If the queue is full, records are dropped and counted rather than waiting.
+
+Each record carries the request id of the request that logged it (the
+client's X-Request-ID if valid, else a generated one, echoed back in the
+response), and every request is logged on "app.access" with its status and
+duration. Fields passed with extra= become JSON fields.
+
+High-volume messages can be sampled by logging them with
+extra={'sample_rate': 0.01}: only that share is kept, and the rate is
+included so counts can be scaled back up.
+
+Levels: LOG_LEVEL (default INFO) for all of "app", and LOG_LEVELS for
+per-module overrides, e.g. "app.services.binance_p2p=DEBUG,app.access=WARNING".
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import g, request
+from app.metrics import register_collector
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+_REQUEST_ID_RE = re.compile(r'^[\w.-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+_traceback_formatter = logging.Formatter()
+_access_logger = logging.getLogger('app.access')
+logger = logging.getLogger(__name__)
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        return json.dumps(entry, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    """Drop unsampled records and tag the rest with the current request id"""
+
+    def filter(self, record):
+        sample_rate = getattr(record, 'sample_rate', None)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of waiting when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args and render the traceback here, while they are still
+        # valid; JSON formatting is left to the listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exception = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = record.exc_text = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_levels(spec):
+    """
+    Returns:
+        dict: logger name -> level name, from "name=LEVEL,name=LEVEL"
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        if not level or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            logger.warning("Ignoring invalid LOG_LEVELS entry: %s", item)
+            continue
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure():
+    """Route the "app" loggers through the queue to the JSON listener (idempotent)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = _NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(_ContextFilter())
+
+    app_logger = logging.getLogger('app')
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(_queue_handler)
+    app_logger.propagate = False
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+@register_collector
+def _collect_log_metrics():
+    return [
+        '# HELP log_records_dropped_total Log records dropped because the log queue was full',
+        '# TYPE log_records_dropped_total counter',
+        f'log_records_dropped_total {_queue_handler.dropped if _queue_handler else 0}'
+    ]
+
+
+def init_app(app):
+    """Assign every request an id and log it with its status and duration"""
+    configure()
+
+    @app.before_request
+    def _start_request_log():
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        g._request_id_token = _request_id.set(request_id)
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = _request_id.get()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+
+        started = g.get('_request_started')
+        if started is not None:
+            _access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+            })
+        return response
+
+    @app.teardown_request
+    def _end_request_log(exc):
+        token = g.pop('_request_id_token', None)
+        if token is not None:
+            _request_id.reset(token)
@@ -0,0 +1,209 @@
+"""
+Minimal in-process Prometheus metrics (counters and histograms) and the
+request-latency hooks that feed them.
+
+The app runs as a single gunicorn worker, so every thread shares one
+registry and /metrics reports the whole process.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator
+from flask import g, request
+
+# Seconds; covers fast cache hits through slow upstream scrapes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def _recreate_cm(self):
+        # Used as a decorator, each call gets its own timer, so concurrent
+        # calls don't share a start time
+        return _Timer(self._histogram, self._labels)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, **labels):
+        """Context manager / decorator observing the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    le = ('le', _format_value(bound))
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", "+Inf"))} {state[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(float(state[-2]))}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}')
+        return lines
+
+
+def register_collector(collect):
+    """
+    Register a callable returning exposition lines computed at scrape time,
+    for values that live elsewhere (e.g. circuit breaker state)
+    """
+    _collectors.append(collect)
+    return collect
+
+
+def render_latest():
+    """
+    Returns:
+        str: All metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route',
+    ('method', 'endpoint', 'status')
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    'rate_limit_rejections_total', 'Requests rejected by the rate limiter',
+    ('endpoint',)
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'TTLCache lookups by result (hit, miss or stale)',
+    ('cache', 'result')
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', 'Upstream HTTP call latency by outcome',
+    ('upstream', 'outcome')
+)
+UPSTREAM_REJECTIONS = Counter(
+    'upstream_requests_short_circuited_total', 'Upstream calls skipped because the circuit breaker was open',
+    ('upstream',)
+)
+BCV_SCRAPES = Counter(
+    'bcv_scrapes_total', 'BCV scrape attempts by outcome (complete, incomplete or error)',
+    ('outcome',)
+)
+BINANCE_PAGES_PER_CRAWL = Histogram(
+    'binance_p2p_pages_per_crawl', 'Binance P2P search pages fetched per price computation',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+LOAD_SHED = Counter(
+    'load_shed_requests_total', 'Requests shed by a route group concurrency limit, by outcome (stale or rejected)',
+    ('group', 'outcome')
+)
+HISTORY_LATENCY = Histogram(
+    'history_store_operation_duration_seconds', 'Rate history operation latency by storage backend',
+    ('backend', 'operation')
+)
+WEBHOOK_DELIVERIES = Counter(
+    'webhook_deliveries_total', 'Webhook delivery attempts by outcome (delivered, retry, failed or blocked)',
+    ('outcome',)
+)
+WEBHOOK_LATENCY = Histogram(
+    'webhook_delivery_duration_seconds', 'Webhook delivery attempt latency'
+)
+
+
+def init_app(app):
+    """
+    Register request-latency hooks. Call before limiter.init_app so requests
+    rejected by the limiter are timed as well.
+    """
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        endpoint = request.endpoint or 'unmatched'
+
+        if started is not None:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                method=request.method, endpoint=endpoint, status=response.status_code
+            )
+        if response.status_code == 429:
+            RATE_LIMIT_REJECTIONS.inc(endpoint=endpoint)
+
+        return response
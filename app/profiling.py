@@ -0,0 +1,254 @@
+"""
+Opt-in request profiling and per-phase timings (Server-Timing)
+
+Phase timings: the scrapers wrap each step (upstream fetch, parse, JSON
+decode, history write, ...) in phase(). Durations are collected per
+request and returned in a Server-Timing header, summed per phase (Binance
+pages are fetched concurrently, so their phases can add up to more than the
+wall time). Outside a request phase() does nothing.
+
+Profiling: a request is run under cProfile when it carries
+X-Profile: 1 and a valid X-Admin-Key (ADMIN_API_KEY), or when it is
+picked by PROFILE_SAMPLE_RATE (0-1, default 0). The stats are written to
+PROFILE_DIR (default .profiles/, newest PROFILE_KEEP kept) and the response
+carries X-Profile-Id, to fetch them from /debug/profiles/<id>. Only one
+request is profiled at a time; others arriving meanwhile run unprofiled.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.profiles')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', _DEFAULT_PROFILE_DIR)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+
+_PROFILE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+# {phase name: [total seconds, count]} for the current request, None outside requests.
+# The dict is shared by reference, so async views and their tasks (which run
+# on copies of the request's context) add to the same one.
+_phases = contextvars.ContextVar('phases', default=None)
+
+# Profiling slows a request down a lot; never profile more than one at a time
+_profile_lock = threading.Lock()
+
+# From Python 3.12 cProfile is built on sys.monitoring, which is process-wide:
+# one profiler sees every thread, and only one can be enabled at a time
+_PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+@contextmanager
+def phase(name):
+    """Time a step of the current request for the Server-Timing header"""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        total = phases.setdefault(name, [0.0, 0])
+        total[0] += elapsed
+        total[1] += 1
+
+
+def server_timing(phases):
+    """
+    Returns:
+        str: Server-Timing header value, durations in milliseconds
+    """
+    return ', '.join(
+        f'{name};dur={seconds * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else '')
+        for name, (seconds, count) in phases.items()
+    )
+
+
+def admin_key_matches(client_key):
+    admin_key = os.environ.get('ADMIN_API_KEY')
+    return bool(admin_key and client_key and hmac.compare_digest(client_key, admin_key))
+
+
+def _should_profile():
+    if request.headers.get('X-Profile') == '1' and admin_key_matches(request.headers.get('X-Admin-Key')):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _prune_profiles():
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else profiles:
+        os.remove(entry.path)
+        summary = entry.path[:-len('.prof')] + '.txt'
+        if os.path.exists(summary):
+            os.remove(summary)
+
+
+def _save_profile(stats, endpoint, elapsed):
+    profile_id = uuid.uuid4().hex
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats.dump_stats(os.path.join(PROFILE_DIR, f'{profile_id}.prof'))
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.txt'), 'w', encoding='utf-8') as f:
+        f.write(f'{datetime.now(timezone.utc).isoformat()} {request.method} {request.full_path.rstrip("?")} '
+                f'{endpoint} {elapsed * 1000:.1f}ms\n')
+    _prune_profiles()
+    return profile_id
+
+
+def _start_profile():
+    if not _should_profile() or not _profile_lock.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiling tool (e.g. a debugger or coverage) is active
+        _profile_lock.release()
+        logger.warning("Not profiling request: %s", e)
+        return
+    g._profile = {'profilers': [profiler], 'started': time.perf_counter()}
+
+
+def _finish_profile():
+    """
+    Returns:
+        str: Id of the saved profile, or None if the request wasn't profiled
+    """
+    profile = g.pop('_profile', None)
+    if profile is None:
+        return None
+
+    profile['profilers'][0].disable()
+    _profile_lock.release()
+
+    stats = pstats.Stats(*profile['profilers'])
+    try:
+        return _save_profile(stats, request.endpoint, time.perf_counter() - profile['started'])
+    except OSError as e:
+        logger.error("Error saving profile: %s", e)
+        return None
+
+
+def _profiling_ensure_sync(ensure_sync):
+    """
+    Wrap Flask's ensure_sync so coroutines (async views) are profiled too.
+    Flask runs them on a separate event loop thread, which before Python
+    3.12 the profiler enabled for the request's own thread doesn't see, so
+    they get their own profiler whose stats are merged into the request's
+    profile. From 3.12 the request's profiler already covers that thread.
+    """
+    def profile_coroutine(func):
+        @functools.wraps(func)
+        async def profiled(*args, **kwargs):
+            profile = g.get('_profile') if has_request_context() else None
+            if profile is None:
+                return await func(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                profile['profilers'].append(profiler)
+        return profiled
+
+    @functools.wraps(ensure_sync)
+    def wrapped(func):
+        if inspect.iscoroutinefunction(func) and not _PROFILER_SEES_ALL_THREADS:
+            func = profile_coroutine(func)
+        return ensure_sync(func)
+    return wrapped
+
+
+def list_profiles():
+    """
+    Returns:
+        list: {'id', 'request'} for each stored profile, newest first
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    summaries = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.txt')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    profiles = []
+    for entry in summaries:
+        profile_id = entry.name[:-len('.txt')]
+        if os.path.exists(os.path.join(PROFILE_DIR, f'{profile_id}.prof')):
+            with open(entry.path, encoding='utf-8') as f:
+                profiles.append({'id': profile_id, 'request': f.read().strip()})
+    return profiles
+
+
+def profile_path(profile_id):
+    """
+    Returns:
+        str: Path of the stored cProfile stats, or None if there is no such profile
+    """
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.prof')
+    return path if os.path.exists(path) else None
+
+
+def render_profile(path, sort='cumulative', limit=40):
+    """
+    Returns:
+        str: pstats report of the top functions
+    """
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+def init_app(app):
+    """Collect phase timings for every request and profile the requests that ask for it"""
+    app.ensure_sync = _profiling_ensure_sync(app.ensure_sync)
+
+    @app.before_request
+    def _start_request():
+        g._phases_token = _phases.set({})
+        _start_profile()
+
+    @app.after_request
+    def _add_timing_headers(response):
+        phases = _phases.get()
+        if phases:
+            response.headers['Server-Timing'] = server_timing(phases)
+        profile_id = _finish_profile()
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        # Requests that failed before after_request still release the profiler
+        _finish_profile()
+        token = g.pop('_phases_token', None)
+        if token is not None:
+            _phases.reset(token)
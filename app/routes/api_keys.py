@@ -0,0 +1,196 @@
+"""
+Routes for managing API keys (see app/services/api_keys.py)
+"""
+from flask import Blueprint, jsonify, request
+from limits import parse as parse_limit
+from app.services.api_keys import create_key, list_keys, revoke_key
+from app.extensions import limiter
+from app.config import RATE_LIMIT_ADMIN
+from app.auth import require_admin_key
+
+api_keys_bp = Blueprint('api_keys', __name__, url_prefix='/api-keys')
+
+
+@api_keys_bp.route('/', methods=['POST'])
+@limiter.limit(RATE_LIMIT_ADMIN)
+@require_admin_key
+def create_api_key():
+    """
+    Create an API key
+    ---
+    tags:
+      - API Keys
+    security:
+      - AdminKeyAuth: []
+    summary: Create an API key with its own rate limit quota
+    description: "The key is only returned here; only a hash of it is stored. Its quota applies across every route, on top of the per-route limits, which are also counted per key."
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - name
+          properties:
+            name:
+              type: string
+              example: "billing-service"
+            quota:
+              type: string
+              description: Rate limit for the key (default API_KEY_DEFAULT_QUOTA)
+              example: "5000 per day"
+    responses:
+      201:
+        description: API key created
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: object
+              properties:
+                id:
+                  type: string
+                  example: "7c9e6679f2d84c4bb6a1f3c2d1e0b9a8"
+                name:
+                  type: string
+                  example: "billing-service"
+                quota:
+                  type: string
+                  example: "5000 per day"
+                created_at:
+                  type: string
+                  example: "2026-01-15T20:30:00+00:00"
+                key:
+                  type: string
+                  example: "bXlfc2VjcmV0X2tleV9leGFtcGxlX29ubHlfMzJieXRlcw"
+      400:
+        description: Missing name or invalid quota
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "'quota' must be a rate limit such as \\"5000 per day\\""
+    """
+    payload = request.get_json(silent=True) or {}
+    name = payload.get('name')
+    quota = payload.get('quota')
+
+    if not isinstance(name, str) or not name.strip():
+        return jsonify({
+            'success': False,
+            'error': "'name' must be a non-empty string"
+        }), 400
+    if quota is not None:
+        try:
+            parse_limit(quota)
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': "'quota' must be a rate limit such as \"5000 per day\""
+            }), 400
+
+    return jsonify({
+        'success': True,
+        'data': create_key(name.strip(), quota)
+    }), 201
+
+
+@api_keys_bp.route('/', methods=['GET'])
+@limiter.limit(RATE_LIMIT_ADMIN)
+@require_admin_key
+def get_api_keys():
+    """
+    List API keys
+    ---
+    tags:
+      - API Keys
+    security:
+      - AdminKeyAuth: []
+    summary: List API keys (the keys themselves are never returned)
+    responses:
+      200:
+        description: API keys
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                    example: "7c9e6679f2d84c4bb6a1f3c2d1e0b9a8"
+                  name:
+                    type: string
+                    example: "billing-service"
+                  quota:
+                    type: string
+                    example: "5000 per day"
+                  created_at:
+                    type: string
+                    example: "2026-01-15T20:30:00+00:00"
+    """
+    return jsonify({
+        'success': True,
+        'data': list_keys()
+    }), 200
+
+
+@api_keys_bp.route('/<key_id>', methods=['DELETE'])
+@limiter.limit(RATE_LIMIT_ADMIN)
+@require_admin_key
+def remove_api_key(key_id):
+    """
+    Revoke an API key
+    ---
+    tags:
+      - API Keys
+    security:
+      - AdminKeyAuth: []
+    summary: Revoke an API key
+    description: "Takes effect at once on this worker; other workers may accept the key until their cache of it expires (API_KEY_CACHE_SECONDS)."
+    parameters:
+      - name: key_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: API key revoked
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+      404:
+        description: API key not found
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "API key not found"
+    """
+    if not revoke_key(key_id):
+        return jsonify({
+            'success': False,
+            'error': 'API key not found'
+        }), 404
+
+    return jsonify({'success': True}), 200
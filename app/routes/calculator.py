@@ -2,10 +2,15 @@
 Routes for calculator web app
 """
 import os
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, send_from_directory, url_for
+from app import assets
+from app.config import ASSET_DIST_DIR
 
 calculator_bp = Blueprint('calculator', __name__)
 
+# Fingerprinted file names change with their content, so they can be cached forever
+_ASSET_MAX_AGE_SECONDS = 365 * 24 * 60 * 60
+
 
 @calculator_bp.route('/calculator', methods=['GET'])
 def calculator():
@@ -14,3 +19,27 @@ def calculator():
     Renders an interactive calculator for converting USD/EUR to VES
     """
     return render_template('calculator.html', api_key=os.environ.get('API_KEY', ''))
+
+
+@calculator_bp.route('/assets/<path:filename>', methods=['GET'])
+def asset(filename):
+    """Bundled, content-hashed calculator assets built by build_assets.py"""
+    response = send_from_directory(ASSET_DIST_DIR, filename, max_age=_ASSET_MAX_AGE_SECONDS)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@calculator_bp.route('/sw.js', methods=['GET'])
+def service_worker():
+    """
+    Service worker for the calculator. Served from the site root so its
+    scope covers /calculator, and never cached so updates are picked up.
+    """
+    precache_urls = [url_for('calculator.calculator')] + assets.shell_urls()
+
+    body = render_template('sw.js', version=assets.version(), precache_urls=precache_urls)
+    return body, 200, {
+        'Content-Type': 'application/javascript; charset=utf-8',
+        'Cache-Control': 'no-cache'
+    }
@@ -0,0 +1,121 @@
+"""
+Routes for retrieving stored request profiles (see app/profiling.py)
+"""
+from flask import Blueprint, Response, jsonify, request, send_file
+from app.profiling import list_profiles, profile_path, render_profile
+from app.extensions import limiter
+from app.config import RATE_LIMIT_DEBUG
+from app.auth import require_admin_key
+
+debug_bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+_SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+@debug_bp.route('/profiles', methods=['GET'])
+@limiter.limit(RATE_LIMIT_DEBUG)
+@require_admin_key
+def get_profiles():
+    """
+    List stored request profiles
+    ---
+    tags:
+      - Debug
+    security:
+      - AdminKeyAuth: []
+    summary: List stored request profiles, newest first
+    description: "Requests are profiled when sent with X-Profile: 1 and X-Admin-Key, or when sampled by PROFILE_SAMPLE_RATE. Profiled responses carry an X-Profile-Id header."
+    responses:
+      200:
+        description: Stored profiles
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                    example: "5d41402abc4b2a76b9719d911017c592"
+                  request:
+                    type: string
+                    example: "2026-01-15T20:30:00+00:00 GET /rates/ rates.get_rates 812.4ms"
+    """
+    return jsonify({
+        'success': True,
+        'data': list_profiles()
+    }), 200
+
+
+@debug_bp.route('/profiles/<profile_id>', methods=['GET'])
+@limiter.limit(RATE_LIMIT_DEBUG)
+@require_admin_key
+def get_profile(profile_id):
+    """
+    Get a stored request profile
+    ---
+    tags:
+      - Debug
+    security:
+      - AdminKeyAuth: []
+    summary: Get a request profile as a pstats report or raw cProfile stats
+    produces:
+      - text/plain
+      - application/octet-stream
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+      - name: format
+        in: query
+        type: string
+        enum: [text, raw]
+        default: text
+        description: "text: top functions as a pstats report; raw: the .prof file, for snakeviz or pstats"
+      - name: sort
+        in: query
+        type: string
+        enum: [cumulative, tottime, ncalls]
+        default: cumulative
+      - name: limit
+        in: query
+        type: integer
+        default: 40
+    responses:
+      200:
+        description: The profile
+      404:
+        description: Profile not found
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "Profile not found"
+    """
+    path = profile_path(profile_id)
+    if not path:
+        return jsonify({
+            'success': False,
+            'error': 'Profile not found'
+        }), 404
+
+    if request.args.get('format') == 'raw':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in _SORT_KEYS:
+        sort = 'cumulative'
+    limit = request.args.get('limit', 40, type=int)
+
+    return Response(render_profile(path, sort, limit), mimetype='text/plain')
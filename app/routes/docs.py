@@ -0,0 +1,18 @@
+"""
+Routes serving the prebuilt OpenAPI spec and docs UI (fast-start mode)
+"""
+from flask import Blueprint, render_template, send_file
+from app.config import PREBUILT_APISPEC_PATH
+
+docs_bp = Blueprint('docs', __name__)
+
+
+@docs_bp.route('/apispec.json', methods=['GET'])
+def apispec():
+    return send_file(PREBUILT_APISPEC_PATH, mimetype='application/json')
+
+
+@docs_bp.route('/docs', methods=['GET'])
+@docs_bp.route('/docs/', methods=['GET'])
+def docs():
+    return render_template('docs.html')
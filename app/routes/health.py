@@ -1,9 +1,12 @@
 """
 Health check endpoint to keep the server awake
 """
+import os
 from flask import Blueprint, jsonify
+from app import db
 from app.extensions import limiter
 from app.config import RATE_LIMIT_HEALTH
+from app.services.circuit_breaker import get_breaker_states, CLOSED
 
 health_bp = Blueprint('health', __name__)
 
@@ -29,3 +32,108 @@ def health_check():
               example: "ok"
     """
     return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route('/health/deep', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HEALTH)
+def deep_health_check():
+    """
+    Deep health check
+    ---
+    tags:
+      - General
+    summary: Health check including MongoDB
+    description: Pings MongoDB and reports the round-trip latency and connection pool usage. Unlike /health this performs a database round trip, so don't use it as a keep-alive.
+    responses:
+      200:
+        description: API and database are healthy
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+              example: "ok"
+            mongo:
+              type: object
+              properties:
+                status:
+                  type: string
+                  example: "ok"
+                ping_ms:
+                  type: number
+                  example: 12.4
+                pool:
+                  type: object
+                  example: {"open_connections": 2, "checked_out": 0, "total_checkouts": 57, "checkout_failures": 0}
+      503:
+        description: MongoDB is not configured or unreachable
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+              example: "error"
+            mongo:
+              type: object
+              properties:
+                status:
+                  type: string
+                  example: "error"
+                error:
+                  type: string
+                  example: "No servers found yet"
+    """
+    if not os.environ.get("MONGODB_URI"):
+        return jsonify({
+            'status': 'error',
+            'mongo': {'status': 'error', 'error': 'MONGODB_URI is not configured'}
+        }), 503
+
+    try:
+        ping_ms = db.ping()
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'mongo': {'status': 'error', 'error': str(e), 'pool': db.pool_stats.snapshot()}
+        }), 503
+
+    return jsonify({
+        'status': 'ok',
+        'mongo': {
+            'status': 'ok',
+            'ping_ms': round(ping_ms, 2),
+            'pool': db.pool_stats.snapshot()
+        }
+    }), 200
+
+
+@health_bp.route('/health/upstreams', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HEALTH)
+def upstream_health():
+    """
+    Upstream circuit breaker status
+    ---
+    tags:
+      - General
+    summary: Circuit breaker state for BCV and Binance P2P
+    description: Reports each upstream's circuit breaker state, current adaptive timeout and observed latency. Status is "degraded" while any breaker is not closed, meaning stale cached values are being served.
+    responses:
+      200:
+        description: Circuit breaker states
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+              example: "ok"
+            upstreams:
+              type: object
+              example: {"bcv": {"state": "closed", "consecutive_failures": 0, "timeout_seconds": 4.2, "samples": 12, "latency_p50_seconds": 0.9, "latency_p95_seconds": 1.4, "retry_at": null}}
+    """
+    upstreams = get_breaker_states()
+    degraded = any(state['state'] != CLOSED for state in upstreams.values())
+
+    return jsonify({
+        'status': 'degraded' if degraded else 'ok',
+        'upstreams': upstreams
+    }), 200
@@ -0,0 +1,44 @@
+"""
+Prometheus metrics endpoint
+"""
+from flask import Blueprint, Response
+from app.extensions import limiter
+from app.config import RATE_LIMIT_HEALTH
+from app.metrics import render_latest
+from app.auth import require_metrics_token
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HEALTH)
+@require_metrics_token
+def metrics():
+    """
+    Prometheus metrics
+    ---
+    tags:
+      - General
+    summary: Service metrics in Prometheus text format
+    description: "Request latency histograms per route, TTLCache hit/miss/stale counts, upstream call latency and outcomes, Binance pages per crawl, MongoDB operation latency, rate limiter rejections and circuit breaker state. Send Authorization: Bearer <METRICS_TOKEN>, or X-Admin-Key."
+    produces:
+      - text/plain
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: false
+        description: "Bearer <METRICS_TOKEN>"
+      - name: X-Admin-Key
+        in: header
+        type: string
+        required: false
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format
+      401:
+        description: Missing or wrong metrics token or admin key
+      500:
+        description: Neither METRICS_TOKEN nor ADMIN_API_KEY is configured
+    """
+    return Response(render_latest(), mimetype='text/plain; version=0.0.4')
@@ -1,19 +1,30 @@
 """
 Routes for Binance P2P cryptocurrency price endpoints
 """
-from flask import Blueprint, jsonify
-from app.services.binance_p2p import get_binance_p2p_price
+from flask import Blueprint, jsonify, request
+from app.services.binance_p2p import get_binance_p2p_price_async, get_cached_price
+from app.services.p2p_history import get_price_history, INTERVALS
 from app.extensions import limiter
-from app.config import RATE_LIMIT_P2P
+from app.config import RATE_LIMIT_P2P, RATE_LIMIT_HISTORY, CONCURRENCY_LIMIT_P2P, CONCURRENCY_QUEUE_P2P
 from app.auth import require_api_key
+from app.concurrency import get_limit, limit_concurrency
+from app.routes.utils import parse_timestamp
 
 p2p_bp = Blueprint('p2p', __name__, url_prefix='/p2p')
 
+# Routes that may wait on Binance share one concurrency limit
+_p2p_slots = get_limit('binance_p2p', max_active=CONCURRENCY_LIMIT_P2P, max_queued=CONCURRENCY_QUEUE_P2P)
+
+
+def _has_cached_price():
+    return get_cached_price() is not None
+
 
 @p2p_bp.route('/usdt', methods=['GET'])
 @limiter.limit(RATE_LIMIT_P2P)
 @require_api_key
-def get_usdt_p2p():
+@limit_concurrency(_p2p_slots, _has_cached_price)
+async def get_usdt_p2p():
     """
     Get Binance P2P USDT/VES price
     ---
@@ -59,8 +70,10 @@ def get_usdt_p2p():
             error:
               type: string
               example: "Failed to fetch Binance P2P price"
+      503:
+        $ref: "#/responses/ServerBusy"
     """
-    price = get_binance_p2p_price()
+    price = await get_binance_p2p_price_async()
 
     if price:
         return jsonify({
@@ -75,3 +88,115 @@ def get_usdt_p2p():
             'success': False,
             'error': 'Failed to fetch Binance P2P price'
         }), 500
+
+
+@p2p_bp.route('/history', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HISTORY)
+@require_api_key
+def get_p2p_history():
+    """
+    Get historical Binance P2P USDT/VES prices
+    ---
+    tags:
+      - P2P Prices
+    security:
+      - ApiKeyAuth: []
+    summary: Get saved USDT/VES prices over a time range
+    description: Retrieves persisted Binance P2P prices, optionally downsampled into hourly, daily or weekly buckets (Venezuela time).
+    parameters:
+      - name: from
+        in: query
+        required: false
+        type: string
+        description: Range start as ISO 8601 date or datetime (default 7 days before "to")
+      - name: to
+        in: query
+        required: false
+        type: string
+        description: Range end as ISO 8601 date or datetime (default now)
+      - name: interval
+        in: query
+        required: false
+        type: string
+        enum: [raw, hour, day, week]
+        default: raw
+        description: Downsampling bucket size
+    responses:
+      200:
+        description: Successfully retrieved P2P history
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            interval:
+              type: string
+              example: "day"
+            truncated:
+              type: boolean
+              example: false
+              description: True if the range has more than 5000 raw prices; only the newest 5000 are returned, so narrow the range or use a larger interval
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  timestamp:
+                    type: string
+                    example: "2026-01-14T04:00:00+00:00"
+                  avg:
+                    type: number
+                    example: 540.125
+                  min:
+                    type: number
+                    example: 538.5
+                  max:
+                    type: number
+                    example: 542.0
+                  open:
+                    type: number
+                    example: 538.5
+                  close:
+                    type: number
+                    example: 542.0
+                  count:
+                    type: integer
+                    example: 3
+      400:
+        description: Invalid query parameters
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "interval must be one of: raw, hour, day, week"
+    """
+    interval = request.args.get('interval', 'raw')
+
+    if interval not in INTERVALS:
+        return jsonify({
+            'success': False,
+            'error': f"interval must be one of: {', '.join(INTERVALS)}"
+        }), 400
+
+    try:
+        start = parse_timestamp(request.args.get('from'))
+        end = parse_timestamp(request.args.get('to'))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'from and to must be ISO 8601 dates or datetimes'
+        }), 400
+
+    history, truncated = get_price_history(start=start, end=end, interval=interval)
+
+    return jsonify({
+        'success': True,
+        'interval': interval,
+        'truncated': truncated,
+        'data': history
+    }), 200
@@ -1,20 +1,30 @@
 """
 Routes for BCV exchange rate endpoints
 """
-from flask import Blueprint, jsonify, request
-from app.services.bcv_scraper import scrape_exchange_rates
-from app.services.rates_history import get_all_rates, get_rate_by_date, get_available_dates, get_usd_percentage_change
+from datetime import date as date_cls
+from flask import Blueprint, Response, jsonify, request
+from app.services.bcv_scraper import scrape_exchange_rates_async, get_cached_rates
+from app.services.rates_history import get_all_rates, get_rate_by_date, get_available_dates, get_usd_percentage_change, get_columnar_history
 from app.extensions import limiter
-from app.config import RATE_LIMIT_SCRAPE, RATE_LIMIT_HISTORY
+from app.config import RATE_LIMIT_SCRAPE, RATE_LIMIT_HISTORY, CONCURRENCY_LIMIT_SCRAPE, CONCURRENCY_QUEUE_SCRAPE
 from app.auth import require_api_key
+from app.concurrency import get_limit, limit_concurrency
 
 rates_bp = Blueprint('rates', __name__, url_prefix='/rates')
 
+# Routes that may wait on bcv.org.ve share one concurrency limit
+_scrape_slots = get_limit('bcv', max_active=CONCURRENCY_LIMIT_SCRAPE, max_queued=CONCURRENCY_QUEUE_SCRAPE)
+
+
+def _has_cached_rates():
+    return get_cached_rates() is not None
+
 
 @rates_bp.route('/', methods=['GET'])
 @limiter.limit(RATE_LIMIT_SCRAPE)
 @require_api_key
-def get_rates():
+@limit_concurrency(_scrape_slots, _has_cached_rates)
+async def get_rates():
     """
     Get all BCV exchange rates
     ---
@@ -59,8 +69,10 @@ def get_rates():
             error:
               type: string
               example: "Failed to scrape exchange rates"
+      503:
+        $ref: "#/responses/ServerBusy"
     """
-    rates = scrape_exchange_rates()
+    rates = await scrape_exchange_rates_async()
 
     if rates:
         return jsonify({
@@ -77,7 +89,8 @@ def get_rates():
 @rates_bp.route('/usd', methods=['GET'])
 @limiter.limit(RATE_LIMIT_SCRAPE)
 @require_api_key
-def get_usd_rate():
+@limit_concurrency(_scrape_slots, _has_cached_rates)
+async def get_usd_rate():
     """
     Get USD exchange rate
     ---
@@ -114,8 +127,10 @@ def get_usd_rate():
             error:
               type: string
               example: "Failed to scrape USD rate"
+      503:
+        $ref: "#/responses/ServerBusy"
     """
-    rates = scrape_exchange_rates()
+    rates = await scrape_exchange_rates_async()
 
     if rates and 'USD' in rates:
         return jsonify({
@@ -133,7 +148,8 @@ def get_usd_rate():
 @rates_bp.route('/eur', methods=['GET'])
 @limiter.limit(RATE_LIMIT_SCRAPE)
 @require_api_key
-def get_eur_rate():
+@limit_concurrency(_scrape_slots, _has_cached_rates)
+async def get_eur_rate():
     """
     Get EUR exchange rate
     ---
@@ -170,8 +186,10 @@ def get_eur_rate():
             error:
               type: string
               example: "Failed to scrape EUR rate"
+      503:
+        $ref: "#/responses/ServerBusy"
     """
-    rates = scrape_exchange_rates()
+    rates = await scrape_exchange_rates_async()
 
     if rates and 'EUR' in rates:
         return jsonify({
@@ -189,7 +207,8 @@ def get_eur_rate():
 @rates_bp.route('/date', methods=['GET'])
 @limiter.limit(RATE_LIMIT_SCRAPE)
 @require_api_key
-def get_date():
+@limit_concurrency(_scrape_slots, _has_cached_rates)
+async def get_date():
     """
     Get exchange rates date
     ---
@@ -223,8 +242,10 @@ def get_date():
             error:
               type: string
               example: "Failed to scrape date"
+      503:
+        $ref: "#/responses/ServerBusy"
     """
-    rates = scrape_exchange_rates()
+    rates = await scrape_exchange_rates_async()
 
     if rates and 'date' in rates:
         return jsonify({
@@ -308,6 +329,107 @@ def get_dates():
     }), 200
 
 
+@rates_bp.route('/history/columnar', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HISTORY)
+@require_api_key
+def get_columnar():
+    """
+    Get historical exchange rates as parallel arrays
+    ---
+    tags:
+      - Exchange Rates
+    security:
+      - ApiKeyAuth: []
+    summary: Get the history in a compact columnar format
+    description: "Returns the history as parallel arrays ordered by date: date[i] (ISO), USD[i] and EUR[i] belong together. Pass since to fetch only the days after the newest one you already have. Sent as MessagePack instead of JSON when the request has Accept: application/msgpack and the server has the msgpack package installed."
+    produces:
+      - application/json
+      - application/msgpack
+    parameters:
+      - name: since
+        in: query
+        type: string
+        required: false
+        description: Only return dates after this ISO date (e.g. "2025-12-30")
+    responses:
+      200:
+        description: Successfully retrieved history
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: object
+              properties:
+                date:
+                  type: array
+                  items:
+                    type: string
+                  example: ["2025-12-30", "2026-01-02"]
+                USD:
+                  type: array
+                  items:
+                    type: string
+                  example: ["298,14050000", "301,37090000"]
+                EUR:
+                  type: array
+                  items:
+                    type: string
+                  example: ["350,32530000", "353,95800000"]
+      400:
+        description: Invalid since parameter
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "'since' must be an ISO date (YYYY-MM-DD)"
+    """
+    since = request.args.get('since')
+    if since:
+        try:
+            since = date_cls.fromisoformat(since)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': "'since' must be an ISO date (YYYY-MM-DD)"
+            }), 400
+
+    body = {
+        'success': True,
+        'data': get_columnar_history(since or None)
+    }
+
+    if _accepts_msgpack():
+        import msgpack
+
+        response = Response(msgpack.packb(body), mimetype='application/msgpack')
+    else:
+        response = jsonify(body)
+    response.vary.add('Accept')
+    return response, 200
+
+
+def _accepts_msgpack():
+    """MessagePack is optional: only used if the client asks for it and msgpack is installed"""
+    accept = request.accept_mimetypes
+    if not (accept['application/msgpack'] or accept['application/x-msgpack']):
+        return False
+    # Prefer JSON for clients like browsers that accept anything
+    if accept.best_match(['application/json', 'application/msgpack', 'application/x-msgpack']) == 'application/json':
+        return False
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
 @rates_bp.route('/history/<date>', methods=['GET'])
 @limiter.limit(RATE_LIMIT_HISTORY)
 @require_api_key
@@ -0,0 +1,148 @@
+"""
+Routes for the BCV vs Binance P2P spread ("brecha")
+"""
+from flask import Blueprint, jsonify, request
+from app.services.spread import get_latest_spread, get_spread_history
+from app.extensions import limiter
+from app.config import RATE_LIMIT_HISTORY
+from app.auth import require_api_key
+from app.routes.utils import parse_timestamp
+
+spread_bp = Blueprint('spread', __name__, url_prefix='/spread')
+
+
+@spread_bp.route('/', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HISTORY)
+@require_api_key
+def get_spread():
+    """
+    Get the latest BCV vs P2P spread
+    ---
+    tags:
+      - Spread
+    security:
+      - ApiKeyAuth: []
+    summary: Get the latest gap between the BCV USD rate and the Binance P2P USDT price
+    description: Returns the most recently computed spread. It is updated whenever a new BCV rate or P2P price is saved.
+    responses:
+      200:
+        description: Successfully retrieved the latest spread
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: object
+              properties:
+                timestamp:
+                  type: string
+                  example: "2026-01-14T22:30:11.802000+00:00"
+                bcv_date:
+                  type: string
+                  example: "Jueves, 15 Enero 2026"
+                bcv_usd:
+                  type: number
+                  example: 339.1495
+                p2p_price:
+                  type: number
+                  example: 540.125
+                spread:
+                  type: number
+                  example: 200.975
+                  description: P2P price minus BCV rate, in VES
+                spread_pct:
+                  type: number
+                  example: 59.258
+                  description: Spread as a percentage of the BCV rate
+      404:
+        description: No spread has been computed yet
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "No spread data available yet"
+    """
+    spread = get_latest_spread()
+
+    if spread:
+        return jsonify({
+            'success': True,
+            'data': spread
+        }), 200
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'No spread data available yet'
+        }), 404
+
+
+@spread_bp.route('/history', methods=['GET'])
+@limiter.limit(RATE_LIMIT_HISTORY)
+@require_api_key
+def get_spread_range():
+    """
+    Get historical BCV vs P2P spread
+    ---
+    tags:
+      - Spread
+    security:
+      - ApiKeyAuth: []
+    summary: Get precomputed spread rows over a time range
+    description: Retrieves the spread series saved each time a BCV rate or P2P price was recorded.
+    parameters:
+      - name: from
+        in: query
+        required: false
+        type: string
+        description: Range start as ISO 8601 date or datetime (default 30 days before "to")
+      - name: to
+        in: query
+        required: false
+        type: string
+        description: Range end as ISO 8601 date or datetime (default now)
+    responses:
+      200:
+        description: Successfully retrieved spread history
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: array
+              items:
+                type: object
+      400:
+        description: Invalid query parameters
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "from and to must be ISO 8601 dates or datetimes"
+    """
+    try:
+        start = parse_timestamp(request.args.get('from'))
+        end = parse_timestamp(request.args.get('to'))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'from and to must be ISO 8601 dates or datetimes'
+        }), 400
+
+    history = get_spread_history(start=start, end=end)
+
+    return jsonify({
+        'success': True,
+        'data': history
+    }), 200
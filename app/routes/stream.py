@@ -0,0 +1,85 @@
+"""
+Route for the Server-Sent Events stream of new rates
+
+Served by the stream service (stream_api.py, an evented gevent worker) so an
+open stream costs a greenlet rather than a thread. The gthread app redirects
+subscribers there when RATES_STREAM_URL is set, and otherwise serves streams
+itself, capped at RATES_STREAM_MAX_SUBSCRIBERS so they can't take the threads
+regular requests need.
+"""
+import queue
+from flask import Blueprint, Response, current_app, jsonify, redirect
+from app.services import rate_events
+from app.extensions import limiter
+from app.config import RATE_LIMIT_STREAM
+from app.auth import require_api_key
+
+stream_bp = Blueprint('stream', __name__, url_prefix='/rates')
+
+# Comment line sent on idle streams so proxies keep them open and dead clients are noticed
+_KEEPALIVE_SECONDS = 15
+
+
+@stream_bp.route('/stream', methods=['GET'])
+@limiter.limit(RATE_LIMIT_STREAM)
+@require_api_key
+def stream_rates():
+    """
+    Stream new rates (Server-Sent Events)
+    ---
+    tags:
+      - Exchange Rates
+    security:
+      - ApiKeyAuth: []
+    summary: Subscribe to new BCV rates and P2P prices
+    description: "Opens a text/event-stream. A `rates` event (same data as /rates) is sent when BCV publishes a new date, and a `p2p` event ({asset, fiat, price}) when a new Binance P2P price is computed. The latest known value of each is sent on connect. Idle streams get a keep-alive comment every 15 seconds. Streams are served by a separate evented stream service; where it is deployed, this endpoint answers 307 with its URL (send the X-API-Key header again there). Each instance serves at most RATES_STREAM_MAX_SUBSCRIBERS streams at once; further subscribers get 503."
+    produces:
+      - text/event-stream
+    responses:
+      200:
+        description: Event stream
+        schema:
+          type: string
+          example: "event: rates\\ndata: {\\"USD\\": \\"36,50\\", \\"EUR\\": \\"39,75\\", \\"date\\": \\"Martes, 30 Diciembre 2025\\"}\\n\\n"
+      307:
+        description: Streams are served by the stream service at the Location URL
+      503:
+        description: Too many open streams
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "Too many open streams, retry later"
+    """
+    stream_url = current_app.config.get('RATES_STREAM_URL')
+    if stream_url:
+        return redirect(f"{stream_url.rstrip('/')}/rates/stream", code=307)
+
+    subscription = rate_events.subscribe()
+    if subscription is None:
+        return jsonify({
+            'success': False,
+            'error': 'Too many open streams, retry later'
+        }), 503, {'Retry-After': '60'}
+
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = subscription.get(timeout=_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield rate_events.format_event(message)
+        finally:
+            rate_events.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,22 @@
+"""
+Shared helpers for parsing route query parameters
+"""
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 date or datetime query parameter as UTC
+
+    Returns:
+        datetime: Timezone-aware datetime, or None if value is empty
+
+    Raises:
+        ValueError: If value is not a valid ISO 8601 date or datetime
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
@@ -0,0 +1,191 @@
+"""
+Routes for managing webhook subscriptions
+"""
+from flask import Blueprint, jsonify, request
+from app.services.webhooks import create_subscription, list_subscriptions, delete_subscription, url_error
+from app.extensions import limiter
+from app.config import RATE_LIMIT_WEBHOOKS
+from app.auth import current_api_key, require_issued_api_key
+
+webhooks_bp = Blueprint('webhooks', __name__, url_prefix='/webhooks')
+
+
+@webhooks_bp.route('/', methods=['POST'])
+@limiter.limit(RATE_LIMIT_WEBHOOKS)
+@require_issued_api_key
+def create_webhook():
+    """
+    Create a webhook subscription
+    ---
+    tags:
+      - Webhooks
+    security:
+      - ApiKeyAuth: []
+    summary: Subscribe a URL to new BCV rates
+    description: "The URL receives a POST with {event: rate.published, date, data: {USD, EUR, timestamp}} whenever a new BCV date is saved. Requests are signed: X-Webhook-Signature is sha256=HMAC-SHA256(secret, \\"<X-Webhook-Timestamp>.<body>\\"). The secret is only returned here. The URL's host must resolve to public addresses only. Needs an API key issued through /api-keys, which owns the subscription."
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - url
+          properties:
+            url:
+              type: string
+              example: "https://example.com/hooks/bcv"
+            secret:
+              type: string
+              description: Signing secret (generated if omitted)
+    responses:
+      201:
+        description: Subscription created
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: object
+              properties:
+                id:
+                  type: string
+                  example: "3f2b6c0e9a8d4e1f8b7a6c5d4e3f2a1b"
+                url:
+                  type: string
+                  example: "https://example.com/hooks/bcv"
+                secret:
+                  type: string
+                  example: "9c1f..."
+                created_at:
+                  type: string
+                  example: "2026-01-15T20:30:00+00:00"
+      400:
+        description: Missing or invalid url, or its host resolves to a non-public (loopback, private, link-local or reserved) address
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "'url' must be an http(s) URL"
+      403:
+        description: Sent with the built-in API_KEY instead of a key issued through /api-keys
+    """
+    payload = request.get_json(silent=True) or {}
+    url = payload.get('url')
+    secret = payload.get('secret')
+
+    error = url_error(url)
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+    if secret is not None and (not isinstance(secret, str) or not secret):
+        return jsonify({
+            'success': False,
+            'error': "'secret' must be a non-empty string"
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'data': create_subscription(current_api_key()['id'], url, secret)
+    }), 201
+
+
+@webhooks_bp.route('/', methods=['GET'])
+@limiter.limit(RATE_LIMIT_WEBHOOKS)
+@require_issued_api_key
+def get_webhooks():
+    """
+    List webhook subscriptions
+    ---
+    tags:
+      - Webhooks
+    security:
+      - ApiKeyAuth: []
+    summary: List this API key's webhook subscriptions (without secrets)
+    responses:
+      200:
+        description: Subscriptions
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                    example: "3f2b6c0e9a8d4e1f8b7a6c5d4e3f2a1b"
+                  url:
+                    type: string
+                    example: "https://example.com/hooks/bcv"
+                  created_at:
+                    type: string
+                    example: "2026-01-15T20:30:00+00:00"
+      403:
+        description: Sent with the built-in API_KEY instead of a key issued through /api-keys
+    """
+    return jsonify({
+        'success': True,
+        'data': list_subscriptions(current_api_key()['id'])
+    }), 200
+
+
+@webhooks_bp.route('/<subscription_id>', methods=['DELETE'])
+@limiter.limit(RATE_LIMIT_WEBHOOKS)
+@require_issued_api_key
+def remove_webhook(subscription_id):
+    """
+    Delete a webhook subscription
+    ---
+    tags:
+      - Webhooks
+    security:
+      - ApiKeyAuth: []
+    summary: Delete one of this API key's webhook subscriptions
+    parameters:
+      - name: subscription_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Subscription deleted
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+      404:
+        description: This API key has no such subscription
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: false
+            error:
+              type: string
+              example: "Subscription not found"
+      403:
+        description: Sent with the built-in API_KEY instead of a key issued through /api-keys
+    """
+    if not delete_subscription(current_api_key()['id'], subscription_id):
+        return jsonify({
+            'success': False,
+            'error': 'Subscription not found'
+        }), 404
+
+    return jsonify({'success': True}), 200
@@ -0,0 +1,129 @@
+"""
+API keys stored in the history store, each with its own rate limit quota
+
+Only a SHA-256 hash of each key is stored; the key itself is shown once,
+when it is created. Lookups go through in-memory caches so authenticating a
+request doesn't wait on the database: known keys are cached for
+API_KEY_CACHE_SECONDS (so a revoked key keeps working on other workers for
+up to that long) and unknown ones for API_KEY_NEGATIVE_CACHE_SECONDS. If the
+database can't be reached, a key seen before is still accepted.
+
+The API_KEY environment variable keeps working as a built-in key (id
+"default"), which the calculator page uses. Since that page hands it to
+every visitor, it gets no quota of its own and is rate limited per address.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import uuid
+from datetime import datetime, timezone
+from app.services.history_store import get_store
+from app.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+API_KEY_CACHE_SECONDS = float(os.environ.get('API_KEY_CACHE_SECONDS', 5 * 60))
+API_KEY_NEGATIVE_CACHE_SECONDS = float(os.environ.get('API_KEY_NEGATIVE_CACHE_SECONDS', 60))
+
+DEFAULT_KEY_ID = 'default'
+
+_known = TTLCache(ttl_seconds=API_KEY_CACHE_SECONDS, name='api_keys')
+# Bounded, so a client cycling through random keys can't grow it without limit
+_unknown = TTLCache(ttl_seconds=API_KEY_NEGATIVE_CACHE_SECONDS, name='api_keys_unknown', max_entries=10000)
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _public(api_key):
+    return {name: value for name, value in api_key.items() if name != 'key_hash'}
+
+
+def _env_key(client_key):
+    env_key = os.environ.get('API_KEY')
+    if env_key and hmac.compare_digest(client_key.encode(), env_key.encode()):
+        return {'id': DEFAULT_KEY_ID, 'name': 'API_KEY', 'quota': None, 'created_at': None}
+    return None
+
+
+def lookup(client_key):
+    """
+    Args:
+        client_key (str): The key sent by the client
+
+    Returns:
+        dict: The API key ('id', 'name', 'quota', 'created_at'), or None if it isn't valid
+    """
+    if not client_key:
+        return None
+
+    api_key = _env_key(client_key)
+    if api_key:
+        return api_key
+
+    key_hash = hash_key(client_key)
+    cached, is_fresh = _known.get(key_hash)
+    if is_fresh:
+        return cached
+    if _unknown.get(key_hash)[1]:
+        return None
+
+    try:
+        stored = get_store().get_api_key(key_hash)
+    except Exception as e:
+        logger.error("Error looking up API key: %s", e)
+        return cached
+
+    if stored is None:
+        _known.delete(key_hash)
+        _unknown.set(key_hash, True)
+        return None
+
+    api_key = _public(stored)
+    _known.set(key_hash, api_key)
+    return api_key
+
+
+def create_key(name, quota=None):
+    """
+    Args:
+        name (str): Who the key is for
+        quota (str): Rate limit for the key, e.g. "5000 per day" (default: API_KEY_DEFAULT_QUOTA)
+
+    Returns:
+        dict: The stored API key, including the key itself (not retrievable later)
+    """
+    key = secrets.token_urlsafe(32)
+    api_key = {
+        'id': uuid.uuid4().hex,
+        'name': name,
+        'key_hash': hash_key(key),
+        'quota': quota,
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    get_store().save_api_key(api_key)
+    _unknown.delete(api_key['key_hash'])
+    return {**_public(api_key), 'key': key}
+
+
+def list_keys():
+    """
+    Returns:
+        list: Stored API keys, without their hashes
+    """
+    return [_public(api_key) for api_key in get_store().get_api_keys()]
+
+
+def revoke_key(key_id):
+    """
+    Returns:
+        bool: True if the key existed
+    """
+    api_key = get_store().delete_api_key(key_id)
+    if api_key is None:
+        return False
+    _known.delete(api_key['key_hash'])
+    return True
@@ -0,0 +1,78 @@
+"""
+Buffered, batched writer for database inserts that shouldn't block a request.
+
+Records are appended to an in-memory buffer and flushed by a background
+daemon thread, either when the buffer reaches batch_size or every
+flush_interval seconds, whichever comes first. A failed flush is retried
+with exponential backoff before the batch is dropped. Remaining records are
+flushed at interpreter exit.
+"""
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    def __init__(self, flush, batch_size=100, flush_interval=5.0, retries=3, retry_backoff=1.0):
+        """
+        Args:
+            flush (callable): Called with a list of buffered records
+            batch_size (int): Flush as soon as this many records are buffered
+            flush_interval (float): Maximum seconds a record waits in the buffer
+            retries (int): Extra attempts for a batch whose flush raised
+            retry_backoff (float): Seconds before the first retry, doubled on each one
+        """
+        self._flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, record):
+        """Buffer a record for the next flush (never blocks on the database)"""
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._start()
+
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write out everything currently buffered"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+
+        if not batch:
+            return
+
+        for attempt in range(self.retries + 1):
+            try:
+                self._flush(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error("Error flushing %d buffered records, dropping them: %s", len(batch), e)
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("Error flushing %d buffered records, retrying in %gs: %s", len(batch), delay, e)
+                time.sleep(delay)
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,26 @@
+"""
+Dates as the BCV homepage shows them, e.g. "Jueves, 15 Enero 2026"
+
+Rate history is keyed on these strings, which don't sort or compare as
+dates; parse_bcv_date turns one into a datetime.date.
+"""
+from datetime import date
+
+_MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
+}
+
+
+def parse_bcv_date(value):
+    """
+    Parse a date as shown on the BCV homepage, e.g. "Jueves, 15 Enero 2026"
+
+    Returns:
+        date: The date, or None if it can't be parsed
+    """
+    try:
+        day, month, year = value.split(',', 1)[-1].split()
+        return date(int(year), _MONTHS[month.lower()], int(day))
+    except (AttributeError, KeyError, ValueError):
+        return None
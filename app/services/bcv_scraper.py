@@ -1,86 +1,189 @@
 """
 Service for scraping exchange rates from Banco Central de Venezuela
 """
-import requests
-from lxml import html
-import urllib3
-from app.services.rates_history import save_rate_to_history
+import asyncio
+import logging
+import os
+from datetime import datetime
+from app.concurrency import serving_stale
+from app.metrics import BCV_SCRAPES
+from app.profiling import phase
+from app.tracing import span
+from app.services import publication_schedule
+from app.services.circuit_breaker import get_breaker
+from app.services.rate_events import publish_rates
+from app.services.rates_history import save_rate_to_history, get_latest_rate
+from app.services.spread import on_bcv_rate
 from app.services.ttl_cache import TTLCache
 
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+logger = logging.getLogger(__name__)
 
-# BCV only publishes new rates once a day; matches the external refresh cadence
+# Upper bound on how long cached rates are kept; how soon they are refreshed
+# is decided per call by publication_schedule
 _CACHE_TTL_SECONDS = 24 * 60 * 60
-_cache = TTLCache(ttl_seconds=_CACHE_TTL_SECONDS)
+_cache = TTLCache(ttl_seconds=_CACHE_TTL_SECONDS, name='bcv_rates', persist=True)
 _CACHE_KEY = 'bcv_rates'
 
+# bcv.org.ve is frequently slow or down; after 3 straight failures stop
+# waiting on it for 5 minutes and serve the stale cached rates instead
+_breaker = get_breaker('bcv', failure_threshold=3, recovery_timeout=5 * 60, max_timeout=10.0)
 
-def scrape_exchange_rates():
+# Overridable so benchmarks can point the scraper at a local stand-in
+_URL = os.environ.get("BCV_URL", "https://www.bcv.org.ve/")
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_USD_XPATH = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[7]/div/div/div[2]/strong'
+_EUR_XPATH = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[3]/div/div/div[2]/strong'
+_DATE_XPATH = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[8]/span'
+
+
+def _parse_rates(content):
     """
-    Scrapes exchange rates from Banco Central de Venezuela website.
-    Cached for 24 hours to avoid re-scraping bcv.org.ve on every request.
+    Extract the USD and EUR rates and the applicable date from the BCV homepage
 
     Returns:
-        dict: Dictionary containing USD, EUR rates and date, or None if failed
+        dict: Whichever of USD, EUR and date could be found
     """
-    cached_rates, is_fresh = _cache.get(_CACHE_KEY)
-    if is_fresh:
-        return cached_rates
+    from lxml import html
 
-    url = "https://www.bcv.org.ve/"
+    with phase('bcv_parse'):
+        tree = html.fromstring(content)
 
-    try:
-        # Send GET request to the website
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10, verify=False)
+    with phase('bcv_xpath'):
+        usd_element = tree.xpath(_USD_XPATH)
+        eur_element = tree.xpath(_EUR_XPATH)
+        date_element = tree.xpath(_DATE_XPATH)
+
+    rates = {}
+
+    if usd_element:
+        usd_rate = usd_element[0].text_content().strip()
+        rates['USD'] = usd_rate
+
+    if eur_element:
+        eur_rate = eur_element[0].text_content().strip()
+        rates['EUR'] = eur_rate
+
+    if date_element:
+        date = date_element[0].text_content().strip()
+        # Remove extra spaces (normalize multiple spaces to single space)
+        date = ' '.join(date.split())
+        rates['date'] = date
+
+    return rates
+
+
+async def _fetch_homepage():
+    import httpx
+
+    # bcv.org.ve serves an incomplete certificate chain, so verification is disabled
+    async with httpx.AsyncClient(headers=_HEADERS, timeout=_breaker.timeout, verify=False) as client:
+        with span('upstream.bcv', url=_URL) as fetch_span:
+            response = await client.get(_URL)
+            fetch_span.set('http.status_code', response.status_code)
         response.raise_for_status()
+        return response.content
 
-        # Parse the HTML content
-        tree = html.fromstring(response.content)
 
-        # Extract the USD value using XPath
-        usd_xpath = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[7]/div/div/div[2]/strong'
-        usd_element = tree.xpath(usd_xpath)
+async def scrape_exchange_rates_async(max_age=None):
+    """
+    Scrapes exchange rates from Banco Central de Venezuela website.
+    Cached to avoid re-scraping bcv.org.ve on every request: refreshed often
+    around BCV's usual publication time and rarely otherwise (see
+    publication_schedule), and served stale while the bcv circuit breaker is open.
 
-        # Extract the EUR value using XPath
-        eur_xpath = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[3]/div/div/div[2]/strong'
-        eur_element = tree.xpath(eur_xpath)
+    Args:
+        max_age (float): Re-scrape if the cached rates are older than this
+                         many seconds (default: publication_schedule.max_age)
 
-        # Extract the date using XPath
-        date_xpath = '/html/body/div[4]/div/div[2]/div/div[1]/div[1]/section[1]/div/div[2]/div/div[8]/span'
-        date_element = tree.xpath(date_xpath)
+    Returns:
+        dict: Dictionary containing USD, EUR rates and date, or None if failed
+    """
+    if max_age is None:
+        max_age = publication_schedule.max_age(get_cached_rates())
 
-        rates = {}
+    with phase('bcv_cache'):
+        cached_rates, is_fresh = _cache.get(_CACHE_KEY, max_age=max_age)
+    if is_fresh:
+        return cached_rates
 
-        if usd_element:
-            usd_rate = usd_element[0].text_content().strip()
-            rates['USD'] = usd_rate
+    # Upstream is known to be failing, or this request was shed - serve stale rates without waiting on it
+    if serving_stale() or not _breaker.allow_request():
+        return cached_rates
 
-        if eur_element:
-            eur_rate = eur_element[0].text_content().strip()
-            rates['EUR'] = eur_rate
+    # Deferred import: httpx is only loaded once an upstream call is needed
+    import httpx
 
-        if date_element:
-            date = date_element[0].text_content().strip()
-            # Remove extra spaces (normalize multiple spaces to single space)
-            date = ' '.join(date.split())
-            rates['date'] = date
+    try:
+        with phase('bcv_fetch'):
+            content = await _breaker.call_async(_fetch_homepage)
+        rates = _parse_rates(content)
 
         # Save to history if we have all the data
         if rates and 'USD' in rates and 'EUR' in rates and 'date' in rates:
-            save_rate_to_history(rates['date'], rates['USD'], rates['EUR'])
+            with phase('bcv_history_queue'):
+                save_rate_to_history(rates['date'], rates['USD'], rates['EUR'])
             _cache.set(_CACHE_KEY, rates)
+            if not cached_rates or cached_rates.get('date') != rates['date']:
+                publish_rates(rates)
+                on_bcv_rate(rates['date'], rates['USD'])
+            BCV_SCRAPES.inc(outcome='complete')
             return rates
 
         # Incomplete scrape - fall back to stale cache rather than failing outright
+        BCV_SCRAPES.inc(outcome='incomplete')
         return cached_rates
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching the webpage: {e}")
+    except httpx.HTTPError as e:
+        logger.error("Error fetching the webpage: %s", e)
+        BCV_SCRAPES.inc(outcome='error')
         return cached_rates
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    except Exception:
+        logger.exception("Unexpected error scraping BCV rates")
+        BCV_SCRAPES.inc(outcome='error')
         return cached_rates
+
+
+def scrape_exchange_rates(max_age=None):
+    """
+    Synchronous wrapper around scrape_exchange_rates_async for callers
+    outside an event loop.
+
+    Returns:
+        dict: Dictionary containing USD, EUR rates and date, or None if failed
+    """
+    return asyncio.run(scrape_exchange_rates_async(max_age))
+
+
+def get_cached_rates():
+    """
+    Returns:
+        dict: The last scraped rates, fresh or stale, without contacting BCV (None if there are none)
+    """
+    return _cache.peek(_CACHE_KEY)
+
+
+def load_cache_snapshot():
+    """Restore cached rates saved to disk by a previous process"""
+    return _cache.load()
+
+
+def seed_cache_from_history():
+    """
+    Seed the cache from the latest rates_history entry. The entry's own
+    timestamp is kept, so it is only served as fresh if it would have been
+    in the original process.
+
+    Returns:
+        bool: True if the cache was seeded
+    """
+    date, entry = get_latest_rate()
+    if not date:
+        return False
+
+    # Timestamps are naive local time, as written by save_rate_to_history
+    timestamp = datetime.fromisoformat(entry['timestamp']).timestamp()
+    rates = {'USD': entry['USD'], 'EUR': entry['EUR'], 'date': date}
+    return _cache.seed(_CACHE_KEY, rates, timestamp)
@@ -1,113 +1,223 @@
 """
 Service for fetching cryptocurrency prices from Binance P2P
 """
-import requests
+import asyncio
+import logging
+import os
+from app.concurrency import serving_stale
+from app.metrics import BINANCE_PAGES_PER_CRAWL
+from app.profiling import phase
+from app.tracing import span
+from app.services.circuit_breaker import get_breaker, CircuitOpenError, CLOSED, OPEN
 from app.services.ttl_cache import TTLCache
+from app.services.p2p_history import record_p2p_price, get_latest_entry
+from app.services.rate_events import publish_p2p_price
+from app.services.spread import on_p2p_price
+
+logger = logging.getLogger(__name__)
 
 # Matches the external refresh cadence for the Binance P2P rate
 _CACHE_TTL_SECONDS = 8 * 60 * 60
-_cache = TTLCache(ttl_seconds=_CACHE_TTL_SECONDS)
+_cache = TTLCache(ttl_seconds=_CACHE_TTL_SECONDS, name='binance_p2p', persist=True)
+
+# Overridable so benchmarks can point the crawler at a local stand-in
+_URL = os.environ.get("BINANCE_P2P_URL", "https://p2p.binance.com/bapi/c2c/v2/friendly/c2c/adv/search")
+_MAX_ROWS_PER_PAGE = 20  # Binance API limit
+_MAX_PAGES = 100  # Safety limit to prevent infinite loops
+# Pages requested concurrently per round; a crawl rarely qualifies enough
+# sellers from a single page, so overlapping a few saves whole round trips
+_PAGE_CONCURRENCY = 3
+# Share of malformed-ad warnings logged; a bad page can produce dozens per crawl
+AD_SKIP_LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_AD_SKIPS', 0.01))
+
+# Tracks individual page requests, so a crawl aborts as soon as Binance starts failing
+_breaker = get_breaker('binance_p2p', failure_threshold=3, recovery_timeout=2 * 60, max_timeout=10.0)
+
+
+async def _post_page(client, payload, page):
+    with phase('binance_fetch'), span('upstream.binance', page=page) as fetch_span:
+        response = await client.post(_URL, json={**payload, "page": page}, timeout=_breaker.timeout)
+        fetch_span.set('http.status_code', response.status_code)
+        response.raise_for_status()
+    with phase('binance_decode'):
+        return response.json()
+
+
+async def _fetch_page(client, payload, page):
+    if not _breaker.allow_request():
+        raise CircuitOpenError("Binance P2P circuit breaker is open")
+    return await _breaker.call_async(_post_page, client, payload, page)
+
+
+def _cache_key(asset="USDT", fiat="VES", payment_methods=None, num_prices=50, min_trades=1000, min_completion_rate=98.0):
+    return (asset, fiat, tuple(payment_methods or []), num_prices, min_trades, min_completion_rate)
+
 
+def _collect_prices(ads, all_prices, num_prices, min_trades, min_completion_rate):
+    """Append the prices of ads from qualifying merchants, up to num_prices"""
+    for ad in ads:
+        if len(all_prices) >= num_prices:
+            break
 
-def get_binance_p2p_price(asset="USDT", fiat="VES", payment_methods=None, num_prices=50, min_trades=1000, min_completion_rate=98.0):
+        try:
+            advertiser = ad.get("advertiser", {})
+            # Check if merchant meets requirements
+            # monthFinishRate is a percentage (0-1), convert to 0-100 scale
+            month_finish_rate = float(advertiser.get("monthFinishRate", 0)) * 100
+            month_order_count = int(advertiser.get("monthOrderCount", 0))
+
+            # Only include if meets minimum requirements
+            if month_order_count >= min_trades and month_finish_rate >= min_completion_rate:
+                price = float(ad["adv"]["price"])
+                all_prices.append(price)
+        except (KeyError, ValueError, TypeError) as e:
+            # Skip this ad if data is malformed
+            logger.warning("Skipping ad due to data error: %s", e, extra={'sample_rate': AD_SKIP_LOG_SAMPLE_RATE})
+            continue
+
+
+async def get_binance_p2p_price_async(asset="USDT", fiat="VES", payment_methods=None, num_prices=50, min_trades=1000, min_completion_rate=98.0, max_age=None):
     """
     Fetches the average buy price from Binance P2P marketplace.
     Cached for 8 hours (per parameter combination) to avoid hitting
-    Binance's P2P search API on every request.
+    Binance's P2P search API on every request, and served stale while the
+    binance_p2p circuit breaker is open.
 
     Args:
         asset (str): The cryptocurrency asset (default: USDT)
         fiat (str): The fiat currency (default: VES)
         payment_methods (list): List of payment method codes to filter by (default: all methods)
-        num_prices (int): Number of prices to average (default: 300)
+        num_prices (int): Number of prices to average (default: 50)
         min_trades (int): Minimum number of trades required (default: 1000)
         min_completion_rate (float): Minimum 30-day completion rate required (default: 98.0)
+        max_age (float): Re-fetch if the cached price is older than this many
+                         seconds (default: the 8 hour cache TTL)
 
     Returns:
         float: The average buy price, or None if failed
     """
-    cache_key = (asset, fiat, tuple(payment_methods or []), num_prices, min_trades, min_completion_rate)
-    cached_price, is_fresh = _cache.get(cache_key)
+    cache_key = _cache_key(asset, fiat, payment_methods, num_prices, min_trades, min_completion_rate)
+    with phase('binance_cache'):
+        cached_price, is_fresh = _cache.get(cache_key, max_age=max_age)
     if is_fresh:
         return cached_price
 
-    url = "https://p2p.binance.com/bapi/c2c/v2/friendly/c2c/adv/search"
+    # Upstream is known to be failing, or this request was shed - serve the stale price without waiting on it
+    if serving_stale() or _breaker.state == OPEN:
+        return cached_price
 
-    headers = {
-        "Content-Type": "application/json"
+    # Deferred import: httpx is only loaded once an upstream call is needed
+    import httpx
+
+    payload = {
+        "asset": asset,
+        "fiat": fiat,
+        "merchantCheck": True,
+        "payTypes": payment_methods or [],  # Empty for all payment methods
+        "publisherType": None,
+        "rows": _MAX_ROWS_PER_PAGE,
+        "tradeType": "BUY"  # "BUY" means you're buying USDT (sellers offering USDT)
     }
 
     all_prices = []
-    max_rows_per_page = 20  # Binance API limit
 
     try:
-        page = 1
-        # Keep fetching until we have enough qualifying prices
-        while len(all_prices) < num_prices:
-            payload = {
-                "asset": asset,
-                "fiat": fiat,
-                "merchantCheck": True,
-                "page": page,
-                "payTypes": payment_methods or [],  # Empty for all payment methods
-                "publisherType": None,
-                "rows": max_rows_per_page,
-                "tradeType": "BUY"  # "BUY" means you're buying USDT (sellers offering USDT)
-            }
-
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("success"):
-                ads = data.get("data", [])
-                if not ads:
-                    # No more ads available
-                    break
-
-                # Filter ads based on merchant criteria
-                for ad in ads:
+        async with httpx.AsyncClient(headers={"Content-Type": "application/json"}) as client:
+            page = 1
+            pages_used = 0
+            exhausted = False
+            # Keep fetching until we have enough qualifying prices
+            while len(all_prices) < num_prices and not exhausted and page <= _MAX_PAGES:
+                # A half-open breaker only lets a single probe through
+                concurrency = _PAGE_CONCURRENCY if _breaker.state == CLOSED else 1
+                pages = range(page, min(page + concurrency, _MAX_PAGES + 1))
+                results = await asyncio.gather(*(_fetch_page(client, payload, p) for p in pages))
+
+                # Process in page order so the average covers the best-ranked ads;
+                # pages fetched ahead but not needed aren't counted as used
+                for data in results:
                     if len(all_prices) >= num_prices:
                         break
+                    pages_used += 1
+
+                    ads = data.get("data", []) if data.get("success") else []
+                    if not ads:
+                        # No more ads available
+                        exhausted = True
+                        break
+
+                    with phase('binance_filter'):
+                        _collect_prices(ads, all_prices, num_prices, min_trades, min_completion_rate)
+
+                page += len(pages)
 
-                    try:
-                        advertiser = ad.get("advertiser", {})
-                        # Check if merchant meets requirements
-                        # monthFinishRate is a percentage (0-1), convert to 0-100 scale
-                        month_finish_rate = float(advertiser.get("monthFinishRate", 0)) * 100
-                        month_order_count = int(advertiser.get("monthOrderCount", 0))
-
-                        # Only include if meets minimum requirements
-                        if month_order_count >= min_trades and month_finish_rate >= min_completion_rate:
-                            price = float(ad["adv"]["price"])
-                            all_prices.append(price)
-                    except (KeyError, ValueError, TypeError) as e:
-                        # Skip this ad if data is malformed
-                        print(f"Skipping ad due to data error: {e}")
-                        continue
-            else:
-                break
-
-            page += 1
-            # Safety limit to prevent infinite loops
-            if page > 100:
-                break
+            BINANCE_PAGES_PER_CRAWL.observe(pages_used)
 
         if all_prices:
             # Calculate and return the average
             average_price = sum(all_prices) / len(all_prices)
             # Truncate to 3 decimal places
             average_price = int(average_price * 1000) / 1000
-            print(f"Successfully collected {len(all_prices)} prices from qualifying sellers")
+            logger.info("Successfully collected %d prices from qualifying sellers", len(all_prices))
             _cache.set(cache_key, average_price)
+            with phase('p2p_history_queue'):
+                record_p2p_price(asset, fiat, average_price, len(all_prices))
+            on_p2p_price(asset, fiat, average_price)
+            if average_price != cached_price:
+                publish_p2p_price(asset, fiat, average_price)
             return average_price
 
-        print(f"No qualifying sellers found with criteria: {min_trades}+ trades, {min_completion_rate}%+ completion rate")
+        logger.warning("No qualifying sellers found with criteria: %d+ trades, %s%%+ completion rate", min_trades, min_completion_rate)
         return cached_price
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching Binance P2P price: {e}")
+    except CircuitOpenError as e:
+        logger.warning("Skipping Binance P2P fetch: %s", e)
         return cached_price
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    except httpx.HTTPError as e:
+        logger.error("Error fetching Binance P2P price: %s", e)
         return cached_price
+    except Exception:
+        logger.exception("Unexpected error fetching the Binance P2P price")
+        return cached_price
+
+
+def get_binance_p2p_price(asset="USDT", fiat="VES", payment_methods=None, num_prices=50, min_trades=1000, min_completion_rate=98.0, max_age=None):
+    """
+    Synchronous wrapper around get_binance_p2p_price_async for callers
+    outside an event loop. Takes the same arguments.
+
+    Returns:
+        float: The average buy price, or None if failed
+    """
+    return asyncio.run(get_binance_p2p_price_async(
+        asset, fiat, payment_methods, num_prices, min_trades, min_completion_rate, max_age
+    ))
+
+
+def get_cached_price(asset="USDT", fiat="VES", payment_methods=None, num_prices=50, min_trades=1000, min_completion_rate=98.0):
+    """
+    Takes the same arguments as get_binance_p2p_price_async (except max_age).
+
+    Returns:
+        float: The last computed price, fresh or stale, without contacting Binance (None if there is none)
+    """
+    return _cache.peek(_cache_key(asset, fiat, payment_methods, num_prices, min_trades, min_completion_rate))
+
+
+def load_cache_snapshot():
+    """Restore cached prices saved to disk by a previous process"""
+    return _cache.load()
+
+
+def seed_cache_from_history():
+    """
+    Seed the cache for the default parameters (what /p2p/usdt serves) from
+    the latest p2p_history entry, keeping its original timestamp.
+
+    Returns:
+        bool: True if the cache was seeded
+    """
+    entry = get_latest_entry()
+    if not entry:
+        return False
+    return _cache.seed(_cache_key(), entry['price'], entry['timestamp'].timestamp())
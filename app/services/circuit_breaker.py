@@ -0,0 +1,192 @@
+"""
+Per-upstream circuit breakers with latency-adaptive timeouts.
+
+A breaker opens after failure_threshold consecutive failures. While open,
+callers skip the upstream entirely and serve their stale cached value. After
+recovery_timeout seconds it turns half-open and lets a single probe request
+through: success closes it, failure re-opens it.
+
+Timeouts adapt to the upstream's observed latency: once enough successful
+calls have been seen, the timeout is a multiple of their 95th percentile,
+clamped between min_timeout and max_timeout.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from app.metrics import UPSTREAM_LATENCY, UPSTREAM_REJECTIONS, register_collector
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, recovery_timeout=60,
+                 min_timeout=2.0, max_timeout=10.0, timeout_multiplier=3.0,
+                 latency_window=50, min_samples=5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._latencies = deque(maxlen=latency_window)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def allow_request(self):
+        """
+        Returns:
+            bool: True if the caller may hit the upstream now
+        """
+        with self._lock:
+            self._maybe_half_open()
+
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+        UPSTREAM_REJECTIONS.inc(upstream=self.name)
+        return False
+
+    def record_success(self, latency):
+        """Record a successful call that took latency seconds"""
+        with self._lock:
+            self._latencies.append(latency)
+            self._consecutive_failures = 0
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Record a failed or timed-out call"""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("Circuit breaker '%s' opened after %d consecutive failures", self.name, self._consecutive_failures)
+                self._state = OPEN
+                self._opened_at = time.time()
+                self._probe_in_flight = False
+
+    async def call_async(self, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs), recording its latency on success or a
+        failure if it raises. Callers check allow_request() first.
+        """
+        started = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException:
+            # Includes cancellation, so a half-open probe is never left in flight
+            self.record_failure()
+            UPSTREAM_LATENCY.observe(time.monotonic() - started, upstream=self.name, outcome='failure')
+            raise
+        latency = time.monotonic() - started
+        self.record_success(latency)
+        UPSTREAM_LATENCY.observe(latency, upstream=self.name, outcome='success')
+        return result
+
+    def _latency_percentile(self, percentile):
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    @property
+    def timeout(self):
+        """Seconds to wait for the upstream, adapted to its recent latency"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.max_timeout
+            adaptive = self._latency_percentile(95) * self.timeout_multiplier
+            return max(self.min_timeout, min(self.max_timeout, adaptive))
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Current state, failure count, timeout and latency percentiles
+        """
+        timeout = self.timeout
+        with self._lock:
+            self._maybe_half_open()
+            snapshot = {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'timeout_seconds': round(timeout, 3),
+                'samples': len(self._latencies),
+                'latency_p50_seconds': None,
+                'latency_p95_seconds': None,
+                'retry_at': None
+            }
+            if self._latencies:
+                snapshot['latency_p50_seconds'] = round(self._latency_percentile(50), 3)
+                snapshot['latency_p95_seconds'] = round(self._latency_percentile(95), 3)
+            if self._state == OPEN:
+                snapshot['retry_at'] = self._opened_at + self.recovery_timeout
+            return snapshot
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """Get the breaker for an upstream, creating it with kwargs on first use"""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def get_breaker_states():
+    """
+    Returns:
+        dict: Snapshot of every registered breaker, keyed by upstream name
+    """
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+@register_collector
+def _collect_breaker_metrics():
+    states = get_breaker_states()
+    lines = [
+        '# HELP circuit_breaker_state Current circuit breaker state (1 for the active state)',
+        '# TYPE circuit_breaker_state gauge'
+    ]
+    for name, snapshot in sorted(states.items()):
+        for state in (CLOSED, OPEN, HALF_OPEN):
+            active = 1 if snapshot['state'] == state else 0
+            lines.append(f'circuit_breaker_state{{upstream="{name}",state="{state}"}} {active}')
+    lines += [
+        '# HELP upstream_timeout_seconds Current adaptive timeout per upstream',
+        '# TYPE upstream_timeout_seconds gauge'
+    ]
+    for name, snapshot in sorted(states.items()):
+        lines.append(f'upstream_timeout_seconds{{upstream="{name}"}} {snapshot["timeout_seconds"]}')
+    return lines
@@ -0,0 +1,486 @@
+"""
+Storage backends for the BCV rate history
+
+rates_history talks to a HistoryStore rather than to MongoDB directly. Two
+backends are available, selected with HISTORY_BACKEND:
+
+- mongo: the rates_history collection in MongoDB (default when MONGODB_URI is set)
+- sqlite: an embedded SQLite database at HISTORY_SQLITE_PATH (default
+  .data/history.sqlite3), for local runs and small deployments without Atlas
+
+Entries are shaped like the old JSON file: {'USD': str, 'EUR': str, 'timestamp': str}.
+Both backends also store each date as an indexed ISO "day" so get_since()
+can filter in the query; entries saved before it existed get theirs the
+first time get_since() reads them.
+Webhook subscriptions and API keys are kept in the same store, next to the history.
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from app.services.bcv_dates import parse_bcv_date
+
+_DEFAULT_SQLITE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.data', 'history.sqlite3'
+)
+
+BACKENDS = ('mongo', 'sqlite')
+
+_store = None
+_lock = threading.Lock()
+
+
+def _iso_day(bcv_date):
+    """The BCV date as YYYY-MM-DD, or '' if it can't be parsed"""
+    day = parse_bcv_date(bcv_date)
+    return day.isoformat() if day else ''
+
+
+class HistoryStore(ABC):
+    """Interface implemented by every history backend"""
+
+    name = None
+
+    @abstractmethod
+    def save_rates(self, entries):
+        """
+        Upsert rates on date (the last entry wins if a date repeats)
+
+        Args:
+            entries (list): dicts with 'date', 'USD', 'EUR' and 'timestamp'
+
+        Returns:
+            list: Dates that weren't stored before
+        """
+
+    @abstractmethod
+    def insert_rates(self, entries):
+        """
+        Insert rates for dates that aren't stored yet; stored dates are left
+        untouched (the first entry wins if a date repeats)
+
+        Args:
+            entries (list): dicts with 'date', 'USD', 'EUR' and 'timestamp'
+
+        Returns:
+            list: Dates that were inserted
+        """
+
+    @abstractmethod
+    def get_all(self):
+        """
+        Returns:
+            dict: Every entry keyed by date
+        """
+
+    @abstractmethod
+    def get(self, date):
+        """
+        Returns:
+            dict: The entry for date, or None
+        """
+
+    @abstractmethod
+    def get_since(self, since):
+        """
+        Args:
+            since (date): Only entries for BCV dates after this day
+
+        Returns:
+            list: (date, entry) tuples, in no particular order
+        """
+
+    @abstractmethod
+    def get_latest(self, limit=1):
+        """
+        Returns:
+            list: Up to limit (date, entry) tuples, most recent timestamp first
+        """
+
+    @abstractmethod
+    def get_dates(self):
+        """
+        Returns:
+            list: All dates, most recent timestamp first
+        """
+
+    @abstractmethod
+    def save_webhook(self, subscription):
+        """
+        Args:
+            subscription (dict): 'id', 'owner' (the API key id), 'url', 'secret' and 'created_at'
+        """
+
+    @abstractmethod
+    def get_webhooks(self, owner=None):
+        """
+        Args:
+            owner (str): Only this API key's subscriptions (every one if None)
+
+        Returns:
+            list: Webhook subscriptions, oldest first
+        """
+
+    @abstractmethod
+    def delete_webhook(self, subscription_id, owner):
+        """
+        Returns:
+            bool: True if owner had the subscription
+        """
+
+    @abstractmethod
+    def save_api_key(self, api_key):
+        """
+        Args:
+            api_key (dict): 'id', 'name', 'key_hash', 'quota' (None for the default) and 'created_at'
+        """
+
+    @abstractmethod
+    def get_api_key(self, key_hash):
+        """
+        Returns:
+            dict: The API key with this hash, or None
+        """
+
+    @abstractmethod
+    def get_api_keys(self):
+        """
+        Returns:
+            list: Every API key, oldest first
+        """
+
+    @abstractmethod
+    def delete_api_key(self, key_id):
+        """
+        Returns:
+            dict: The deleted API key, or None if it didn't exist
+        """
+
+
+class MongoHistoryStore(HistoryStore):
+    name = 'mongo'
+    COLLECTION_NAME = 'rates_history'
+    WEBHOOKS_COLLECTION_NAME = 'webhook_subscriptions'
+    API_KEYS_COLLECTION_NAME = 'api_keys'
+
+    def _collection(self):
+        from app.db import get_db
+        return get_db()[self.COLLECTION_NAME]
+
+    @staticmethod
+    def _to_entry(doc):
+        return {'USD': doc['USD'], 'EUR': doc['EUR'], 'timestamp': doc['timestamp']}
+
+    def save_rates(self, entries):
+        from pymongo import UpdateOne
+
+        latest = {entry['date']: entry for entry in entries}
+        result = self._collection().bulk_write([
+            UpdateOne(
+                {'date': date},
+                {'$set': {'USD': entry['USD'], 'EUR': entry['EUR'], 'timestamp': entry['timestamp'], 'day': _iso_day(date)}},
+                upsert=True
+            )
+            for date, entry in latest.items()
+        ], ordered=False)
+
+        dates = list(latest)
+        return [dates[index] for index in result.upserted_ids]
+
+    def insert_rates(self, entries):
+        from pymongo import UpdateOne
+
+        first = {}
+        for entry in entries:
+            first.setdefault(entry['date'], entry)
+        if not first:
+            return []
+
+        result = self._collection().bulk_write([
+            UpdateOne(
+                {'date': date},
+                {'$setOnInsert': {'USD': entry['USD'], 'EUR': entry['EUR'], 'timestamp': entry['timestamp'], 'day': _iso_day(date)}},
+                upsert=True
+            )
+            for date, entry in first.items()
+        ], ordered=False)
+
+        dates = list(first)
+        return [dates[index] for index in result.upserted_ids]
+
+    def get_all(self):
+        return {doc['date']: self._to_entry(doc) for doc in self._collection().find()}
+
+    def get(self, date):
+        doc = self._collection().find_one({'date': date})
+        return self._to_entry(doc) if doc else None
+
+    def get_since(self, since):
+        from pymongo import UpdateOne
+
+        collection = self._collection()
+        docs = collection.find({'$or': [{'day': {'$gt': since.isoformat()}}, {'day': {'$exists': False}}]})
+
+        entries, backfill = [], []
+        for doc in docs:
+            day = doc.get('day')
+            if day is None:
+                day = _iso_day(doc['date'])
+                backfill.append(UpdateOne({'_id': doc['_id']}, {'$set': {'day': day}}))
+            if day > since.isoformat():
+                entries.append((doc['date'], self._to_entry(doc)))
+
+        if backfill:
+            collection.bulk_write(backfill, ordered=False)
+        return entries
+
+    def get_latest(self, limit=1):
+        docs = self._collection().find(sort=[('timestamp', -1)], limit=limit)
+        return [(doc['date'], self._to_entry(doc)) for doc in docs]
+
+    def get_dates(self):
+        cursor = self._collection().find({}, {'date': 1, '_id': 0}, sort=[('timestamp', -1)])
+        return [doc['date'] for doc in cursor]
+
+    def _webhooks(self):
+        from app.db import get_db
+        return get_db()[self.WEBHOOKS_COLLECTION_NAME]
+
+    def save_webhook(self, subscription):
+        self._webhooks().insert_one(dict(subscription))
+
+    def get_webhooks(self, owner=None):
+        query = {} if owner is None else {'owner': owner}
+        return list(self._webhooks().find(query, {'_id': 0}, sort=[('created_at', 1)]))
+
+    def delete_webhook(self, subscription_id, owner):
+        return self._webhooks().delete_one({'id': subscription_id, 'owner': owner}).deleted_count > 0
+
+    def _api_keys(self):
+        from app.db import get_db
+        return get_db()[self.API_KEYS_COLLECTION_NAME]
+
+    def save_api_key(self, api_key):
+        self._api_keys().insert_one(dict(api_key))
+
+    def get_api_key(self, key_hash):
+        return self._api_keys().find_one({'key_hash': key_hash}, {'_id': 0})
+
+    def get_api_keys(self):
+        return list(self._api_keys().find({}, {'_id': 0}, sort=[('created_at', 1)]))
+
+    def delete_api_key(self, key_id):
+        return self._api_keys().find_one_and_delete({'id': key_id}, {'_id': 0})
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    One connection per thread (sqlite3 connections can't be shared across
+    threads). WAL mode lets readers run while the write-behind flusher
+    writes. Every query is parameterized, so sqlite3's statement cache
+    reuses the prepared statements.
+    """
+
+    name = 'sqlite'
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS rates_history (
+            date TEXT PRIMARY KEY,
+            usd TEXT NOT NULL,
+            eur TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            day TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS rates_history_timestamp ON rates_history (timestamp)",
+        """CREATE TABLE IF NOT EXISTS webhook_subscriptions (
+            id TEXT PRIMARY KEY,
+            owner TEXT,
+            url TEXT NOT NULL,
+            secret TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS api_keys (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            key_hash TEXT NOT NULL UNIQUE,
+            quota TEXT,
+            created_at TEXT NOT NULL
+        )"""
+    )
+    # Databases created before these columns get them added. day stays NULL
+    # until get_since fills it in; subscriptions made before owners belong to no key.
+    _MIGRATIONS = (
+        ('rates_history', 'day', "ALTER TABLE rates_history ADD COLUMN day TEXT"),
+        ('webhook_subscriptions', 'owner', "ALTER TABLE webhook_subscriptions ADD COLUMN owner TEXT"),
+    )
+    _INDEXES = (
+        "CREATE INDEX IF NOT EXISTS rates_history_day ON rates_history (day)",
+        "CREATE INDEX IF NOT EXISTS webhook_subscriptions_owner ON webhook_subscriptions (owner)",
+    )
+    _INSERT = "INSERT OR IGNORE INTO rates_history (date, usd, eur, timestamp, day) VALUES (?, ?, ?, ?, ?)"
+    _UPDATE = "UPDATE rates_history SET usd = ?, eur = ?, timestamp = ? WHERE date = ?"
+    _SELECT_ALL = "SELECT date, usd, eur, timestamp FROM rates_history"
+    _SELECT_ONE = "SELECT usd, eur, timestamp FROM rates_history WHERE date = ?"
+    _SELECT_SINCE = "SELECT date, usd, eur, timestamp, day FROM rates_history WHERE day > ? OR day IS NULL"
+    _SET_DAY = "UPDATE rates_history SET day = ? WHERE date = ?"
+    _SELECT_LATEST = "SELECT date, usd, eur, timestamp FROM rates_history ORDER BY timestamp DESC LIMIT ?"
+    _SELECT_DATES = "SELECT date FROM rates_history ORDER BY timestamp DESC"
+    _WEBHOOK_COLUMNS = ('id', 'owner', 'url', 'secret', 'created_at')
+    _INSERT_WEBHOOK = "INSERT INTO webhook_subscriptions (id, owner, url, secret, created_at) VALUES (?, ?, ?, ?, ?)"
+    _SELECT_WEBHOOKS = "SELECT id, owner, url, secret, created_at FROM webhook_subscriptions ORDER BY created_at"
+    _SELECT_OWNER_WEBHOOKS = "SELECT id, owner, url, secret, created_at FROM webhook_subscriptions WHERE owner = ? ORDER BY created_at"
+    _DELETE_WEBHOOK = "DELETE FROM webhook_subscriptions WHERE id = ? AND owner = ?"
+    _API_KEY_COLUMNS = ('id', 'name', 'key_hash', 'quota', 'created_at')
+    _INSERT_API_KEY = "INSERT INTO api_keys (id, name, key_hash, quota, created_at) VALUES (?, ?, ?, ?, ?)"
+    _SELECT_API_KEY = "SELECT id, name, key_hash, quota, created_at FROM api_keys WHERE key_hash = ?"
+    _SELECT_API_KEYS = "SELECT id, name, key_hash, quota, created_at FROM api_keys ORDER BY created_at"
+    _SELECT_API_KEY_BY_ID = "SELECT id, name, key_hash, quota, created_at FROM api_keys WHERE id = ?"
+    _DELETE_API_KEY = "DELETE FROM api_keys WHERE id = ?"
+
+    def __init__(self, path):
+        # Every thread opens its own connection, and each would get a separate,
+        # empty in-memory (or temporary) database
+        if path in ('', ':memory:'):
+            raise ValueError("SQLiteHistoryStore needs a database file path, not an in-memory database")
+
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            for statement in self._SCHEMA:
+                connection.execute(statement)
+            for table, column, statement in self._MIGRATIONS:
+                if column not in {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}:
+                    connection.execute(statement)
+            for statement in self._INDEXES:
+                connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _to_entry(usd, eur, timestamp):
+        return {'USD': usd, 'EUR': eur, 'timestamp': timestamp}
+
+    def save_rates(self, entries):
+        latest = {entry['date']: entry for entry in entries}
+        new_dates = []
+
+        with self._connection() as connection:
+            for date, entry in latest.items():
+                cursor = connection.execute(self._INSERT, (date, entry['USD'], entry['EUR'], entry['timestamp'], _iso_day(date)))
+                if cursor.rowcount:
+                    new_dates.append(date)
+                else:
+                    connection.execute(self._UPDATE, (entry['USD'], entry['EUR'], entry['timestamp'], date))
+
+        return new_dates
+
+    def insert_rates(self, entries):
+        inserted = []
+
+        with self._connection() as connection:
+            for entry in entries:
+                date = entry['date']
+                cursor = connection.execute(self._INSERT, (date, entry['USD'], entry['EUR'], entry['timestamp'], _iso_day(date)))
+                if cursor.rowcount:
+                    inserted.append(date)
+
+        return inserted
+
+    def get_all(self):
+        rows = self._connection().execute(self._SELECT_ALL)
+        return {date: self._to_entry(usd, eur, timestamp) for date, usd, eur, timestamp in rows}
+
+    def get(self, date):
+        row = self._connection().execute(self._SELECT_ONE, (date,)).fetchone()
+        return self._to_entry(*row) if row else None
+
+    def get_since(self, since):
+        connection = self._connection()
+        entries, backfill = [], []
+        for date, usd, eur, timestamp, day in connection.execute(self._SELECT_SINCE, (since.isoformat(),)).fetchall():
+            if day is None:
+                day = _iso_day(date)
+                backfill.append((day, date))
+            if day > since.isoformat():
+                entries.append((date, self._to_entry(usd, eur, timestamp)))
+
+        if backfill:
+            with connection:
+                connection.executemany(self._SET_DAY, backfill)
+        return entries
+
+    def get_latest(self, limit=1):
+        rows = self._connection().execute(self._SELECT_LATEST, (limit,))
+        return [(date, self._to_entry(usd, eur, timestamp)) for date, usd, eur, timestamp in rows]
+
+    def get_dates(self):
+        return [date for date, in self._connection().execute(self._SELECT_DATES)]
+
+    def save_webhook(self, subscription):
+        with self._connection() as connection:
+            connection.execute(self._INSERT_WEBHOOK, tuple(subscription[column] for column in self._WEBHOOK_COLUMNS))
+
+    def get_webhooks(self, owner=None):
+        if owner is None:
+            rows = self._connection().execute(self._SELECT_WEBHOOKS)
+        else:
+            rows = self._connection().execute(self._SELECT_OWNER_WEBHOOKS, (owner,))
+        return [dict(zip(self._WEBHOOK_COLUMNS, row)) for row in rows]
+
+    def delete_webhook(self, subscription_id, owner):
+        with self._connection() as connection:
+            return connection.execute(self._DELETE_WEBHOOK, (subscription_id, owner)).rowcount > 0
+
+    def save_api_key(self, api_key):
+        with self._connection() as connection:
+            connection.execute(self._INSERT_API_KEY, tuple(api_key[column] for column in self._API_KEY_COLUMNS))
+
+    def get_api_key(self, key_hash):
+        row = self._connection().execute(self._SELECT_API_KEY, (key_hash,)).fetchone()
+        return dict(zip(self._API_KEY_COLUMNS, row)) if row else None
+
+    def get_api_keys(self):
+        rows = self._connection().execute(self._SELECT_API_KEYS)
+        return [dict(zip(self._API_KEY_COLUMNS, row)) for row in rows]
+
+    def delete_api_key(self, key_id):
+        with self._connection() as connection:
+            row = connection.execute(self._SELECT_API_KEY_BY_ID, (key_id,)).fetchone()
+            if not row:
+                return None
+            connection.execute(self._DELETE_API_KEY, (key_id,))
+            return dict(zip(self._API_KEY_COLUMNS, row))
+
+
+def _backend_name():
+    backend = os.environ.get('HISTORY_BACKEND')
+    if backend:
+        backend = backend.lower()
+        if backend not in BACKENDS:
+            raise RuntimeError(f"HISTORY_BACKEND must be one of {', '.join(BACKENDS)}, got {backend!r}")
+        return backend
+    return 'mongo' if os.environ.get('MONGODB_URI') else 'sqlite'
+
+
+def get_store():
+    """Get the configured history store, creating it on first use"""
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if _backend_name() == 'mongo':
+                    _store = MongoHistoryStore()
+                else:
+                    _store = SQLiteHistoryStore(os.environ.get('HISTORY_SQLITE_PATH', _DEFAULT_SQLITE_PATH))
+
+    return _store
@@ -0,0 +1,192 @@
+"""
+Service for persisting Binance P2P prices as a time series (MongoDB-backed)
+
+Prices are buffered in memory and written with insert_many by a background
+thread, so recording a price never adds a database round trip to a request.
+Without MongoDB (e.g. with SQLite rate history) prices aren't recorded and
+the history is empty.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from app.db import get_db, is_configured
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'p2p_history'
+
+# Downsampling buckets accepted by get_price_history; 'raw' skips the $group stage
+INTERVALS = ('raw', 'hour', 'day', 'week')
+_TIMEZONE = 'America/Caracas'
+_MAX_RAW_POINTS = 5000
+_DAY_MS = 24 * 60 * 60 * 1000
+
+
+def _bucket_start(interval):
+    """
+    Expression for the start of the Caracas-time hour, day or week (starting
+    on Sunday) a price falls in. Built from $dateFromParts rather than
+    $dateTrunc so it also runs on MongoDB versions before 5.0.
+    """
+    local = {'date': '$timestamp', 'timezone': _TIMEZONE}
+    parts = {
+        'year': {'$year': local},
+        'month': {'$month': local},
+        'day': {'$dayOfMonth': local},
+        'timezone': _TIMEZONE
+    }
+    if interval == 'hour':
+        parts['hour'] = {'$hour': local}
+    start = {'$dateFromParts': parts}
+    if interval == 'week':
+        # $dayOfWeek is 1 on Sunday; Caracas has no DST, so days are always 24h
+        start = {'$subtract': [start, {'$multiply': [{'$subtract': [{'$dayOfWeek': local}, 1]}, _DAY_MS]}]}
+    return start
+
+
+def get_collection():
+    """Get the MongoDB collection storing P2P price history"""
+    return get_db()[COLLECTION_NAME]
+
+
+def _insert_batch(docs):
+    get_collection().insert_many(docs, ordered=False)
+    logger.info("Saved %d P2P prices to history", len(docs))
+
+
+_writer = BatchWriter(_insert_batch, batch_size=50, flush_interval=30.0)
+
+
+def record_p2p_price(asset, fiat, price, samples):
+    """
+    Queue a computed P2P price for persistence
+
+    Args:
+        asset (str): The cryptocurrency asset (e.g. USDT)
+        fiat (str): The fiat currency (e.g. VES)
+        price (float): The averaged price
+        samples (int): Number of qualifying ads the average was computed from
+    """
+    if not is_configured():
+        return
+    _writer.add({
+        'timestamp': datetime.now(timezone.utc),
+        'meta': {'asset': asset, 'fiat': fiat},
+        'price': price,
+        'samples': samples
+    })
+
+
+def _iso(value):
+    """Format a (naive UTC, as returned by pymongo) datetime as ISO 8601"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def get_price_history(asset="USDT", fiat="VES", start=None, end=None, interval='raw'):
+    """
+    Get P2P prices in a time range, optionally downsampled server-side
+
+    Args:
+        asset (str): The cryptocurrency asset
+        fiat (str): The fiat currency
+        start (datetime): Range start (inclusive), defaults to 7 days before end
+        end (datetime): Range end (exclusive), defaults to now
+        interval (str): One of INTERVALS
+
+    Returns:
+        tuple: (points, truncated). Points are sorted oldest first. Raw points
+               have timestamp and price; downsampled points have timestamp,
+               avg, min, max, open, close and count. A raw range holding more
+               than _MAX_RAW_POINTS prices returns only the newest of them,
+               with truncated set.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if not is_configured():
+        return [], False
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+
+    match = {'$match': {
+        'meta.asset': asset,
+        'meta.fiat': fiat,
+        'timestamp': {'$gte': start, '$lt': end}
+    }}
+
+    if interval == 'raw':
+        # Newest first, one past the limit to tell whether anything was left out
+        docs = list(get_collection().aggregate([
+            match,
+            {'$sort': {'timestamp': -1}},
+            {'$limit': _MAX_RAW_POINTS + 1},
+            {'$project': {'_id': 0, 'timestamp': 1, 'price': 1}}
+        ]))
+        truncated = len(docs) > _MAX_RAW_POINTS
+        return [
+            {'timestamp': _iso(doc['timestamp']), 'price': doc['price']}
+            for doc in reversed(docs[:_MAX_RAW_POINTS])
+        ], truncated
+
+    pipeline = [
+        match,
+        {'$sort': {'timestamp': 1}},
+        {'$group': {
+            '_id': _bucket_start(interval),
+            'avg': {'$avg': '$price'},
+            'min': {'$min': '$price'},
+            'max': {'$max': '$price'},
+            'open': {'$first': '$price'},
+            'close': {'$last': '$price'},
+            'count': {'$sum': 1}
+        }},
+        {'$sort': {'_id': 1}}
+    ]
+
+    return [
+        {
+            'timestamp': _iso(doc['_id']),
+            'avg': int(doc['avg'] * 1000) / 1000,
+            'min': doc['min'],
+            'max': doc['max'],
+            'open': doc['open'],
+            'close': doc['close'],
+            'count': doc['count']
+        }
+        for doc in get_collection().aggregate(pipeline)
+    ], False
+
+
+def get_latest_entry(asset="USDT", fiat="VES"):
+    """
+    Get the most recently persisted P2P price and when it was computed
+
+    Returns:
+        dict: price and timestamp (timezone-aware datetime), or None if nothing has been saved yet
+    """
+    if not is_configured():
+        return None
+    doc = get_collection().find_one(
+        {'meta.asset': asset, 'meta.fiat': fiat},
+        sort=[('timestamp', -1)]
+    )
+    if not doc:
+        return None
+
+    timestamp = doc['timestamp']
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return {'price': doc['price'], 'timestamp': timestamp}
+
+
+def get_latest_price(asset="USDT", fiat="VES"):
+    """
+    Get the most recently persisted P2P price
+
+    Returns:
+        float: The latest price, or None if nothing has been saved yet
+    """
+    entry = get_latest_entry(asset, fiat)
+    return entry['price'] if entry else None
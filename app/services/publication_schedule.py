@@ -0,0 +1,157 @@
+"""
+When to re-scrape BCV, based on when it actually publishes
+
+BCV publishes the next business day's rate once a day, usually in the
+afternoon. Instead of a flat cache TTL, bcv_scraper asks max_age() how old
+its cached rates may be right now:
+
+- the cached date is already after today: today's publication was seen, so
+  stop until tomorrow (DONE_MAX_AGE)
+- weekends and holidays: nothing is published (OFF_DAY_MAX_AGE)
+- business day, before the publication window (BEFORE_WINDOW_MAX_AGE)
+- inside the window: poll often (IN_WINDOW_MAX_AGE)
+- after the window with nothing new yet: publication is late (LATE_MAX_AGE)
+
+The window is learned from rates_history. A date's stored timestamp is the
+last time it was scraped while still current, i.e. just before the next
+date appeared, so the spread of those times of day (Caracas time) brackets
+the publication time. It is recomputed every few hours and falls back to
+DEFAULT_WINDOW until there is enough history.
+
+Extra holidays (e.g. Carnival and Holy Week, which move every year) can be
+listed in BCV_HOLIDAYS as comma-separated YYYY-MM-DD dates.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from app.services.bcv_dates import parse_bcv_date
+
+logger = logging.getLogger(__name__)
+
+# Venezuela has been on UTC-4 without DST since 2016
+CARACAS = timezone(timedelta(hours=-4))
+
+IN_WINDOW_MAX_AGE = float(os.environ.get('BCV_IN_WINDOW_POLL_SECONDS', 5 * 60))
+LATE_MAX_AGE = 30 * 60
+BEFORE_WINDOW_MAX_AGE = 6 * 60 * 60
+OFF_DAY_MAX_AGE = 12 * 60 * 60
+DONE_MAX_AGE = 12 * 60 * 60
+
+DEFAULT_WINDOW = (dtime(15, 0), dtime(19, 0))
+
+_MIN_SAMPLES = 5
+_SAMPLE_SIZE = 60
+_WINDOW_PADDING = timedelta(minutes=30)
+_WINDOW_REFRESH_SECONDS = 6 * 60 * 60
+
+# Fixed-date national and bank holidays (month, day)
+_FIXED_HOLIDAYS = {(1, 1), (4, 19), (5, 1), (6, 24), (7, 5), (7, 24), (10, 12), (12, 24), (12, 25), (12, 31)}
+
+_window = None
+_window_computed_at = 0.0
+_lock = threading.Lock()
+
+
+def _parse_holidays(value):
+    holidays = set()
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            try:
+                holidays.add(date.fromisoformat(item))
+            except ValueError:
+                logger.warning("Ignoring invalid BCV_HOLIDAYS entry: %s", item)
+    return frozenset(holidays)
+
+
+_EXTRA_HOLIDAYS = _parse_holidays(os.environ.get('BCV_HOLIDAYS', ''))
+
+
+def is_business_day(day):
+    return day.weekday() < 5 and (day.month, day.day) not in _FIXED_HOLIDAYS and day not in _EXTRA_HOLIDAYS
+
+
+def _to_caracas(timestamp):
+    # Stored timestamps are naive server-local time (see save_rate_to_history)
+    return datetime.fromisoformat(timestamp).astimezone(CARACAS)
+
+
+def learn_window(timestamps):
+    """
+    Estimate the publication window from history timestamps
+
+    Args:
+        timestamps (list): ISO timestamps of past dates, excluding the current one
+
+    Returns:
+        tuple: (start, end) times of day in Caracas time
+    """
+    minutes = sorted(
+        moment.hour * 60 + moment.minute
+        for moment in map(_to_caracas, timestamps)
+        # Backfilled entries carry a midnight timestamp, not a scrape time
+        if (moment.hour, moment.minute, moment.second) != (0, 0, 0) or moment.microsecond
+    )
+    if len(minutes) < _MIN_SAMPLES:
+        return DEFAULT_WINDOW
+
+    low = minutes[len(minutes) // 10]
+    high = minutes[(len(minutes) * 9) // 10]
+    start = max(0, low - int(_WINDOW_PADDING.total_seconds() // 60))
+    end = min(24 * 60 - 1, high + int(_WINDOW_PADDING.total_seconds() // 60))
+    return dtime(start // 60, start % 60), dtime(end // 60, end % 60)
+
+
+def get_window():
+    """
+    Returns:
+        tuple: The learned (start, end) publication window, recomputed every few hours
+    """
+    global _window, _window_computed_at
+
+    if _window is None or time.time() - _window_computed_at > _WINDOW_REFRESH_SECONDS:
+        with _lock:
+            if _window is None or time.time() - _window_computed_at > _WINDOW_REFRESH_SECONDS:
+                from app.services.rates_history import get_recent_rates
+
+                try:
+                    recent = get_recent_rates(_SAMPLE_SIZE + 1)
+                    # The newest date is still current; its timestamp says nothing about publication
+                    _window = learn_window([entry['timestamp'] for _, entry in recent[1:]])
+                except Exception as e:
+                    logger.warning("Error learning the BCV publication window: %s", e)
+                    _window = _window or DEFAULT_WINDOW
+                _window_computed_at = time.time()
+
+    return _window
+
+
+def max_age(cached_rates, now=None):
+    """
+    How old the cached BCV rates may be before they must be re-scraped
+
+    Args:
+        cached_rates (dict): The cached rates (with 'date'), or None
+        now (datetime): Current time (default: now)
+
+    Returns:
+        float: Maximum age in seconds
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(CARACAS)
+    today = now.date()
+
+    cached_date = parse_bcv_date(cached_rates.get('date')) if cached_rates else None
+    if cached_date and cached_date > today:
+        return DONE_MAX_AGE
+
+    if not is_business_day(today):
+        return OFF_DAY_MAX_AGE
+
+    start, end = get_window()
+    if now.time() < start:
+        return BEFORE_WINDOW_MAX_AGE
+    if now.time() <= end:
+        return IN_WINDOW_MAX_AGE
+    return LATE_MAX_AGE
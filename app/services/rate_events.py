@@ -0,0 +1,168 @@
+"""
+In-process broadcaster for new BCV rates and P2P prices (behind /rates/stream)
+
+The scrapers publish an event whenever they see a new BCV date or a new P2P
+price. Every /rates/stream subscriber gets its own small queue fed by the one
+broadcaster, so idle subscribers cost nothing upstream. While anyone is
+subscribed, a single background poller keeps BCV refreshed on its
+publication schedule (see publication_schedule) and refreshes Binance
+whenever its cached price is older than a short poll interval (instead of
+the much longer cache TTL), so new values are noticed promptly.
+
+In production streams are served by the stream service (stream_api.py),
+whose gevent worker holds a greenlet per open stream rather than a thread;
+it sets RATES_STREAM_MAX_SUBSCRIBERS in render.yaml. Each process has its
+own broadcaster and poller. Where the gthread app serves streams itself
+(RATES_STREAM_URL unset, e.g. in development), each open one blocks a thread
+for as long as it stays connected, so the default cap is kept at 8 of the 64
+threads to leave the rest for regular requests.
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+# Hard cap on open streams per process. The default suits the gthread worker,
+# where each stream holds a thread; the evented stream service raises it
+MAX_SUBSCRIBERS = int(os.environ.get('RATES_STREAM_MAX_SUBSCRIBERS', 8))
+P2P_POLL_SECONDS = float(os.environ.get('RATES_STREAM_P2P_POLL_SECONDS', 10 * 60))
+
+# Events kept per subscriber; a subscriber that falls further behind loses the oldest
+_QUEUE_SIZE = 16
+_POLLER_TICK_SECONDS = 5.0
+
+
+class Broadcaster:
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._last = {}  # event name -> latest (id, event, data), replayed to new subscribers
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def latest(self, event):
+        """
+        Returns:
+            tuple: The last (id, event, data) published for event, or None
+        """
+        return self._last.get(event)
+
+    def subscribe(self):
+        """
+        Returns:
+            queue.Queue: Receives (id, event, data) tuples, starting with the
+                         latest event of each kind; None if the subscriber limit is reached
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = queue.Queue(maxsize=_QUEUE_SIZE)
+            for message in sorted(self._last.values()):
+                subscription.put_nowait(message)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber without ever blocking the publisher"""
+        with self._lock:
+            message = (next(self._ids), event, data)
+            self._last[event] = message
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            while True:
+                try:
+                    subscription.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        pass
+
+
+broadcaster = Broadcaster()
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def publish_rates(rates):
+    """Announce a new BCV date"""
+    broadcaster.publish('rates', rates)
+
+
+def publish_p2p_price(asset, fiat, price):
+    """Announce a new Binance P2P price"""
+    broadcaster.publish('p2p', {'asset': asset, 'fiat': fiat, 'price': price})
+
+
+def format_event(message):
+    """Serialize an (id, event, data) message in the text/event-stream format"""
+    event_id, event, data = message
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def subscribe():
+    """
+    Subscribe to rate events and make sure the poller is running
+
+    Returns:
+        queue.Queue: See Broadcaster.subscribe; None if the subscriber limit is reached
+    """
+    subscription = broadcaster.subscribe()
+    if subscription is None:
+        return None
+
+    if broadcaster.latest('rates') is None:
+        from app.services.bcv_scraper import get_cached_rates
+
+        rates = get_cached_rates()
+        if rates:
+            subscription.put_nowait((0, 'rates', rates))
+
+    _ensure_poller()
+    return subscription
+
+
+def unsubscribe(subscription):
+    broadcaster.unsubscribe(subscription)
+
+
+def _ensure_poller():
+    global _poller
+
+    with _poller_lock:
+        if _poller is None:
+            _poller = threading.Thread(target=_poll, daemon=True)
+            _poller.start()
+
+
+def _poll():
+    """Keep BCV and Binance fresh until the last subscriber leaves"""
+    global _poller
+
+    from app.services.bcv_scraper import scrape_exchange_rates
+    from app.services.binance_p2p import get_binance_p2p_price
+
+    while True:
+        with _poller_lock:
+            if broadcaster.subscriber_count == 0:
+                _poller = None
+                return
+
+        # No-ops while the cached values are still fresh enough
+        scrape_exchange_rates()
+        get_binance_p2p_price(max_age=P2P_POLL_SECONDS)
+
+        time.sleep(_POLLER_TICK_SECONDS)
@@ -1,51 +1,73 @@
 """
-Service for managing historical exchange rates (MongoDB-backed)
+Service for managing historical exchange rates
+
+Storage is delegated to the configured history store (MongoDB or SQLite, see
+history_store). Saves go through a write-behind queue: save_rate_to_history
+only buffers the rate, and a background thread writes the buffered rates in
+one batch, so the scrape path never waits on the database.
 """
+import functools
+import logging
 from datetime import datetime
-from app.db import get_db
+from app.metrics import HISTORY_LATENCY
+from app.profiling import phase
+from app.services.batch_writer import BatchWriter
+from app.services.history_store import get_store
+from app.services.bcv_dates import parse_bcv_date
+from app.services.webhooks import notify_rate_published
+from app.tracing import span
 
-COLLECTION_NAME = 'rates_history'
+logger = logging.getLogger(__name__)
 
 
-def get_collection():
-    """Get the MongoDB collection storing rate history"""
-    return get_db()[COLLECTION_NAME]
+def _timed(operation):
+    """Observe HISTORY_LATENCY for the wrapped function, labelled with the active backend, and time it as a request phase and span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_store().name
+            with HISTORY_LATENCY.time(backend=backend, operation=operation), phase(f'history_{operation}'), \
+                    span(f'history.{operation}', backend=backend):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
-def _to_entry(doc):
-    """Strip the Mongo _id and shape a document like the old JSON value"""
-    return {
-        'USD': doc['USD'],
-        'EUR': doc['EUR'],
-        'timestamp': doc['timestamp']
-    }
+@_timed('save_rate_to_history')
+def _write_batch(entries):
+    """Write buffered rates, keeping only the latest entry queued per date, and announce new dates"""
+    latest = {entry['date']: entry for entry in entries}
+    new_dates = get_store().save_rates(entries)
+    logger.info("Saved %d rates to history (%d new)", len(latest), len(new_dates))
+
+    for date in new_dates:
+        try:
+            notify_rate_published(date, latest[date])
+        except Exception as e:
+            logger.error("Error queueing webhooks for %s: %s", date, e)
+
+
+_writer = BatchWriter(_write_batch, batch_size=50, flush_interval=2.0)
 
 
 def save_rate_to_history(date, usd, eur):
     """
-    Save a rate entry to history
+    Queue a rate entry for saving to history (returns without touching the database)
 
     Args:
         date (str): Date in format "DD Month YYYY" or any string format
         usd (str): USD rate
         eur (str): EUR rate
     """
-    try:
-        collection = get_collection()
-        collection.update_one(
-            {'date': date},
-            {'$set': {
-                'USD': usd,
-                'EUR': eur,
-                'timestamp': datetime.now().isoformat()
-            }},
-            upsert=True
-        )
-        print(f"Rate saved to history: {date}")
-    except Exception as e:
-        print(f"Error saving to history: {e}")
+    _writer.add({
+        'date': date,
+        'USD': usd,
+        'EUR': eur,
+        'timestamp': datetime.now().isoformat()
+    })
 
 
+@_timed('get_all_rates')
 def get_all_rates():
     """
     Get all historical rates
@@ -53,10 +75,10 @@ def get_all_rates():
     Returns:
         dict: All rates with dates as keys
     """
-    collection = get_collection()
-    return {doc['date']: _to_entry(doc) for doc in collection.find()}
+    return get_store().get_all()
 
 
+@_timed('get_rate_by_date')
 def get_rate_by_date(date):
     """
     Get rate for a specific date
@@ -67,11 +89,10 @@ def get_rate_by_date(date):
     Returns:
         dict: Rate data for that date or None
     """
-    collection = get_collection()
-    doc = collection.find_one({'date': date})
-    return _to_entry(doc) if doc else None
+    return get_store().get(date)
 
 
+@_timed('get_latest_rate')
 def get_latest_rate():
     """
     Get the most recent rate from history
@@ -79,15 +100,25 @@ def get_latest_rate():
     Returns:
         tuple: (date, rate_data) or (None, None)
     """
-    collection = get_collection()
-    doc = collection.find_one(sort=[('timestamp', -1)])
+    latest = get_store().get_latest(1)
+    return latest[0] if latest else (None, None)
 
-    if not doc:
-        return None, None
 
-    return doc['date'], _to_entry(doc)
+@_timed('get_recent_rates')
+def get_recent_rates(limit):
+    """
+    Get the most recently saved rates
+
+    Args:
+        limit (int): Maximum number of entries
+
+    Returns:
+        list: (date, rate_data) tuples, most recent first
+    """
+    return get_store().get_latest(limit)
 
 
+@_timed('get_available_dates')
 def get_available_dates():
     """
     Get list of all available dates in history
@@ -95,10 +126,40 @@ def get_available_dates():
     Returns:
         list: List of date strings sorted by most recent first
     """
-    collection = get_collection()
-    return [doc['date'] for doc in collection.find(sort=[('timestamp', -1)])]
+    return get_store().get_dates()
+
+
+@_timed('get_columnar_history')
+def get_columnar_history(since=None):
+    """
+    Get the history as parallel arrays ordered by date, for clients that keep
+    their own copy and only fetch the days they're missing
+
+    Args:
+        since (date): Only include dates after this one
+
+    Returns:
+        dict: {'date': [ISO dates], 'USD': [rates], 'EUR': [rates]}; entries
+              whose date can't be parsed are left out
+    """
+    store = get_store()
+    entries = store.get_all().items() if since is None else store.get_since(since)
+
+    by_date = {}
+    for bcv_date, entry in entries:
+        date = parse_bcv_date(bcv_date)
+        if date and (since is None or date > since):
+            by_date[date] = entry
+
+    dates = sorted(by_date)
+    return {
+        'date': [date.isoformat() for date in dates],
+        'USD': [by_date[date]['USD'] for date in dates],
+        'EUR': [by_date[date]['EUR'] for date in dates]
+    }
 
 
+@_timed('get_usd_percentage_change')
 def get_usd_percentage_change():
     """
     Calculate the percentage change of USD rate from the last saved day
@@ -107,14 +168,12 @@ def get_usd_percentage_change():
         dict: Contains previous_date, previous_rate, current_date, current_rate,
               percentage_change, and change_direction, or None if insufficient data
     """
-    collection = get_collection()
-    docs = list(collection.find(sort=[('timestamp', -1)], limit=2))
+    latest = get_store().get_latest(2)
 
-    if len(docs) < 2:
+    if len(latest) < 2:
         return None
 
-    current_data, previous_data = docs[0], docs[1]
-    current_date, previous_date = current_data['date'], previous_data['date']
+    (current_date, current_data), (previous_date, previous_data) = latest
 
     # Remove commas and convert to float
     current_usd = float(current_data['USD'].replace(',', '.'))
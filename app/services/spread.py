@@ -0,0 +1,210 @@
+"""
+Service for the BCV vs Binance P2P spread ("brecha") series
+
+The spread is recomputed incrementally whenever a new BCV rate is published
+or a P2P price is saved, against the last known value of the other side, and
+appended to the spread_history collection. Those last known values are
+loaded from history once at startup, so the scrapers never wait on the
+database here. The latest row is also kept in memory so it can be served
+without touching the database. Without MongoDB only that latest row is kept.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from app.db import get_db, is_configured
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'spread_history'
+
+# The spread is only tracked for the pair the finance team compares against BCV
+_ASSET = 'USDT'
+_FIAT = 'VES'
+_MAX_POINTS = 5000
+
+_last_bcv = None     # (date, usd) of the latest BCV rate seen
+_last_p2p = None     # latest USDT/VES price seen
+_latest = None       # latest spread row
+_lock = threading.Lock()
+
+
+def get_collection():
+    """Get the MongoDB collection storing the spread series"""
+    return get_db()[COLLECTION_NAME]
+
+
+def _insert_batch(docs):
+    get_collection().insert_many(docs, ordered=False)
+
+
+_writer = BatchWriter(_insert_batch, batch_size=20, flush_interval=30.0)
+
+
+def _latest_bcv_from_history():
+    from app.services.rates_history import get_latest_rate
+
+    date, entry = get_latest_rate()
+    if date:
+        return date, float(entry['USD'].replace(',', '.'))
+    return None
+
+
+def _latest_p2p_from_history():
+    from app.services.p2p_history import get_latest_price
+
+    return get_latest_price(_ASSET, _FIAT)
+
+
+def seed_from_history():
+    """
+    Load the last saved BCV rate and P2P price, so the first value seen after
+    a restart can be compared against the other side. Reads the databases, so
+    it is run once at startup in the background (see warm_start); values seen
+    in the meantime are kept.
+    """
+    global _last_bcv, _last_p2p
+
+    bcv = _latest_bcv_from_history()
+    p2p = _latest_p2p_from_history() if is_configured() else None
+
+    with _lock:
+        if _last_bcv is None:
+            _last_bcv = bcv
+        if _last_p2p is None:
+            _last_p2p = p2p
+
+
+def _update():
+    """Append a spread row from the last known BCV rate and P2P price (call with _lock held)"""
+    global _latest
+
+    bcv_date, bcv_usd = _last_bcv
+    if bcv_usd == 0:
+        return
+
+    spread = _last_p2p - bcv_usd
+    spread_pct = spread / bcv_usd * 100
+
+    row = {
+        'timestamp': datetime.now(timezone.utc),
+        'bcv_date': bcv_date,
+        'bcv_usd': bcv_usd,
+        'p2p_price': _last_p2p,
+        # Truncate to 3 decimal places (not rounded), like the other computed values
+        'spread': int(spread * 1000) / 1000,
+        'spread_pct': int(spread_pct * 1000) / 1000
+    }
+    _latest = row
+    if is_configured():
+        _writer.add(dict(row))
+
+
+def on_bcv_rate(date, usd):
+    """
+    Record a newly published BCV rate and update the spread. The same date
+    and rate seen again adds no row.
+
+    Args:
+        date (str): BCV date string
+        usd (str): USD rate as scraped (comma decimal separator)
+    """
+    global _last_bcv
+
+    try:
+        bcv = (date, float(usd.replace(',', '.')))
+        with _lock:
+            if bcv == _last_bcv:
+                return
+            _last_bcv = bcv
+            if _last_p2p is not None:
+                _update()
+    except Exception as e:
+        logger.error("Error updating spread: %s", e)
+
+
+def on_p2p_price(asset, fiat, price):
+    """
+    Record a newly saved P2P price and update the spread
+
+    Args:
+        asset (str): The cryptocurrency asset
+        fiat (str): The fiat currency
+        price (float): The averaged P2P price
+    """
+    global _last_p2p
+
+    if (asset, fiat) != (_ASSET, _FIAT):
+        return
+
+    try:
+        with _lock:
+            _last_p2p = price
+            if _last_bcv is not None:
+                _update()
+    except Exception as e:
+        logger.error("Error updating spread: %s", e)
+
+
+def _to_entry(doc):
+    """Strip the Mongo _id and format the timestamp"""
+    timestamp = doc['timestamp']
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return {
+        'timestamp': timestamp.isoformat(),
+        'bcv_date': doc['bcv_date'],
+        'bcv_usd': doc['bcv_usd'],
+        'p2p_price': doc['p2p_price'],
+        'spread': doc['spread'],
+        'spread_pct': doc['spread_pct']
+    }
+
+
+def get_latest_spread():
+    """
+    Get the most recent spread
+
+    Returns:
+        dict: The latest spread row, or None if no spread has been computed
+    """
+    global _latest
+
+    latest = _latest
+    if latest is None:
+        if not is_configured():
+            return None
+        doc = get_collection().find_one(sort=[('timestamp', -1)])
+        if not doc:
+            return None
+        with _lock:
+            if _latest is None:
+                _latest = doc
+            latest = _latest
+
+    return _to_entry(latest)
+
+
+def get_spread_history(start=None, end=None):
+    """
+    Get precomputed spread rows in a time range
+
+    Args:
+        start (datetime): Range start (inclusive), defaults to 30 days before end
+        end (datetime): Range end (exclusive), defaults to now
+
+    Returns:
+        list: Spread rows sorted oldest first
+    """
+    if not is_configured():
+        return []
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+
+    cursor = get_collection().find(
+        {'timestamp': {'$gte': start, '$lt': end}},
+        sort=[('timestamp', 1)],
+        limit=_MAX_POINTS
+    )
+    return [_to_entry(doc) for doc in cursor]
@@ -1,28 +1,176 @@
 """
 In-process TTL cache for expensive live scrape/API calls.
 
-The app runs as a single gunicorn worker (see render.yaml), so a plain
-module-level dict is sufficient - no cross-process synchronization needed.
+The app runs as a single gunicorn worker (see render.yaml), so nothing is
+shared across processes, but that worker serves requests on many threads:
+every change to a cache happens under its lock.
+
+Caches created with persist=True snapshot their entries (with the original
+timestamps) to CACHE_SNAPSHOT_DIR. A change schedules a snapshot
+CACHE_SNAPSHOT_DELAY_SECONDS later on a background timer, so requests never
+write to disk and a burst of changes shares one write; a pending snapshot is
+also written at exit. load() restores them at startup so a restarted process
+comes up warm. Caches created with max_entries drop their oldest entry when
+a new key would exceed it.
 """
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
 import time
+from app.metrics import CACHE_REQUESTS
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.cache')
+_SNAPSHOT_DELAY_SECONDS = float(os.environ.get('CACHE_SNAPSHOT_DELAY_SECONDS', 5))
+
+
+def _to_json_key(key):
+    return list(_to_json_key(part) for part in key) if isinstance(key, tuple) else key
+
+
+def _from_json_key(key):
+    return tuple(_from_json_key(part) for part in key) if isinstance(key, list) else key
 
 
 class TTLCache:
-    def __init__(self, ttl_seconds):
+    def __init__(self, ttl_seconds, name='default', persist=False, max_entries=None):
         self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.persist = persist
+        self.max_entries = max_entries
         self._store = {}
+        self._lock = threading.Lock()
+        self._dump_lock = threading.Lock()
+        self._dump_timer = None
+        if persist:
+            atexit.register(self._dump_pending)
+
+    @property
+    def snapshot_path(self):
+        snapshot_dir = os.environ.get('CACHE_SNAPSHOT_DIR', _DEFAULT_SNAPSHOT_DIR)
+        return os.path.join(snapshot_dir, f'{self.name}.json')
 
-    def get(self, key):
+    def get(self, key, max_age=None):
         """
+        Args:
+            max_age (float): Treat entries older than this many seconds as
+                             stale, instead of the cache's TTL
+
         Returns:
             tuple: (value, is_fresh). value is None if the key was never set.
         """
-        entry = self._store.get(key)
-        if not entry:
-            return None, False
+        with span('cache.get', cache=self.name) as lookup:
+            entry = self._store.get(key)
+            if not entry:
+                CACHE_REQUESTS.inc(cache=self.name, result='miss')
+                lookup.set('result', 'miss')
+                return None, False
+
+            ttl = self.ttl_seconds if max_age is None else max_age
+            is_fresh = (time.time() - entry['timestamp']) < ttl
+            result = 'hit' if is_fresh else 'stale'
+            CACHE_REQUESTS.inc(cache=self.name, result=result)
+            lookup.set('result', result)
+            return entry['value'], is_fresh
+
+    def peek(self, key):
+        """
+        Read an entry without counting it in cache metrics or tracing it,
+        for the app's own checks on what is cached (not request lookups)
 
-        is_fresh = (time.time() - entry['timestamp']) < self.ttl_seconds
-        return entry['value'], is_fresh
+        Returns:
+            object: The value, fresh or stale, or None if the key was never set
+        """
+        entry = self._store.get(key)
+        return entry['value'] if entry else None
 
     def set(self, key, value):
-        self._store[key] = {'value': value, 'timestamp': time.time()}
+        with self._lock:
+            if self.max_entries and key not in self._store and len(self._store) >= self.max_entries:
+                self._store.pop(next(iter(self._store)), None)
+            self._store[key] = {'value': value, 'timestamp': time.time()}
+            self._snapshot_later()
+
+    def seed(self, key, value, timestamp):
+        """
+        Set a value computed at an earlier time (epoch seconds), keeping its
+        original freshness. Ignored if the cache already holds a newer entry.
+        """
+        with self._lock:
+            entry = self._store.get(key)
+            if entry and entry['timestamp'] >= timestamp:
+                return False
+            self._store[key] = {'value': value, 'timestamp': timestamp}
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._store.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def _snapshot_later(self):
+        """Schedule a snapshot unless one is already pending (call with self._lock held)"""
+        if not self.persist or self._dump_timer is not None:
+            return
+        self._dump_timer = threading.Timer(_SNAPSHOT_DELAY_SECONDS, self.dump)
+        self._dump_timer.daemon = True
+        self._dump_timer.start()
+
+    def _dump_pending(self):
+        if self._dump_timer is not None:
+            self.dump()
+
+    def dump(self):
+        """Write all entries to the snapshot file (atomically replaced)"""
+        with self._lock:
+            if self._dump_timer is not None:
+                self._dump_timer.cancel()
+                self._dump_timer = None
+            entries = [
+                {'key': _to_json_key(key), 'value': entry['value'], 'timestamp': entry['timestamp']}
+                for key, entry in self._store.items()
+            ]
+
+        path = self.snapshot_path
+        tmp_path = None
+        with self._dump_lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path),
+                                                 prefix=f'{self.name}.', suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    json.dump(entries, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning("Error writing %s cache snapshot: %s", self.name, e)
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def load(self):
+        """
+        Restore entries from the snapshot file, if there is one
+
+        Returns:
+            int: Number of entries restored
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning("Error reading %s cache snapshot: %s", self.name, e)
+            return 0
+
+        return sum(
+            self.seed(_from_json_key(entry['key']), entry['value'], entry['timestamp'])
+            for entry in entries
+        )
@@ -0,0 +1,41 @@
+"""
+Warm-start the scraper caches after a restart or free-tier spin-up.
+
+Disk snapshots are loaded synchronously (a small local file read). Then, in
+a background thread, the MongoDB connection pool is warmed up and anything
+missing or older than the latest saved history is seeded from the database,
+so the first requests are served from the cache instead of triggering a full
+BCV scrape or Binance crawl. The spread's last BCV rate and P2P price are
+loaded the same way.
+"""
+import logging
+import threading
+from app import db
+from app.services import bcv_scraper, binance_p2p, spread
+
+logger = logging.getLogger(__name__)
+
+
+def _seed_from_database():
+    db.warm_up()
+
+    for name, seed in (('BCV', bcv_scraper.seed_cache_from_history), ('Binance P2P', binance_p2p.seed_cache_from_history)):
+        try:
+            if seed():
+                logger.info("Warm start: seeded %s cache from history", name)
+        except Exception as e:
+            logger.warning("Warm start: could not seed %s cache from history: %s", name, e)
+
+    try:
+        spread.seed_from_history()
+    except Exception as e:
+        logger.warning("Warm start: could not seed the spread from history: %s", e)
+
+
+def restore_caches():
+    """Restore cache snapshots, then warm up MongoDB and seed from history in the background"""
+    restored = bcv_scraper.load_cache_snapshot() + binance_p2p.load_cache_snapshot()
+    if restored:
+        logger.info("Warm start: restored %d cache entries from disk", restored)
+
+    threading.Thread(target=_seed_from_database, daemon=True).start()
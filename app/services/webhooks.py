@@ -0,0 +1,254 @@
+"""
+Webhook subscriptions and delivery for newly published BCV rates
+
+When the rate history write-behind flush stores a date it hadn't seen before,
+every subscription gets a signed POST. Deliveries run on a bounded thread
+pool sharing one pooled httpx client. Each attempt has a short timeout, and
+failed attempts are re-queued after a backoff delay instead of sleeping in a
+worker, so a slow or failing subscriber can't stall deliveries to the others.
+
+Each subscription belongs to the API key that created it, and only that key
+can list or delete it. The built-in API_KEY is public, so it can't subscribe.
+
+Subscription URLs must resolve only to public addresses, so the API can't
+be used to reach loopback, link-local (cloud metadata), private or reserved
+hosts. The host is resolved and checked again before every delivery attempt, since
+its DNS may have been changed to point inward after it was registered, and
+the request is sent to the checked address. Redirects are not followed.
+
+Requests carry:
+    X-Webhook-Id         the subscription id
+    X-Webhook-Timestamp  unix seconds when the request was signed
+    X-Webhook-Signature  sha256=<hex HMAC-SHA256 of "<timestamp>.<body>" with the subscription secret>
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from app.metrics import WEBHOOK_DELIVERIES, WEBHOOK_LATENCY
+from app.services.history_store import get_store
+
+logger = logging.getLogger(__name__)
+
+EVENT_RATE_PUBLISHED = 'rate.published'
+
+_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 4))
+_TIMEOUT_SECONDS = 5.0
+_MAX_ATTEMPTS = 5
+_RETRY_BACKOFF_SECONDS = 2.0  # doubled after each failed attempt
+
+_executor = None
+_client = None
+_lock = threading.Lock()
+
+
+class UnresolvableURL(Exception):
+    pass
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%')[0])  # drop an IPv6 zone id
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _resolve(url):
+    """
+    Returns:
+        list: Addresses the URL's host resolves to
+
+    Raises:
+        UnresolvableURL: If the host can't be resolved
+    """
+    parsed = urlparse(url)
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                                   type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise UnresolvableURL(str(e)) from e
+    return [info[4][0] for info in infos]
+
+
+def _pinned_request(url, address):
+    """
+    Returns:
+        tuple: (url, headers, extensions) sending the request for url to
+               address, with the original Host header and TLS server name
+    """
+    parsed = urlparse(url)
+    userinfo, _, original_host = parsed.netloc.rpartition('@')
+    host = f'[{address}]' if ':' in address else address
+    netloc = f'{host}:{parsed.port}' if parsed.port else host
+    if userinfo:
+        netloc = f'{userinfo}@{netloc}'
+    extensions = {'sni_hostname': parsed.hostname} if parsed.scheme == 'https' else {}
+    return parsed._replace(netloc=netloc).geturl(), {'Host': original_host}, extensions
+
+
+def url_error(url):
+    """
+    Args:
+        url (str): A subscription URL
+
+    Returns:
+        str: Why webhooks can't be sent to the URL, or None if they can
+    """
+    parsed = urlparse(url) if isinstance(url, str) else None
+    if parsed is None or parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return "'url' must be an http(s) URL"
+    try:
+        if not all(_is_public_address(address) for address in _resolve(url)):
+            return "'url' must resolve to a public address"
+    except UnresolvableURL:
+        return "'url' host could not be resolved"
+    return None
+
+
+def create_subscription(owner, url, secret=None):
+    """
+    Args:
+        owner (str): Id of the API key creating the subscription
+        url (str): http(s) URL to POST events to
+        secret (str): Signing secret (generated if omitted)
+
+    Returns:
+        dict: The stored subscription, including its secret
+    """
+    subscription = {
+        'id': uuid.uuid4().hex,
+        'owner': owner,
+        'url': url,
+        'secret': secret or secrets.token_hex(32),
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    get_store().save_webhook(subscription)
+    return subscription
+
+
+def list_subscriptions(owner):
+    """
+    Returns:
+        list: The owner's subscriptions, without their secrets
+    """
+    return [
+        {key: value for key, value in subscription.items() if key != 'secret'}
+        for subscription in get_store().get_webhooks(owner)
+    ]
+
+
+def delete_subscription(owner, subscription_id):
+    """
+    Returns:
+        bool: True if the owner had this subscription
+    """
+    return get_store().delete_webhook(subscription_id, owner)
+
+
+def sign(secret, timestamp, body):
+    """
+    Returns:
+        str: Hex HMAC-SHA256 of "<timestamp>.<body>"
+    """
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _get_executor():
+    global _executor, _client
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                import httpx
+
+                _client = httpx.Client(
+                    timeout=_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(max_connections=_WORKERS, max_keepalive_connections=_WORKERS)
+                )
+                _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix='webhook')
+    return _executor
+
+
+def _deliver(subscription, body, attempt=1):
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Id': subscription['id'],
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': f"sha256={sign(subscription['secret'], timestamp, body)}"
+    }
+
+    try:
+        addresses = _resolve(subscription['url'])
+        if not all(_is_public_address(address) for address in addresses):
+            WEBHOOK_DELIVERIES.inc(outcome='blocked')
+            logger.warning("Webhook %s not delivered: %s no longer resolves to a public address",
+                           subscription['id'], subscription['url'])
+            return
+    except UnresolvableURL as e:
+        _retry_or_fail(subscription, body, attempt, f"DNS: {e}", retryable=True)
+        return
+
+    started = time.perf_counter()
+    try:
+        # Connect to the address just checked, not whatever the host resolves to next
+        url, host_header, extensions = _pinned_request(subscription['url'], addresses[0])
+        response = _client.post(url, content=body, headers={**headers, **host_header}, extensions=extensions)
+        error = None if response.is_success else f"HTTP {response.status_code}"
+        # Other 4xx responses mean the request itself was rejected; retrying won't help
+        retryable = response.status_code == 429 or response.status_code >= 500
+    except Exception as e:
+        error, retryable = str(e), True
+    WEBHOOK_LATENCY.observe(time.perf_counter() - started)
+
+    if error is None:
+        WEBHOOK_DELIVERIES.inc(outcome='delivered')
+        return
+    _retry_or_fail(subscription, body, attempt, error, retryable)
+
+
+def _retry_or_fail(subscription, body, attempt, error, retryable):
+    if retryable and attempt < _MAX_ATTEMPTS:
+        WEBHOOK_DELIVERIES.inc(outcome='retry')
+        delay = _RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+        timer = threading.Timer(delay, _get_executor().submit, (_deliver, subscription, body, attempt + 1))
+        timer.daemon = True
+        timer.start()
+        return
+
+    WEBHOOK_DELIVERIES.inc(outcome='failed')
+    logger.warning("Webhook %s delivery to %s failed after %d attempts: %s", subscription['id'], subscription['url'], attempt, error)
+
+
+def notify_rate_published(date, entry):
+    """
+    Queue a rate.published delivery to every subscription (never blocks on them)
+
+    Args:
+        date (str): The new BCV date
+        entry (dict): Its USD, EUR and timestamp
+    """
+    subscriptions = get_store().get_webhooks()
+    if not subscriptions:
+        return
+
+    body = json.dumps({
+        'event': EVENT_RATE_PUBLISHED,
+        'date': date,
+        'data': {'USD': entry['USD'], 'EUR': entry['EUR'], 'timestamp': entry['timestamp']}
+    }).encode()
+
+    executor = _get_executor()
+    for subscription in subscriptions:
+        executor.submit(_deliver, subscription, body)
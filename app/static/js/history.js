@@ -0,0 +1,124 @@
+/**
+ * Local copy of the rate history, kept in IndexedDB
+ *
+ * The full history is downloaded once from /rates/history/columnar; after
+ * that only the days after the newest stored one are fetched (since=), so
+ * picking a date resolves locally instead of costing a round trip.
+ */
+
+import { apiFetch } from './api.js';
+
+const DB_NAME = 'bcv_calculator';
+const DB_VERSION = 1;
+const STORE_NAME = 'rates'; // { date: ISO date, USD, EUR }
+
+let history = new Map(); // ISO date -> { USD, EUR }
+let database = null;
+let loaded = null; // Promise resolved once IndexedDB has been read into memory
+let syncing = null;
+
+/**
+ * Open the history database, creating the store on first use
+ * @returns {Promise<IDBDatabase>}
+ */
+function openDatabase() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(STORE_NAME, { keyPath: 'date' });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+/**
+ * Read every stored day into memory (once per page load)
+ * @returns {Promise<void>}
+ */
+function loadHistory() {
+    if (!loaded) {
+        loaded = openDatabase()
+            .then((db) => new Promise((resolve, reject) => {
+                database = db;
+                const request = db.transaction(STORE_NAME).objectStore(STORE_NAME).getAll();
+                request.onsuccess = () => {
+                    request.result.forEach(({ date, USD, EUR }) => history.set(date, { USD, EUR }));
+                    resolve();
+                };
+                request.onerror = () => reject(request.error);
+            }))
+            .catch((error) => {
+                // Private browsing or an old browser - keep the history in memory only
+                console.error('IndexedDB unavailable, history will not persist:', error);
+            });
+    }
+    return loaded;
+}
+
+/**
+ * Store days in memory and, when available, in IndexedDB
+ * @param {Object[]} rows - { date: ISO date, USD, EUR }
+ * @returns {Promise<void>}
+ */
+function storeRows(rows) {
+    rows.forEach(({ date, USD, EUR }) => history.set(date, { USD, EUR }));
+
+    if (!database || rows.length === 0) {
+        return Promise.resolve();
+    }
+
+    return new Promise((resolve) => {
+        const transaction = database.transaction(STORE_NAME, 'readwrite');
+        const store = transaction.objectStore(STORE_NAME);
+        rows.forEach((row) => store.put(row));
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => {
+            console.error('Error saving history:', transaction.error);
+            resolve();
+        };
+    });
+}
+
+/**
+ * Fetch the days missing from the local history
+ * @returns {Promise<number>} Number of days added
+ */
+export function syncHistory() {
+    if (!syncing) {
+        syncing = (async () => {
+            await loadHistory();
+
+            const dates = [...history.keys()].sort();
+            const since = dates[dates.length - 1];
+            const url = since ? `/rates/history/columnar?since=${since}` : '/rates/history/columnar';
+
+            const response = await apiFetch(url);
+            const data = await response.json();
+            if (!data.success) {
+                throw new Error('API returned unsuccessful response');
+            }
+
+            const { date, USD, EUR } = data.data;
+            await storeRows(date.map((isoDate, i) => ({ date: isoDate, USD: USD[i], EUR: EUR[i] })));
+            console.log(`History synced: ${date.length} new day(s), ${history.size} stored`);
+            return date.length;
+        })().catch((error) => {
+            console.error('Error syncing history:', error);
+            return 0;
+        }).finally(() => {
+            syncing = null;
+        });
+    }
+    return syncing;
+}
+
+/**
+ * Look up a day in the local history (without going to the network)
+ * @param {string} isoDate - Date in ISO format
+ * @returns {Promise<Object|null>} { USD, EUR } or null if it isn't stored
+ */
+export async function getLocalRate(isoDate) {
+    await loadHistory();
+    return history.get(isoDate) || null;
+}
@@ -6,6 +6,7 @@ import { initTelegram, calculate, setupEventListeners } from './calculator.js';
 import { loadRatesByDate, scheduleNextUpdate, loadBinanceRate, applyRates, getRates, applyBinanceRate, getBinanceRate } from './rates.js';
 import { loadAvailableDates, applyAvailableDates, onDateChange, getAvailableDates } from './dates.js';
 import { getCachedBootstrap, cacheBootstrap } from './cache.js';
+import { syncHistory } from './history.js';
 
 // Initialize Telegram WebApp
 initTelegram();
@@ -13,6 +14,13 @@ initTelegram();
 // Make calculate function globally available for inline onclick
 window.calculate = calculate;
 
+// Serve the app shell and last known rates from the service worker cache (offline-first)
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js', { scope: '/calculator' }).catch((error) => {
+        console.error('Service worker registration failed:', error);
+    });
+}
+
 /**
  * Cache the initial bootstrap data once all three pieces have loaded, so the
  * next page load (within the cache window) can skip the network calls entirely.
@@ -46,6 +54,9 @@ document.addEventListener('DOMContentLoaded', function() {
         loadBinanceRate().then(maybeCacheBootstrap);
     }
 
+    // Fetch the days missing from the local history so date changes resolve without the network
+    syncHistory();
+
     // Schedule automatic updates at 4:30 PM
     scheduleNextUpdate();
 
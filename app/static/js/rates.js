@@ -2,9 +2,10 @@
  * Exchange rates management
  */
 
-import { truncateDecimals, showError } from './utils.js';
+import { truncateDecimals, showError, bcvDateToISO } from './utils.js';
 import { getCachedRates, cacheRates } from './cache.js';
 import { apiFetch } from './api.js';
+import { getLocalRate, syncHistory } from './history.js';
 
 const SCHEDULED_UPDATE_HOUR = 16; // 4 PM
 const SCHEDULED_UPDATE_MINUTE = 30; // 4:30 PM Venezuela time
@@ -55,10 +56,20 @@ export async function loadRates(forceRefresh = false) {
 }
 
 /**
- * Load rates for a specific date
+ * Load rates for a specific date (from the local history, else the API)
  * @param {string} date - Date in BCV format
  */
 export async function loadRatesByDate(date) {
+    const localRates = await getLocalRate(bcvDateToISO(date));
+    if (localRates) {
+        rates = { USD: localRates.USD, EUR: localRates.EUR, date: date };
+        displayRates();
+        return;
+    }
+
+    // Not stored locally yet - catch the local history up for next time
+    syncHistory();
+
     try {
         // URL encode the date
         const encodedDate = encodeURIComponent(date);
@@ -0,0 +1,101 @@
+/**
+ * Service worker for the calculator (served at /sw.js, see routes/calculator.py)
+ *
+ * - App shell (page, stylesheet, modules): precached on install. Fingerprinted
+ *   /assets/ files never change, so they are served from the cache only; the
+ *   rest are served from the cache and refreshed in the background
+ * - Rate API responses: stale-while-revalidate, so the calculator opens
+ *   instantly from the last response and keeps working offline
+ * - Anything else goes straight to the network, including /rates/stream and
+ *   /rates/history/columnar: history.js keeps its own copy in IndexedDB and
+ *   asks for the days after it (since=), so a cached response would make it
+ *   miss new days rather than help offline
+ */
+
+const VERSION = {{ version|tojson }};
+const SHELL_CACHE = `bcv-shell-${VERSION}`;
+const API_CACHE = 'bcv-api-v2';
+const PRECACHE_URLS = {{ precache_urls|tojson }};
+const API_PATHS = [/^\/rates\/?$/, /^\/rates\/history\/(?!columnar$)/, /^\/p2p\/usdt$/];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then((cache) => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // Drop shells precached by older versions, and API caches that may hold columnar responses
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(
+                names
+                    .filter((name) => (name.startsWith('bcv-shell-') && name !== SHELL_CACHE)
+                        || (name.startsWith('bcv-api-') && name !== API_CACHE))
+                    .map((name) => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+/**
+ * Answer from the cache when possible and refresh the cached copy in the background
+ * @param {FetchEvent} event
+ * @param {string} cacheName
+ * @returns {Promise<Response>}
+ */
+async function staleWhileRevalidate(event, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+
+    const refresh = fetch(event.request).then((response) => {
+        // Errors and rate limit rejections are never cached
+        if (response.ok) {
+            return cache.put(event.request, response.clone()).then(() => response);
+        }
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(refresh.catch((error) => console.warn('Background refresh failed:', error)));
+        return cached;
+    }
+    return refresh;
+}
+
+/**
+ * Answer from the cache, only going to the network for files never cached
+ * @param {FetchEvent} event
+ * @param {string} cacheName
+ * @returns {Promise<Response>}
+ */
+async function cacheFirst(event, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    if (cached) {
+        return cached;
+    }
+
+    const response = await fetch(event.request);
+    if (response.ok) {
+        await cache.put(event.request, response.clone());
+    }
+    return response;
+}
+
+self.addEventListener('fetch', (event) => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(event, SHELL_CACHE));
+    } else if (PRECACHE_URLS.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, SHELL_CACHE));
+    } else if (API_PATHS.some((pattern) => pattern.test(url.pathname))) {
+        event.respondWith(staleWhileRevalidate(event, API_CACHE));
+    }
+});
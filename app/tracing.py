@@ -0,0 +1,324 @@
+"""
+Request tracing: spans through the layers a request passes, for finding
+what makes the slow ones slow
+
+A sampled request gets a root span, and span() opens child spans under
+whatever span is current: the rate limit check, API key check, cache
+lookups, upstream fetches (one per Binance page) and history queries.
+An incoming W3C traceparent is continued: its trace id is kept and its
+sampled flag is honoured, up to TRACE_MAX_FORCED_PER_MINUTE requests a
+minute so clients can't make the server trace everything. Other requests
+are sampled at TRACE_SAMPLE_RATE (0-1, default 0). Trace context is not
+sent to BCV or Binance, which are third parties.
+
+Finished traces are queued and exported in the background by TRACE_EXPORTER:
+"stdout" (default), "file" (JSON lines at TRACE_FILE, default
+.traces/spans.jsonl), or "package.module:factory" for a custom exporter, a
+callable returning an object with export(spans). Sampled responses carry the
+trace id in X-Trace-Id.
+
+Unsampled requests have no current span, so span() just returns a shared
+no-op span, costing one context variable lookup.
+"""
+import contextvars
+import functools
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from flask import g, request
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))
+TRACE_MAX_FORCED_PER_MINUTE = int(os.environ.get('TRACE_MAX_FORCED_PER_MINUTE', 60))
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'stdout')
+_DEFAULT_TRACE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.traces', 'spans.jsonl')
+TRACE_FILE = os.environ.get('TRACE_FILE', _DEFAULT_TRACE_FILE)
+
+# version-trace_id-parent_id-flags, see https://www.w3.org/TR/trace-context/
+_TRACEPARENT_RE = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_SAMPLED_FLAG = 0x01
+
+# Innermost open span of the current request, None when it isn't sampled.
+# Async views and their tasks run on copies of the request's context, so
+# spans they open are parented correctly and land in the same trace.
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+class _Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.finished = []
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_time', '_started')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.trace.finished.append({
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_time,
+            'duration_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'attributes': self.attributes
+        })
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class span:
+    """
+    Context manager timing a step of the current trace as a child of the
+    current span. Yields the Span (or a no-op when the request isn't
+    sampled) so attributes learnt along the way can be added with set().
+    """
+    __slots__ = ('name', 'attributes', '_span', '_token')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None:
+            return _NOOP_SPAN
+        self._span = Span(parent.trace, self.name, parent.span_id, self.attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        if exc_type is not None:
+            self._span.set('error', exc_type.__name__)
+        _current_span.reset(self._token)
+        self._span.finish()
+        return False
+
+
+def traced(name):
+    """Decorator wrapping every call of a (sync) function in a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _parse_traceparent(header):
+    """
+    Returns:
+        tuple: (trace_id, parent_id, sampled), or None if the header is missing or invalid
+    """
+    match = _TRACEPARENT_RE.match(header.strip().lower()) if header else None
+    if not match:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == 'ff' or trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & _SAMPLED_FLAG)
+
+
+class _ForcedSampleLimit:
+    """Counts traces forced by a client's sampled flag, per one-minute window"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._window = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        window = int(time.monotonic() // 60)
+        with self._lock:
+            if window != self._window:
+                self._window, self._count = window, 0
+            if self._count >= self.per_minute:
+                return False
+            self._count += 1
+            return True
+
+
+_forced_samples = _ForcedSampleLimit(TRACE_MAX_FORCED_PER_MINUTE)
+
+
+class StdoutExporter:
+    """Print each span as a JSON line"""
+
+    def export(self, spans):
+        for finished in spans:
+            print(json.dumps(finished, default=str), flush=True)
+
+
+class FileExporter:
+    """Append each span as a JSON line to a file"""
+
+    def __init__(self, path=None):
+        self.path = path or TRACE_FILE
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(finished, default=str) + '\n' for finished in spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+def load_exporter(spec=None):
+    """
+    Args:
+        spec (str): "stdout", "file" or "package.module:factory" (default: TRACE_EXPORTER)
+
+    Returns:
+        object: Exporter with an export(spans) method
+    """
+    spec = spec or TRACE_EXPORTER
+    if spec == 'stdout':
+        return StdoutExporter()
+    if spec == 'file':
+        return FileExporter()
+
+    module_name, _, factory_name = spec.partition(':')
+    if not factory_name:
+        raise ValueError(f"TRACE_EXPORTER must be 'stdout', 'file' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), factory_name)()
+
+
+_exporter = None
+_writer = None
+
+
+def _export_batch(spans):
+    _exporter.export(spans)
+
+
+def _start_trace():
+    incoming = _parse_traceparent(request.headers.get('traceparent'))
+    if incoming:
+        trace_id, parent_id, sampled = incoming
+        sampled = sampled and _forced_samples.allow()
+    else:
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+        trace_id, parent_id = (_new_id(128), None) if sampled else (None, None)
+
+    if not sampled:
+        return
+
+    root = Span(_Trace(trace_id), 'http.request', parent_id, {
+        'http.method': request.method,
+        'http.path': request.path
+    })
+    g._trace_span = root
+    g._trace_token = _current_span.set(root)
+
+
+def _finish_trace(exc):
+    root = g.pop('_trace_span', None)
+    if root is None:
+        return
+    _current_span.reset(g.pop('_trace_token'))
+
+    root.set('http.route', request.endpoint)
+    if exc is not None:
+        root.set('error', type(exc).__name__)
+    root.finish()
+    for finished in root.trace.finished:
+        _writer.add(finished)
+
+
+def _trace_limiter(limiter):
+    """
+    flask-limiter has no hooks around its checks, so wrap the method both its
+    before_request hook (default limits) and its decorators (route limits)
+    call. Must run before limiter.init_app, which registers the bound method.
+    The method is private (checked against flask-limiter 4.x, see
+    requirements.txt); if it's gone, limits are simply left untraced.
+    """
+    check = getattr(limiter, '_check_request_limit', None)
+    if check is None:
+        logger.warning("Rate limit checks won't be traced: this flask-limiter version has no _check_request_limit")
+        return
+    if getattr(check, '_traced', False):
+        return
+
+    @functools.wraps(check)
+    def traced_check(*args, **kwargs):
+        # Called with in_middleware=False (and the view's name) for route limits
+        if kwargs.get('in_middleware', True):
+            attributes = {'limits': 'default'}
+        else:
+            attributes = {'limits': 'route', 'view': kwargs.get('callable_name')}
+        with span('rate_limit', **attributes):
+            return check(*args, **kwargs)
+
+    traced_check._traced = True
+    limiter._check_request_limit = traced_check
+
+
+def init_app(app, limiter=None):
+    """
+    Trace sampled requests. Call before the limiter's init_app so its checks
+    are traced too.
+
+    Args:
+        limiter (Limiter): Rate limiter whose checks get a span
+    """
+    global _exporter, _writer
+    if _writer is None:
+        _exporter = load_exporter()
+        _writer = BatchWriter(_export_batch, batch_size=200, flush_interval=2.0, retries=1)
+
+    if limiter is not None:
+        _trace_limiter(limiter)
+
+    @app.before_request
+    def _trace_request():
+        _start_trace()
+
+    @app.after_request
+    def _add_trace_header(response):
+        root = g.get('_trace_span')
+        if root is not None:
+            root.set('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = root.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc):
+        _finish_trace(exc)
@@ -0,0 +1,238 @@
+"""
+Backfill rates_history from BCV's historical exchange rate spreadsheets.
+
+BCV publishes its reference rates as quarterly workbooks (.xls, and .xlsx for
+some periods) with one sheet per business day. Each sheet carries an
+operation date, a value date and one row per currency, with the Bs. rate in
+the last numeric column. Download the files into a directory and run:
+
+    pip install xlrd openpyxl
+    python backfill_bcv_archives.py path/to/archives --workers 4
+
+Workbooks are parsed in a process pool. Rates are stored the way the scraper
+stores them: keyed on the value date formatted like the BCV homepage
+("Viernes, 02 Enero 2026"), with comma-decimal rates and the operation date
+as the timestamp. They are inserted through the configured history store
+(MongoDB or SQLite, see HISTORY_BACKEND) with the same fields the app writes,
+and only for dates it doesn't have yet, so dates already in the history
+(including those saved by the live scraper) are left untouched and
+re-running a backfill is a no-op.
+
+Uses MongoDB when MONGODB_URI is set (and optionally MONGODB_DB_NAME), e.g.
+via .env; otherwise SQLite at HISTORY_SQLITE_PATH.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+WEEKDAYS = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+MONTHS = (
+    'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+)
+CURRENCIES = ('USD', 'EUR')
+EXTENSIONS = ('.xls', '.xlsx')
+
+_DATE_PATTERN = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+
+
+def format_date(day):
+    """Format a date the way the BCV homepage shows it, e.g. "Viernes, 02 Enero 2026" """
+    return f"{WEEKDAYS[day.weekday()]}, {day.day:02d} {MONTHS[day.month - 1]} {day.year}"
+
+
+def format_rate(value):
+    """Format a rate with a decimal comma and 8 decimals, e.g. "339,14950000" """
+    return f"{value:.8f}".replace('.', ',')
+
+
+def _to_date(value):
+    """A date from a date/datetime cell or a dd/mm/yyyy string, else None"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        match = _DATE_PATTERN.search(value)
+        if match:
+            day, month, year = (int(part) for part in match.groups())
+            try:
+                return date(year, month, day)
+            except ValueError:
+                return None
+    return None
+
+
+def _read_xls(path):
+    import xlrd
+
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        for index in range(book.nsheets):
+            sheet = book.sheet_by_index(index)
+            rows = []
+            for row_index in range(sheet.nrows):
+                row = []
+                for cell in sheet.row(row_index):
+                    if cell.ctype == xlrd.XL_CELL_DATE:
+                        row.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+                    else:
+                        row.append(cell.value)
+                rows.append(row)
+            book.unload_sheet(index)
+            yield sheet.name, rows
+    finally:
+        book.release_resources()
+
+
+def _read_xlsx(path):
+    import openpyxl
+
+    book = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in book.worksheets:
+            yield sheet.title, [list(row) for row in sheet.iter_rows(values_only=True)]
+    finally:
+        book.close()
+
+
+def parse_sheet(rows):
+    """
+    Extract one day's rates from a sheet
+
+    Args:
+        rows (list): Rows of cell values
+
+    Returns:
+        dict: {'date', 'USD', 'EUR', 'timestamp'} or None if the sheet isn't a rates sheet
+    """
+    value_date = operation_date = None
+    rates = {}
+
+    for row in rows:
+        for index, cell in enumerate(row):
+            if not isinstance(cell, str):
+                continue
+            label = cell.strip().lower()
+
+            if label.startswith('fecha'):
+                # The date is either in the label cell or in the next non-empty one
+                found = _to_date(cell) or next(
+                    (_to_date(value) for value in row[index + 1:] if value not in (None, '')), None
+                )
+                if 'valor' in label:
+                    value_date = found
+                elif 'operaci' in label:
+                    operation_date = found
+
+            elif cell.strip().upper() in CURRENCIES:
+                numbers = [value for value in row if isinstance(value, (int, float)) and not isinstance(value, bool)]
+                if numbers:
+                    rates[cell.strip().upper()] = numbers[-1]
+
+    if not value_date or not all(currency in rates for currency in CURRENCIES):
+        return None
+
+    return {
+        'date': format_date(value_date),
+        'USD': format_rate(rates['USD']),
+        'EUR': format_rate(rates['EUR']),
+        'timestamp': datetime.combine(operation_date or value_date, datetime.min.time()).isoformat()
+    }
+
+
+def parse_workbook(path):
+    """
+    Parse every sheet of a workbook (runs in a worker process)
+
+    Returns:
+        tuple: (path, entries, error) - error is None if the file could be read
+    """
+    reader = _read_xlsx if path.lower().endswith('.xlsx') else _read_xls
+    try:
+        entries = [entry for _, rows in reader(path) for entry in [parse_sheet(rows)] if entry]
+    except Exception as e:
+        return path, [], str(e)
+    return path, entries, None
+
+
+def find_workbooks(directory):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(EXTENSIONS) and not name.startswith('~$')
+    )
+
+
+def parse_archives(paths, workers):
+    """
+    Parse workbooks across a process pool
+
+    Returns:
+        tuple: (entries keyed by date, list of (path, error) for unreadable files)
+    """
+    entries, errors = {}, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, file_entries, error in pool.map(parse_workbook, paths, chunksize=4):
+            if error:
+                errors.append((path, error))
+            for entry in file_entries:
+                entries.setdefault(entry['date'], entry)
+    return entries, errors
+
+
+def load_entries(store, entries, batch_size):
+    """
+    Insert entries whose date isn't in the history store yet
+
+    Returns:
+        int: Number of dates inserted
+    """
+    inserted = 0
+    for start in range(0, len(entries), batch_size):
+        inserted += len(store.insert_rates(entries[start:start + batch_size]))
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory containing the downloaded .xls/.xlsx files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parser processes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='entries per batch write')
+    parser.add_argument('--dry-run', action='store_true', help='parse and report without writing')
+    args = parser.parse_args()
+
+    paths = find_workbooks(args.directory)
+    started = time.perf_counter()
+    entries, errors = parse_archives(paths, args.workers)
+    parsed = time.perf_counter()
+
+    for path, error in errors:
+        print(f"Skipping {path}: {error}")
+    print(
+        f"Parsed {len(paths)} files into {len(entries)} dates in {parsed - started:.2f}s "
+        f"({len(paths) / (parsed - started) if paths else 0:.1f} files/s)"
+    )
+
+    if args.dry_run or not entries:
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from app.services.history_store import get_store
+
+    store = get_store()
+    ordered = sorted(entries.values(), key=lambda entry: entry['timestamp'])
+    inserted = load_entries(store, ordered, args.batch_size)
+    print(
+        f"Inserted {inserted} new dates into the {store.name} history store ({len(ordered) - inserted} already present) "
+        f"in {time.perf_counter() - parsed:.2f}s"
+    )
+
+
+if __name__ == '__main__':
+    main()
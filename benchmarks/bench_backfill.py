@@ -0,0 +1,192 @@
+"""
+Benchmark for backfill_bcv_archives.py.
+
+Generates synthetic BCV archive workbooks (quarterly files with one sheet per
+business day, half .xls and half .xlsx) into a temporary directory, then
+parses them with 1 worker and with --workers processes and bulk-loads the
+result twice into mongomock (or a local mongod when MONGODB_URI is set) to
+check the second load inserts nothing. Results are reported as JSON.
+mongomock upserts slow down with collection size, so use a local mongod for
+meaningful load numbers.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_backfill --files 200 --workers 4
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from backfill_bcv_archives import find_workbooks, load_entries, parse_archives
+from benchmarks.fakes import mongo_database
+
+_OTHER_CURRENCIES = (('CNY', 'China'), ('TRY', 'Turquía'), ('RUB', 'Rusia'))
+
+
+def _business_days(start, count):
+    day = start
+    while count:
+        if day.weekday() < 5:
+            yield day
+            count -= 1
+        day += timedelta(days=1)
+
+
+def _sheet_rows(operation_date, value_date, usd, rng):
+    eur_usd = rng.uniform(1.05, 1.2)
+    rows = [
+        ['', 'BANCO CENTRAL DE VENEZUELA'],
+        ['', 'Tipo de Cambio de Referencia del Sistema del Mercado Cambiario'],
+        [],
+        ['', 'Fecha Operación:', operation_date.strftime('%d/%m/%Y')],
+        ['', f"Fecha Valor: {value_date.strftime('%d/%m/%Y')}"],
+        [],
+        ['', 'Moneda', 'País', 'ME/USD Compra', 'ME/USD Venta', 'Bs/ME Compra', 'Bs/ME Venta'],
+        ['', 'EUR', 'Unión Europea', eur_usd, eur_usd, usd * eur_usd * 0.998, usd * eur_usd],
+    ]
+    for code, country in _OTHER_CURRENCIES:
+        factor = rng.uniform(0.01, 0.2)
+        rows.append(['', code, country, factor, factor, usd * factor * 0.998, usd * factor])
+    rows.append(['', 'USD', 'E.E.U.U.', 1, 1, usd * 0.998, usd])
+    return rows
+
+
+def _write_xls(path, sheets):
+    import xlwt
+
+    book = xlwt.Workbook()
+    for name, rows in sheets:
+        sheet = book.add_sheet(name)
+        for row_index, row in enumerate(rows):
+            for col_index, value in enumerate(row):
+                sheet.write(row_index, col_index, value)
+    book.save(path)
+
+
+def _write_xlsx(path, sheets):
+    import openpyxl
+
+    book = openpyxl.Workbook(write_only=True)
+    for name, rows in sheets:
+        sheet = book.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    book.save(path)
+
+
+def generate_archives(directory, files, days_per_file, seed=42):
+    """
+    Write `files` workbooks covering consecutive business days
+
+    Returns:
+        int: Number of distinct dates generated
+    """
+    rng = random.Random(seed)
+    days = list(_business_days(date(2000, 1, 3), files * days_per_file + 1))
+    usd = 1.0
+
+    for number in range(files):
+        sheets = []
+        for offset in range(days_per_file):
+            index = number * days_per_file + offset
+            usd *= rng.uniform(0.999, 1.004)
+            operation_date, value_date = days[index], days[index + 1]
+            sheets.append((value_date.strftime('%d%m%Y'), _sheet_rows(operation_date, value_date, usd, rng)))
+
+        writer, extension = (_write_xls, 'xls') if number % 2 == 0 else (_write_xlsx, 'xlsx')
+        writer(os.path.join(directory, f"bcv_archive_{number:04d}.{extension}"), sheets)
+
+    return files * days_per_file
+
+
+def measure_parse(paths, workers):
+    started = time.perf_counter()
+    entries, errors = parse_archives(paths, workers)
+    elapsed = time.perf_counter() - started
+    return entries, {
+        'workers': workers,
+        'dates': len(entries),
+        'errors': len(errors),
+        'parse_s': round(elapsed, 3),
+        'files_per_s': round(len(paths) / elapsed, 1)
+    }
+
+
+def measure_load(entries, db, batch_size):
+    import app.db
+    from app.services.history_store import MongoHistoryStore
+
+    app.db._db = db
+    db['rates_history'].delete_many({})
+    store = MongoHistoryStore()
+
+    started = time.perf_counter()
+    inserted = load_entries(store, sorted(entries.values(), key=lambda e: e['timestamp']), batch_size)
+    loaded = time.perf_counter()
+    # A second load must not insert anything
+    reinserted = load_entries(store, list(entries.values()), batch_size)
+
+    return {
+        'load_s': round(loaded - started, 3),
+        'docs_per_s': round(len(entries) / (loaded - started), 1),
+        'inserted': inserted,
+        'reinserted': reinserted
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200, help='workbooks to generate')
+    parser.add_argument('--days-per-file', type=int, default=63, help='sheets per workbook (about a quarter)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parser processes for the parallel run')
+    parser.add_argument('--batch-size', type=int, default=1000, help='documents per bulk_write')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bcv_archives_')
+    try:
+        started = time.perf_counter()
+        generated = generate_archives(directory, args.files, args.days_per_file)
+        print(f"Generated {args.files} files ({generated} dates) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        paths = find_workbooks(directory)
+        parse_results = []
+        for workers in sorted({1, args.workers}):
+            entries, result = measure_parse(paths, workers)
+            parse_results.append(result)
+            print(f"workers {workers:>2}  {result['files_per_s']:>7} files/s  parse {result['parse_s']}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    load_result = measure_load(entries, mongo_database(), args.batch_size)
+    print(f"load {load_result['docs_per_s']} docs/s, {load_result['reinserted']} inserted on re-run", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'mongo': 'mongod' if os.environ.get('MONGODB_URI') else 'mongomock',
+            'generated_dates': generated,
+            'args': vars(args)
+        },
+        'parse': parse_results,
+        'load': load_result
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+History backend benchmark: latency of every rate history route on each
+storage backend.
+
+Fills each backend (MongoDB via mongomock or MONGODB_URI, and SQLite in a
+temporary file) with the same generated history, then requests each history
+route through the Flask test client and reports p50/p95/p99 latency per
+backend and route as JSON.
+
+Usage:
+    python -m benchmarks.bench_history --dates 2000 --requests 200
+
+Set MONGODB_URI to benchmark a local mongod instead of mongomock, which is
+much slower than a real server on larger collections.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from backfill_bcv_archives import format_date, format_rate
+from benchmarks.bench_routes import percentile
+from benchmarks.fakes import mongo_database
+
+API_KEY = 'bench-api-key'
+ROUTES = ['/rates/history', '/rates/history/dates', '/rates/usd/change']
+
+
+def generate_history(count):
+    day = date(2020, 1, 1)
+    usd = 1.0
+    entries = []
+    for _ in range(count):
+        usd *= 1.001
+        entries.append({
+            'date': format_date(day),
+            'USD': format_rate(usd),
+            'EUR': format_rate(usd * 1.1),
+            'timestamp': datetime.combine(day - timedelta(days=1), datetime.min.time()).isoformat()
+        })
+        day += timedelta(days=1)
+    return entries
+
+
+def use_backend(backend, sqlite_path):
+    """Point the history service at a fresh store for backend"""
+    from app.services import history_store
+
+    os.environ['HISTORY_BACKEND'] = backend
+    os.environ['HISTORY_SQLITE_PATH'] = sqlite_path
+    history_store._store = None
+    return history_store.get_store()
+
+
+def measure(client, route, requests):
+    latencies, errors = [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(route, headers={'X-API-Key': API_KEY})
+        latencies.append(time.perf_counter() - started)
+        errors += response.status_code >= 400
+    return {
+        'route': route,
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dates', type=int, default=2000, help='history entries per backend')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route and backend')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    os.environ['API_KEY'] = API_KEY
+    os.environ['CACHE_SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='bcv_bench_cache_')
+
+    import app.db
+    app.db._db = mongo_database()
+    app.db._db['rates_history'].delete_many({})
+
+    from app import create_app
+    client = create_app({'RATELIMIT_ENABLED': False, 'WARM_START': False}).test_client()
+
+    entries = generate_history(args.dates)
+    routes = ROUTES + [f"/rates/history/{quote(entries[len(entries) // 2]['date'])}"]
+    sqlite_path = os.path.join(tempfile.mkdtemp(prefix='bcv_bench_history_'), 'history.sqlite3')
+
+    results = {}
+    for backend in ('mongo', 'sqlite'):
+        store = use_backend(backend, sqlite_path)
+        store.save_rates(entries)
+        results[backend] = [measure(client, route, args.requests) for route in routes]
+
+    print(f"\n{'route':<45} {'mongo p50':>10} {'sqlite p50':>11} {'mongo p99':>10} {'sqlite p99':>11}", file=sys.stderr)
+    for mongo, sqlite in zip(results['mongo'], results['sqlite']):
+        print(
+            f"{mongo['route']:<45} {mongo['p50_ms']:>10} {sqlite['p50_ms']:>11} {mongo['p99_ms']:>10} {sqlite['p99_ms']:>11}",
+            file=sys.stderr
+        )
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'mongo': 'mongod' if os.environ.get('MONGODB_URI') else 'mongomock',
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Offline load test for the API routes.
+
+Starts local stand-ins for bcv.org.ve, Binance P2P and MongoDB (see
+benchmarks/fakes.py), builds the app through create_app(), serves it on a
+threaded local server and measures each route:
+
+- cold: sequential requests, with the scraper caches cleared before each one
+- warm: concurrent requests against primed caches
+
+Results are written as JSON (requests per second and p50/p95/p99 latency per
+route and phase) so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_routes --output before.json
+    python -m benchmarks.bench_routes --output after.json --compare before.json
+
+Set MONGODB_URI to benchmark against a local mongod instead of mongomock.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks.fakes import FakeBCV, FakeBinanceP2P, mongo_database
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(ROOT_DIR, 'rates_history.json')
+API_KEY = 'bench-api-key'
+
+UPSTREAM_ROUTES = ['/rates/', '/rates/usd', '/p2p/usdt']
+HISTORY_ROUTES = ['/rates/history', '/rates/history/dates', '/rates/usd/change']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+def summarize(route, phase, latencies, errors, elapsed):
+    return {
+        'route': route,
+        'phase': phase,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None
+    }
+
+
+def seed_history(db):
+    """Load the sample rates_history.json into the benchmark database"""
+    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+        history = json.load(f)
+    for date, entry in history.items():
+        db['rates_history'].update_one({'date': date}, {'$set': {
+            'USD': entry['USD'], 'EUR': entry['EUR'], 'timestamp': entry['timestamp']
+        }}, upsert=True)
+    return history
+
+
+class Harness:
+    def __init__(self, args):
+        self.bcv = FakeBCV(latency=args.bcv_latency).start()
+        self.binance = FakeBinanceP2P(
+            latency=args.binance_latency,
+            pages=args.binance_pages,
+            qualifying_ratio=args.qualifying_ratio
+        ).start()
+
+        # Must be set before the service modules are imported
+        os.environ['BCV_URL'] = self.bcv.url
+        os.environ['BINANCE_P2P_URL'] = self.binance.url
+        os.environ['API_KEY'] = API_KEY
+        os.environ['CACHE_SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='bcv_bench_cache_')
+        os.environ['HISTORY_BACKEND'] = 'mongo'
+
+        import app.db
+        app.db._db = mongo_database()
+        history = seed_history(app.db._db)
+        latest_date = max(history, key=lambda date: history[date]['timestamp'])
+        self.routes = UPSTREAM_ROUTES + HISTORY_ROUTES + [f"/rates/history/{quote(latest_date)}"]
+
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        from app import create_app
+        flask_app = create_app({'RATELIMIT_ENABLED': False, 'WARM_START': False})
+        self.server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def clear_caches(self):
+        from app.services import bcv_scraper, binance_p2p
+        bcv_scraper._cache.clear()
+        binance_p2p._cache.clear()
+
+    def client(self):
+        return httpx.Client(base_url=self.base_url, headers={'X-API-Key': API_KEY}, timeout=60)
+
+    def run_cold(self, route, iterations):
+        latencies, errors = [], 0
+        with self.client() as client:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                self.clear_caches()
+                request_started = time.perf_counter()
+                response = client.get(route)
+                latencies.append(time.perf_counter() - request_started)
+                errors += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+        return summarize(route, 'cold', latencies, errors, elapsed)
+
+    def run_warm(self, route, total, concurrency):
+        with self.client() as client:
+            client.get(route)  # Prime the caches
+
+        per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+        def worker(count):
+            latencies, errors = [], 0
+            with self.client() as client:
+                for _ in range(count):
+                    request_started = time.perf_counter()
+                    response = client.get(route)
+                    latencies.append(time.perf_counter() - request_started)
+                    errors += response.status_code >= 400
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, per_worker))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+        errors = sum(worker_errors for _, worker_errors in results)
+        return summarize(route, 'warm', latencies, errors, elapsed)
+
+    def stop(self):
+        self.server.shutdown()
+        self.bcv.stop()
+        self.binance.stop()
+
+
+def compare(current, baseline_path):
+    """Print per-route changes against a previous results file to stderr"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['route'], r['phase']): r for r in json.load(f)['results']}
+
+    def delta(new, old):
+        if not new or not old:
+            return '     n/a'
+        return f"{(new - old) / old * 100:+7.1f}%"
+
+    print(f"\n{'route':<40} {'phase':<5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}", file=sys.stderr)
+    for result in current['results']:
+        old = baseline.get((result['route'], result['phase']))
+        if not old:
+            continue
+        print(
+            f"{result['route']:<40} {result['phase']:<5} "
+            f"{delta(result['rps'], old['rps']):>9} {delta(result['p50_ms'], old['p50_ms']):>9} "
+            f"{delta(result['p95_ms'], old['p95_ms']):>9} {delta(result['p99_ms'], old['p99_ms']):>9}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients in the warm phase')
+    parser.add_argument('--requests', type=int, default=400, help='requests per route in the warm phase')
+    parser.add_argument('--cold-iterations', type=int, default=10, help='cache-cleared requests per route')
+    parser.add_argument('--bcv-latency', type=float, default=0.3, help='fake bcv.org.ve latency in seconds')
+    parser.add_argument('--binance-latency', type=float, default=0.15, help='fake Binance latency per page in seconds')
+    parser.add_argument('--binance-pages', type=int, default=10, help='fake Binance pages containing ads')
+    parser.add_argument('--qualifying-ratio', type=float, default=0.5, help='share of ads from qualifying merchants')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    results = []
+    try:
+        for route in harness.routes:
+            results.append(harness.run_cold(route, args.cold_iterations))
+            results.append(harness.run_warm(route, args.requests, args.concurrency))
+            latest = results[-1]
+            print(f"{route:<40} warm {latest['rps']:>8} rps  p50 {latest['p50_ms']} ms  p99 {latest['p99_ms']} ms", file=sys.stderr)
+    finally:
+        harness.stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'mongo': 'mongod' if os.environ.get('MONGODB_URI') else 'mongomock',
+            'upstream_requests': {'bcv': harness.bcv.requests, 'binance_p2p': harness.binance.requests},
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark: where does process start-up time go?
+
+Starts fresh interpreters (so nothing is cached in sys.modules) and measures,
+for the default and fast-start (FAST_START=1) modes:
+
+- phases: importing flask, importing the app package, create_app(), and the
+  first request (GET /health) through the test client
+- imports: self time from `python -X importtime`, summed per top-level package
+
+Each mode is run several times and the median is reported as JSON.
+
+Usage:
+    python build_apispec.py   # fast-start mode needs the prebuilt spec
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PHASES_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import flask
+flask_imported = time.perf_counter()
+from app import create_app
+app_imported = time.perf_counter()
+app = create_app()
+app_created = time.perf_counter()
+app.test_client().get('/health')
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_flask_ms': (flask_imported - started) * 1000,
+    'import_app_ms': (app_imported - flask_imported) * 1000,
+    'create_app_ms': (app_created - app_imported) * 1000,
+    'first_request_ms': (first_request - app_created) * 1000,
+    'total_ms': (first_request - started) * 1000
+}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$')
+
+
+def run_once(fast_start):
+    env = dict(os.environ)
+    env.pop('FAST_START', None)
+    if fast_start:
+        env['FAST_START'] = '1'
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PHASES_SCRIPT],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, _, module = match.groups()
+            packages[module.strip().split('.')[0]] += int(self_us)
+
+    return phases, packages
+
+
+def measure(fast_start, runs, top):
+    phase_runs = []
+    package_runs = defaultdict(list)
+
+    for _ in range(runs):
+        phases, packages = run_once(fast_start)
+        phase_runs.append(phases)
+        for package, self_us in packages.items():
+            package_runs[package].append(self_us)
+
+    phases = {
+        name: round(statistics.median(run[name] for run in phase_runs), 2)
+        for name in phase_runs[0]
+    }
+    # Packages missing from a run contributed nothing to it
+    imports = sorted(
+        ((package, statistics.median(times + [0] * (runs - len(times))) / 1000) for package, times in package_runs.items()),
+        key=lambda item: item[1], reverse=True
+    )
+
+    return {
+        'phases_ms': phases,
+        'import_self_ms_by_package': {package: round(ms, 2) for package, ms in imports[:top]}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per mode')
+    parser.add_argument('--top', type=int, default=15, help='packages to list in the import breakdown')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'default': measure(False, args.runs, args.top),
+        'fast_start': measure(True, args.runs, args.top)
+    }
+
+    for mode in ('default', 'fast_start'):
+        print(f"{mode:<11} total {report[mode]['phases_ms']['total_ms']:>8.1f} ms", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
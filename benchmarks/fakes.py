@@ -0,0 +1,159 @@
+"""
+Local stand-ins for the upstreams the API depends on, so benchmarks run
+offline and with controlled latency:
+
+- FakeBCV serves a recorded bcv.org.ve homepage
+- FakeBinanceP2P serves the adv/search endpoint with configurable
+  latency, page count and share of qualifying merchants
+- mongo_database() returns a mongomock database, or a real one when
+  MONGODB_URI is set
+"""
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class _FakeServer:
+    """Runs a ThreadingHTTPServer on a free localhost port in a daemon thread"""
+
+    def __init__(self, handler):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeBCV(_FakeServer):
+    def __init__(self, latency=0.0, fixture='bcv_homepage.html'):
+        """
+        Args:
+            latency (float): Seconds to wait before responding
+            fixture (str): HTML file in benchmarks/fixtures to serve
+        """
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            self.html = f.read()
+        self.latency = latency
+        super().__init__(_BCVHandler)
+
+
+class _BCVHandler(_QuietHandler):
+    def do_GET(self):
+        fake = self.server.fake
+        fake.count_request()
+        time.sleep(fake.latency)
+        self._send(fake.html, 'text/html; charset=utf-8')
+
+
+class FakeBinanceP2P(_FakeServer):
+    def __init__(self, latency=0.0, pages=10, qualifying_ratio=0.5, base_price=540.0, seed=42):
+        """
+        Args:
+            latency (float): Seconds to wait before each page response
+            pages (int): Number of pages that contain ads; later pages are empty
+            qualifying_ratio (float): Share of ads from merchants that pass the
+                                      default trade count and completion filters
+            base_price (float): Center of the generated price distribution
+        """
+        self.latency = latency
+        self.pages = pages
+        rng = random.Random(seed)
+        self._ads = [
+            [self._ad(rng, base_price, rng.random() < qualifying_ratio) for _ in range(20)]
+            for _ in range(pages)
+        ]
+        super().__init__(_BinanceHandler)
+
+    @staticmethod
+    def _ad(rng, base_price, qualifies):
+        return {
+            'adv': {'price': f"{base_price + rng.uniform(-5, 5):.2f}"},
+            'advertiser': {
+                'monthFinishRate': 0.995 if qualifies else 0.9,
+                'monthOrderCount': 2500 if qualifies else 150
+            }
+        }
+
+    def page(self, number):
+        return self._ads[number - 1] if 1 <= number <= self.pages else []
+
+
+class _BinanceHandler(_QuietHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count_request()
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(fake.latency)
+        body = json.dumps({'success': True, 'data': fake.page(payload['page'])}).encode()
+        self._send(body, 'application/json')
+
+
+def mongo_database():
+    """
+    Returns:
+        Database: A real database when MONGODB_URI is set (use a local
+                  mongod), otherwise an in-memory mongomock database
+    """
+    uri = os.environ.get('MONGODB_URI')
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)[os.environ.get('MONGODB_DB_NAME', 'bcv_scrape_bench')]
+
+    import mongomock
+    _patch_mongomock_bulk()
+    db = mongomock.MongoClient()['bcv_scrape_bench']
+    db['rates_history'].create_index('date', unique=True)
+    return db
+
+
+def _patch_mongomock_bulk():
+    """
+    pymongo 4.9+ passes sort= to add_update when running bulk_write, which
+    mongomock doesn't accept yet; drop it (it's always None for our upserts)
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    add_update = BulkOperationBuilder.add_update
+    if getattr(add_update, '_accepts_sort', False):
+        return
+
+    def patched(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    patched._accepts_sort = True
+    BulkOperationBuilder.add_update = patched
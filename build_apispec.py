@@ -0,0 +1,33 @@
+"""
+Build app/apispec.json from the route docstrings.
+
+Fast-start mode (FAST_START=1) serves this file instead of importing
+flasgger and building the spec at boot. Re-run after changing any route
+docstring; render.yaml runs it as part of the build.
+
+Usage:
+    python build_apispec.py
+"""
+import json
+import os
+
+# Always build with flasgger, even if fast-start mode is enabled in this shell
+os.environ.pop('FAST_START', None)
+
+from app import create_app
+from app.config import PREBUILT_APISPEC_PATH
+
+
+def main():
+    app = create_app({'WARM_START': False})
+    response = app.test_client().get('/apispec.json')
+    spec = response.get_json()
+
+    with open(PREBUILT_APISPEC_PATH, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, separators=(',', ':'))
+
+    print(f"Wrote {len(spec.get('paths', {}))} paths to {PREBUILT_APISPEC_PATH}")
+
+
+if __name__ == '__main__':
+    main()
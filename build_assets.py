@@ -0,0 +1,188 @@
+"""
+Bundle, minify and fingerprint the calculator's static assets.
+
+js/main.js and every module it imports are bundled into one file, so the
+page loads one script instead of a waterfall of module requests. That file
+and css/calculator.css are minified (with rjsmin and rcssmin) and written to
+app/dist/ with a hash of their contents in the file name, and
+app/dist/manifest.json maps the source names to them (see app/assets.py).
+The bundle is syntax-checked with `node --check` when node is installed. Re-run after changing anything
+under app/static/; render.yaml runs it as part of the build.
+
+The bundler only understands the module syntax the calculator uses:
+`import { a, b as c } from './module.js';` and `export` in front of a
+function, async function, const or class declaration. Each module is
+wrapped in its own function scope, so top-level names never collide.
+Anything else fails the build rather than producing a broken bundle.
+
+Usage:
+    python build_assets.py
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import rcssmin
+import rjsmin
+
+from app.config import ASSET_DIST_DIR, ASSET_MANIFEST_PATH
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+ENTRY_MODULE = 'js/main.js'
+STYLESHEETS = ('css/calculator.css',)
+
+_IMPORT_RE = re.compile(r"^import\s*\{([^}]*)\}\s*from\s*'\./([\w-]+\.js)';?[ \t]*$", re.MULTILINE)
+_EXPORT_RE = re.compile(r"^export\s+(?:async\s+function\*?|function\*?|const|class)\s+([\w$]+)", re.MULTILINE)
+_OTHER_MODULE_SYNTAX_RE = re.compile(r"^(?:import|export)\b", re.MULTILINE)
+
+
+class BuildError(Exception):
+    pass
+
+
+def _module_var(name):
+    return '$' + re.sub(r'\W', '_', name[:-len('.js')])
+
+
+def _parse_module(name):
+    """
+    Returns:
+        tuple: (body without import/export syntax, [(module, [(imported, local)])], [exported names])
+    """
+    with open(os.path.join(STATIC_DIR, 'js', name), encoding='utf-8') as f:
+        source = f.read()
+
+    imports = []
+    for match in _IMPORT_RE.finditer(source):
+        names = []
+        for item in filter(None, (part.strip() for part in match.group(1).split(','))):
+            imported, _, local = item.partition(' as ')
+            names.append((imported.strip(), (local or imported).strip()))
+        imports.append((match.group(2), names))
+    body = _IMPORT_RE.sub('', source)
+
+    exports = _EXPORT_RE.findall(body)
+    body = re.sub(r"^export\s+", '', body, flags=re.MULTILINE)
+
+    leftover = _OTHER_MODULE_SYNTAX_RE.search(body)
+    if leftover:
+        line = body[leftover.start():].splitlines()[0]
+        raise BuildError(f"js/{name}: unsupported module syntax: {line}")
+
+    return body, imports, exports
+
+
+def bundle(entry=ENTRY_MODULE):
+    """
+    Bundle an entry module and its imports, dependencies first
+
+    Returns:
+        str: The bundled source
+    """
+    parsed = {}
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in parsed:
+            return
+        if name in visiting:
+            raise BuildError(f"Circular import involving js/{name}")
+        visiting.add(name)
+        parsed[name] = _parse_module(name)
+        for dependency, _ in parsed[name][1]:
+            visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    visit(os.path.basename(entry))
+
+    chunks = []
+    for name in order:
+        body, imports, exports = parsed[name]
+        bindings = ''.join(
+            f"const {{ {', '.join(imported if imported == local else f'{imported}: {local}' for imported, local in names)} }} = {_module_var(module)};\n"
+            for module, names in imports
+        )
+        if name == os.path.basename(entry):
+            chunks.append(f"(() => {{\n{bindings}{body}\n}})();\n")
+        else:
+            chunks.append(f"const {_module_var(name)} = (() => {{\n{bindings}{body}\nreturn {{ {', '.join(exports)} }};\n}})();\n")
+
+    return ''.join(chunks)
+
+
+def minify_js(source):
+    """Minify with rjsmin, which tokenizes strings, template and regex literals"""
+    return rjsmin.jsmin(source).strip() + '\n'
+
+
+def minify_css(source):
+    """Minify with rcssmin, which keeps the whitespace that is significant in selectors"""
+    return rcssmin.cssmin(source).strip() + '\n'
+
+
+def check_js(source, name):
+    """
+    Parse the minified bundle with `node --check` so a minifier bug fails the
+    build instead of shipping. Skipped (with a warning) when node isn't installed.
+    """
+    node = shutil.which('node')
+    if node is None:
+        print(f"warning: node not found, {name} was not syntax-checked", file=sys.stderr)
+        return
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.js', delete=False) as f:
+        f.write(source)
+    try:
+        result = subprocess.run([node, '--check', f.name], capture_output=True, text=True)
+    finally:
+        os.remove(f.name)
+    if result.returncode != 0:
+        raise BuildError(f"{name} doesn't parse after minification:\n{result.stderr.strip()}")
+
+
+def _write_fingerprinted(name, content):
+    digest = hashlib.sha256(content.encode()).hexdigest()[:10]
+    stem, ext = os.path.splitext(os.path.basename(name))
+    filename = f"{stem}.{digest}{ext}"
+    with open(os.path.join(ASSET_DIST_DIR, filename), 'w', encoding='utf-8') as f:
+        f.write(content)
+    return filename
+
+
+def main():
+    shutil.rmtree(ASSET_DIST_DIR, ignore_errors=True)
+    os.makedirs(ASSET_DIST_DIR)
+
+    script = minify_js(bundle())
+    check_js(script, ENTRY_MODULE)
+    assets = {ENTRY_MODULE: _write_fingerprinted(ENTRY_MODULE, script)}
+    for name in STYLESHEETS:
+        with open(os.path.join(STATIC_DIR, name), encoding='utf-8') as f:
+            assets[name] = _write_fingerprinted(name, minify_css(f.read()))
+
+    manifest = {
+        'assets': assets,
+        'preload': [ENTRY_MODULE],
+        'version': hashlib.sha256(json.dumps(assets, sort_keys=True).encode()).hexdigest()[:12]
+    }
+    with open(ASSET_MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    for name, filename in assets.items():
+        size = os.path.getsize(os.path.join(ASSET_DIST_DIR, filename))
+        print(f"{name} -> {filename} ({size} bytes)")
+    print(f"Wrote {ASSET_MANIFEST_PATH}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except BuildError as e:
+        sys.exit(f"Asset build failed: {e}")
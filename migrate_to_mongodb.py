@@ -1,42 +1,311 @@
 """
-One-off migration: import rates_history.json into the MongoDB rates_history collection.
+Import rate history into the configured history store.
+
+The name predates the SQLite backend: entries are written through
+history_store, so they go to MongoDB's rates_history collection or to the
+SQLite database, whichever the app would use (see HISTORY_BACKEND), with the
+same fields (including the indexed ISO day) the app writes itself.
+
+Accepts, streaming (the input is never loaded into memory at once):
+- JSON: the legacy rates_history.json map ({"<date>": {"USD", "EUR", "timestamp"}})
+  or an array of documents (mongoexport --jsonArray)
+- NDJSON: one document per line (mongoexport's default output)
+- CSV: a header row with date,USD,EUR,timestamp (mongoexport --type=csv)
+
+Entries are upserted on date in batches (one unordered bulk_write or SQLite
+transaction each), so re-running an import is harmless. Progress is
+checkpointed after every batch to <input>.checkpoint; if an import is
+interrupted, running the same command again resumes after the last written
+batch.
 
 Usage:
-    python migrate_to_mongodb.py
+    python migrate_to_mongodb.py                          # rates_history.json
+    python migrate_to_mongodb.py export.ndjson
+    python migrate_to_mongodb.py backup.csv --batch-size 5000
+    python migrate_to_mongodb.py export.json --restart    # ignore the checkpoint
+
+Restore an export of rates_history:
+    mongoexport --uri "$MONGODB_URI" --collection rates_history --out rates.ndjson
+    python migrate_to_mongodb.py rates.ndjson
 
-Requires MONGODB_URI (and optionally MONGODB_DB_NAME) to be set, e.g. via .env.
+Uses MongoDB when MONGODB_URI is set (and optionally MONGODB_DB_NAME), e.g.
+via .env; otherwise SQLite at HISTORY_SQLITE_PATH.
 """
+import argparse
+import csv
 import json
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.db import get_db
+from app.services.history_store import get_store
 
 HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rates_history.json')
+FIELDS = ('date', 'USD', 'EUR', 'timestamp')
+FORMATS = ('json', 'ndjson', 'csv')
+
+_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\r\n'
+
+
+class _JSONStream:
+    """Incrementally decode JSON values from a file, reading it in chunks"""
+
+    def __init__(self, f):
+        self._f = f
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self._f.read(_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or '' at end of input"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON input, found {self.peek()!r}")
+        self._pos += 1
+
+    def first_key(self):
+        """Decode the first key of the object at the current position without consuming it"""
+        self.peek()
+        while True:
+            offset = self._pos + 1
+            while offset < len(self._buffer) and self._buffer[offset] in _WHITESPACE:
+                offset += 1
+            try:
+                key, _ = self._decoder.raw_decode(self._buffer, offset)
+                return key if isinstance(key, str) else None
+            except json.JSONDecodeError:
+                if self._eof or not self._fill():
+                    return None
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof or not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_json(f):
+    """
+    Yield documents from a JSON map, a JSON array or concatenated/NDJSON
+    documents. A top-level object whose first key is a document field is
+    treated as the first of a sequence of documents.
+    """
+    stream = _JSONStream(f)
+    first = stream.peek()
+
+    if first == '[':
+        stream.expect('[')
+        if stream.peek() == ']':
+            return
+        while True:
+            yield stream.value()
+            if stream.peek() == ']':
+                return
+            stream.expect(',')
+
+    if first != '{':
+        raise ValueError(f"Unrecognized JSON input starting with {first!r}")
+
+    key = stream.first_key()
+    if key in FIELDS or key == '_id':
+        while stream.peek():
+            yield stream.value()
+        return
+
+    # Legacy map: {"<date>": {...}, ...}
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    key = stream.value()
+    while True:
+        stream.expect(':')
+        yield dict(stream.value(), date=key)
+        if stream.peek() == '}':
+            return
+        stream.expect(',')
+        key = stream.value()
+
+
+def _iter_csv(f):
+    yield from csv.DictReader(f)
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def iter_documents(f, fmt):
+    """
+    Args:
+        f (file): Input opened in text mode
+        fmt (str): One of FORMATS
+
+    Returns:
+        iterator: Raw documents in input order
+    """
+    # NDJSON is a sequence of concatenated documents, which _iter_json handles
+    return _iter_csv(f) if fmt == 'csv' else _iter_json(f)
+
+
+def to_entry(doc):
+    """
+    Returns:
+        dict: The document reduced to the rates_history fields, or None if one is missing
+    """
+    if not isinstance(doc, dict) or not all(doc.get(field) for field in FIELDS):
+        return None
+    return {field: str(doc[field]) for field in FIELDS}
+
+
+class Checkpoint:
+    """Number of input records already written, persisted next to the input"""
+
+    def __init__(self, input_path):
+        self.path = f"{input_path}.checkpoint"
+        stat = os.stat(input_path)
+        self._identity = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load(self):
+        """
+        Returns:
+            int: Records to skip (0 if there is no checkpoint for this input)
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+
+        if state.get('input') != self._identity:
+            raise SystemExit(f"{self.path} belongs to a different version of the input; rerun with --restart")
+        return state['records']
+
+    def save(self, records):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'input': self._identity, 'records': records}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_batch(store, entries):
+    """
+    Upsert a batch on date (the last entry wins if a date repeats)
+
+    Returns:
+        tuple: (inserted, updated) numbers of dates
+    """
+    new_dates = store.save_rates(entries)
+    dates = {entry['date'] for entry in entries}
+    return len(new_dates), len(dates) - len(new_dates)
+
+
+def run_import(path, fmt, batch_size, restart=False):
+    checkpoint = Checkpoint(path)
+    if restart:
+        checkpoint.clear()
+    skip = checkpoint.load()
+    if skip:
+        print(f"Resuming {path} after {skip} records")
+
+    store = get_store()
+    print(f"Importing into the {store.name} history store")
+    totals = {'records': skip, 'invalid': 0, 'inserted': 0, 'updated': 0}
+    batch = []
+    started = time.perf_counter()
+
+    def flush():
+        inserted, updated = write_batch(store, batch)
+        totals['inserted'] += inserted
+        totals['updated'] += updated
+        checkpoint.save(totals['records'])
+        batch.clear()
+
+        elapsed = time.perf_counter() - started
+        print(f"  {totals['records']} records, {(totals['records'] - skip) / elapsed:.0f} records/s")
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for position, doc in enumerate(iter_documents(f, fmt)):
+            if position < skip:
+                continue
+
+            totals['records'] += 1
+            entry = to_entry(doc)
+            if entry is None:
+                totals['invalid'] += 1
+                continue
+
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+
+    if batch:
+        flush()
+    checkpoint.clear()
+
+    elapsed = time.perf_counter() - started
+    processed = totals['records'] - skip
+    print(
+        f"Imported {path}: {processed} records in {elapsed:.2f}s "
+        f"({processed / elapsed if elapsed else 0:.0f} records/s); "
+        f"{totals['inserted']} inserted, {totals['updated']} updated, {totals['invalid']} skipped as incomplete"
+    )
+    return totals
 
 
 def main():
-    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-        history = json.load(f)
-
-    collection = get_db()['rates_history']
-
-    imported = 0
-    for date, entry in history.items():
-        collection.update_one(
-            {'date': date},
-            {'$set': {
-                'USD': entry['USD'],
-                'EUR': entry['EUR'],
-                'timestamp': entry['timestamp']
-            }},
-            upsert=True
-        )
-        imported += 1
-
-    print(f"Imported {imported} entries from {HISTORY_FILE} into MongoDB.")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=HISTORY_FILE, help='input file (default: rates_history.json)')
+    parser.add_argument('--format', choices=FORMATS, help='input format (default: from the file extension)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='entries per batch write')
+    parser.add_argument('--restart', action='store_true', help='ignore any checkpoint and start from the beginning')
+    args = parser.parse_args()
+
+    try:
+        run_import(args.path, args.format or detect_format(args.path), args.batch_size, args.restart)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
 
 
 if __name__ == '__main__':
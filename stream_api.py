@@ -0,0 +1,15 @@
+"""
+BCV Exchange Rate Scraper stream service
+Serves /rates/stream on an evented worker:
+
+    gunicorn stream_api:app --worker-class gevent --worker-connections 1024
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_stream_app
+
+app = create_stream_app()
+
+if __name__ == '__main__':
+    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True)
@@ -0,0 +1,107 @@
+import pytest
+from flask import Flask
+from app import auth
+from app.config import API_KEY_DEFAULT_QUOTA
+from app.services import api_keys
+
+
+class FakeStore:
+    def __init__(self):
+        self.keys = {}
+        self.lookups = 0
+        self.down = False
+
+    def get_api_key(self, key_hash):
+        self.lookups += 1
+        if self.down:
+            raise ConnectionError('database unreachable')
+        return self.keys.get(key_hash)
+
+    def save_api_key(self, api_key):
+        self.keys[api_key['key_hash']] = dict(api_key)
+
+    def delete_api_key(self, key_id):
+        for key_hash, api_key in list(self.keys.items()):
+            if api_key['id'] == key_id:
+                return self.keys.pop(key_hash)
+        return None
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(api_keys, 'get_store', lambda: store)
+    monkeypatch.setenv('API_KEY', 'built-in-key')
+    api_keys._known.clear()
+    api_keys._unknown.clear()
+    yield store
+    api_keys._known.clear()
+    api_keys._unknown.clear()
+
+
+def test_missing_key(store):
+    assert api_keys.lookup(None) is None
+    assert api_keys.lookup('') is None
+    assert store.lookups == 0
+
+
+def test_built_in_key_needs_no_lookup(store):
+    assert api_keys.lookup('built-in-key')['id'] == api_keys.DEFAULT_KEY_ID
+    assert store.lookups == 0
+
+
+def test_issued_key_is_cached(store):
+    created = api_keys.create_key('billing', quota='5 per minute')
+    assert 'key_hash' not in created
+
+    for _ in range(3):
+        api_key = api_keys.lookup(created['key'])
+        assert api_key['id'] == created['id']
+        assert api_key['quota'] == '5 per minute'
+        assert 'key_hash' not in api_key
+    assert store.lookups == 1
+
+
+def test_unknown_key_is_negatively_cached(store):
+    assert api_keys.lookup('not-a-key') is None
+    assert api_keys.lookup('not-a-key') is None
+    assert store.lookups == 1
+
+
+def test_known_key_survives_a_database_outage(store):
+    created = api_keys.create_key('billing')
+    key_hash = api_keys.hash_key(created['key'])
+    api_keys._known.seed(key_hash, api_keys.lookup(created['key']), timestamp=0)  # expired
+
+    store.down = True
+    assert api_keys.lookup(created['key'])['id'] == created['id']
+    assert api_keys.lookup('never-seen') is None
+
+
+def test_revoked_key_stops_working(store):
+    created = api_keys.create_key('billing')
+    assert api_keys.lookup(created['key']) is not None
+
+    assert api_keys.revoke_key(created['id'])
+    assert not api_keys.revoke_key(created['id'])
+    assert api_keys.lookup(created['key']) is None
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_issued_keys_get_their_own_bucket_and_quota(store, app):
+    created = api_keys.create_key('billing', quota='5 per minute')
+    with app.test_request_context(headers={'X-API-Key': created['key']}, environ_base={'REMOTE_ADDR': '203.0.113.7'}):
+        assert auth.rate_limit_key() == f"key:{created['id']}"
+        assert auth.api_key_quota() == '5 per minute'
+        assert not auth.without_issued_api_key()
+
+
+def test_built_in_key_is_limited_per_address(store, app):
+    with app.test_request_context(headers={'X-API-Key': 'built-in-key'}, environ_base={'REMOTE_ADDR': '203.0.113.7'}):
+        assert auth.rate_limit_key() == '203.0.113.7'
+        assert auth.api_key_quota() == API_KEY_DEFAULT_QUOTA
+        assert auth.without_issued_api_key()
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from backfill_bcv_archives import format_date, format_rate, load_entries, parse_sheet
+from app.services.history_store import SQLiteHistoryStore
+
+
+def test_formats_match_the_bcv_homepage():
+    assert format_date(date(2026, 1, 2)) == 'Viernes, 02 Enero 2026'
+    assert format_rate(339.1495) == '339,14950000'
+
+
+def test_parse_sheet():
+    rows = [
+        ['Tipo de cambio de referencia'],
+        ['Fecha Operación: 31/12/2025', None],
+        ['Fecha Valor:', None, datetime(2026, 1, 2)],
+        ['EUR', 'Unión Europea', 0.85, 395.26856776],
+        ['USD', 'E.E.U.U.', 1.0, 339.1495],
+        ['CNY', 'China', 7.1, 47.8]
+    ]
+    assert parse_sheet(rows) == {
+        'date': 'Viernes, 02 Enero 2026',
+        'USD': '339,14950000',
+        'EUR': '395,26856776',
+        'timestamp': '2025-12-31T00:00:00'
+    }
+    assert parse_sheet([['Índice'], ['USD', 1.0]]) is None
+
+
+def test_load_entries_only_inserts_new_dates(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.save_rates([{'date': 'Viernes, 02 Enero 2026', 'USD': '340,00', 'EUR': '1,00', 'timestamp': '2026-01-01T17:00:00'}])
+    entries = [
+        {'date': format_date(date(2026, 1, day)), 'USD': '339,00000000', 'EUR': '1,00', 'timestamp': f'2026-01-{day - 1:02d}T00:00:00'}
+        for day in (2, 5, 6)
+    ]
+
+    assert load_entries(store, entries, batch_size=2) == 2
+    assert load_entries(store, entries, batch_size=2) == 0
+    assert store.get('Viernes, 02 Enero 2026')['USD'] == '340,00'
+    assert sorted(store.get_dates()) == ['Lunes, 05 Enero 2026', 'Martes, 06 Enero 2026', 'Viernes, 02 Enero 2026']
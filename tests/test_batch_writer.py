@@ -0,0 +1,63 @@
+import threading
+from app.services.batch_writer import BatchWriter
+
+
+class Recorder:
+    """Flush callback that records batches and can fail its first calls"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.calls = 0
+        self.failures = failures
+        self.flushed = threading.Event()
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError('database unavailable')
+        self.batches.append(batch)
+        self.flushed.set()
+
+
+def test_add_never_writes_and_a_full_buffer_flushes_in_the_background():
+    recorder = Recorder()
+    writer = BatchWriter(recorder, batch_size=3, flush_interval=60)
+
+    writer.add(1)
+    writer.add(2)
+    assert recorder.batches == []
+
+    writer.add(3)
+    assert recorder.flushed.wait(5)
+    assert recorder.batches == [[1, 2, 3]]
+
+
+def test_buffered_records_are_flushed_after_the_interval():
+    recorder = Recorder()
+    writer = BatchWriter(recorder, batch_size=100, flush_interval=0.05)
+
+    writer.add('a')
+    assert recorder.flushed.wait(5)
+    assert recorder.batches == [['a']]
+
+
+def test_failed_flushes_are_retried():
+    recorder = Recorder(failures=2)
+    writer = BatchWriter(recorder, flush_interval=60, retries=2, retry_backoff=0)
+    writer.add('a')
+    writer.add('b')
+
+    writer.flush()
+    assert recorder.calls == 3
+    assert recorder.batches == [['a', 'b']]
+
+
+def test_batch_is_dropped_once_retries_run_out():
+    recorder = Recorder(failures=5)
+    writer = BatchWriter(recorder, flush_interval=60, retries=1, retry_backoff=0)
+    writer.add('a')
+
+    writer.flush()
+    writer.flush()
+    assert recorder.calls == 2
+    assert recorder.batches == []
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from app.metrics import BINANCE_PAGES_PER_CRAWL
+from app.services import binance_p2p
+from app.services.ttl_cache import TTLCache
+
+
+def pages_observed():
+    """(crawls, pages) from the rendered binance pages-per-crawl histogram"""
+    values = dict(line.rsplit(' ', 1) for line in BINANCE_PAGES_PER_CRAWL.render() if not line.startswith('#'))
+    name = BINANCE_PAGES_PER_CRAWL.name
+    return int(values.get(f'{name}_count', 0)), float(values.get(f'{name}_sum', 0))
+
+
+def ad(price):
+    return {'adv': {'price': str(price)}, 'advertiser': {'monthFinishRate': '0.99', 'monthOrderCount': 5000}}
+
+
+@pytest.fixture
+def binance(monkeypatch):
+    """Serves the given list of pages (each a list of prices) and records which were requested"""
+    pages = []
+    requested = []
+
+    async def post_page(client, payload, page):
+        requested.append(page)
+        ads = [ad(price) for price in pages[page - 1]] if page <= len(pages) else []
+        return {'success': True, 'data': ads}
+
+    monkeypatch.setattr(binance_p2p, '_cache', TTLCache(ttl_seconds=60))
+    monkeypatch.setattr(binance_p2p, '_post_page', post_page)
+    monkeypatch.setattr(binance_p2p, 'record_p2p_price', lambda *args: None)
+    monkeypatch.setattr(binance_p2p, 'on_p2p_price', lambda *args: None)
+    monkeypatch.setattr(binance_p2p, 'publish_p2p_price', lambda *args: None)
+    return pages, requested
+
+
+def test_average_of_the_first_qualifying_prices(binance):
+    pages, _ = binance
+    pages += [[100.0] * 20, [200.0] * 20, [300.0] * 20]
+
+    assert binance_p2p.get_binance_p2p_price(num_prices=30) == 133.333
+    assert binance_p2p.get_cached_price(num_prices=30) == 133.333
+    assert binance_p2p.get_cached_price() is None
+
+
+def test_pages_per_crawl_counts_pages_used_not_fetched(binance):
+    pages, requested = binance
+    pages += [[100.0] * 20] * 5
+    crawls, total = pages_observed()
+
+    asyncio.run(binance_p2p.get_binance_p2p_price_async(num_prices=20))
+    assert requested == [1, 2, 3]
+    assert pages_observed() == (crawls + 1, total + 1)
+
+
+def test_pages_per_crawl_counts_the_page_that_ended_the_crawl(binance):
+    pages, requested = binance
+    pages += [[100.0] * 20]
+    crawls, total = pages_observed()
+
+    assert asyncio.run(binance_p2p.get_binance_p2p_price_async(num_prices=50)) == 100.0
+    assert pages_observed() == (crawls + 1, total + 2)
@@ -0,0 +1,54 @@
+import os
+import shutil
+import subprocess
+import pytest
+import build_assets
+
+needs_node = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+JS_SOURCES = sorted(os.listdir(os.path.join(build_assets.STATIC_DIR, 'js')))
+
+
+def node_check(tmp_path, source, suffix='.js'):
+    path = tmp_path / f'source{suffix}'
+    path.write_text(source, encoding='utf-8')
+    return subprocess.run(['node', '--check', str(path)], capture_output=True, text=True)
+
+
+@needs_node
+def test_minified_bundle_parses(tmp_path):
+    result = node_check(tmp_path, build_assets.minify_js(build_assets.bundle()))
+    assert result.returncode == 0, result.stderr
+
+
+@needs_node
+@pytest.mark.parametrize('name', JS_SOURCES)
+def test_each_minified_module_parses(tmp_path, name):
+    with open(os.path.join(build_assets.STATIC_DIR, 'js', name), encoding='utf-8') as f:
+        result = node_check(tmp_path, build_assets.minify_js(f.read()), suffix='.mjs')
+    assert result.returncode == 0, result.stderr
+
+
+@needs_node
+def test_regex_and_template_literals_survive(tmp_path):
+    source = (
+        "const quote = /'/g;\n"
+        "const slashes = /\\/\\//; // a comment\n"
+        "const text = `a ${'//' + `b ${1}`} /* kept */`;\n"
+        "console.log(JSON.stringify([\"it's\".replace(quote, ''), slashes.test('a//b'), text]));\n"
+    )
+    path = tmp_path / 'literals.js'
+    path.write_text(build_assets.minify_js(source), encoding='utf-8')
+    output = subprocess.run(['node', str(path)], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '["its",true,"a //b 1 /* kept */"]'
+
+
+@needs_node
+def test_check_js_fails_the_build_on_a_parse_error():
+    with pytest.raises(build_assets.BuildError):
+        build_assets.check_js('const = ;\n', 'broken.js')
+
+
+def test_css_keeps_descendant_selector_whitespace():
+    assert build_assets.minify_css('a :hover { color : red ; }\n.x  >  .y , p { margin : 0 }') == \
+        'a :hover{color:red}.x>.y,p{margin:0}\n'
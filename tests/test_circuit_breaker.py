@@ -0,0 +1,117 @@
+import asyncio
+import types
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the wall clock the breaker uses for its recovery timeout"""
+    now = [1000.0]
+    fake_time = types.SimpleNamespace(time=lambda: now[0], monotonic=circuit_breaker.time.monotonic)
+    monkeypatch.setattr(circuit_breaker, 'time', fake_time)
+    return now
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker('test', recovery_timeout=60)
+    open_breaker(breaker)
+
+    clock[0] += 59
+    assert not breaker.allow_request()
+
+    clock[0] += 1
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker('test', recovery_timeout=60)
+    open_breaker(breaker)
+    clock[0] += 60
+    assert breaker.allow_request()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker('test', recovery_timeout=60)
+    open_breaker(breaker)
+    clock[0] += 60
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['retry_at'] == clock[0] + 60
+
+
+def test_timeout_stays_at_max_until_enough_samples():
+    breaker = CircuitBreaker('test', max_timeout=10.0, min_samples=5)
+    for _ in range(4):
+        breaker.record_success(0.1)
+    assert breaker.timeout == 10.0
+
+
+def test_timeout_adapts_to_p95_latency_within_bounds():
+    breaker = CircuitBreaker('test', min_timeout=2.0, max_timeout=10.0, timeout_multiplier=3.0, min_samples=5)
+    for latency in (1.0, 1.0, 1.0, 1.0, 3.0):
+        breaker.record_success(latency)
+    assert breaker.timeout == 9.0
+
+    fast = CircuitBreaker('fast', min_timeout=2.0, min_samples=5)
+    for _ in range(5):
+        fast.record_success(0.01)
+    assert fast.timeout == 2.0
+
+    slow = CircuitBreaker('slow', max_timeout=10.0, min_samples=5)
+    for _ in range(5):
+        slow.record_success(5.0)
+    assert slow.timeout == 10.0
+
+
+def test_call_async_records_outcomes(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1)
+
+    async def succeed():
+        return 'ok'
+
+    async def fail():
+        raise ValueError('upstream down')
+
+    assert asyncio.run(breaker.call_async(succeed)) == 'ok'
+    assert breaker.snapshot()['samples'] == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(breaker.call_async(fail))
+    assert breaker.state == OPEN
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+from flask import Flask, jsonify
+from app.concurrency import ConcurrencyLimit, limit_concurrency, serving_stale
+
+
+@pytest.fixture
+def app_context():
+    with Flask(__name__).test_request_context():
+        yield
+
+
+def test_slots_and_queue_are_bounded():
+    limit = ConcurrencyLimit('test', max_active=2, max_queued=1, queue_timeout=0.01)
+    assert limit.try_acquire()
+    assert limit.try_acquire()
+    assert not limit.try_acquire()
+
+    assert limit.enqueue()
+    assert not limit.enqueue()
+    assert limit.snapshot() == {'active': 2, 'queued': 1, 'max_active': 2, 'max_queued': 1}
+
+    limit.release()
+    assert limit.wait()
+    assert limit.snapshot()['queued'] == 0
+    assert limit.snapshot()['active'] == 2
+
+
+def test_wait_gives_up_after_the_queue_timeout():
+    limit = ConcurrencyLimit('test', max_active=1, max_queued=1, queue_timeout=0.05)
+    assert limit.try_acquire()
+    assert limit.enqueue()
+    assert not limit.wait()
+    assert limit.snapshot() == {'active': 1, 'queued': 0, 'max_active': 1, 'max_queued': 1}
+
+
+def test_queued_request_gets_the_released_slot():
+    limit = ConcurrencyLimit('test', max_active=1, max_queued=1, queue_timeout=5)
+    assert limit.try_acquire()
+    assert limit.enqueue()
+
+    threading.Timer(0.05, limit.release).start()
+    assert limit.wait()
+
+
+def busy_limit():
+    """A limit whose only slot is taken and which has no queue"""
+    limit = ConcurrencyLimit('test', max_active=1, max_queued=0, queue_timeout=0.01)
+    assert limit.try_acquire()
+    return limit
+
+
+def test_view_runs_in_a_slot_and_releases_it(app_context):
+    limit = ConcurrencyLimit('test', max_active=1, max_queued=0)
+
+    @limit_concurrency(limit, has_stale=lambda: False)
+    def view():
+        assert limit.snapshot()['active'] == 1
+        return 'fresh'
+
+    assert view() == 'fresh'
+    assert limit.snapshot()['active'] == 0
+
+
+def test_shed_request_without_cache_gets_503(app_context):
+    @limit_concurrency(busy_limit(), has_stale=lambda: False)
+    def view():
+        raise AssertionError('view must not run')
+
+    body, status, headers = view()
+    assert status == 503
+    assert 'Retry-After' in headers
+    assert body.get_json()['success'] is False
+
+
+def test_shed_request_with_cache_is_served_stale(app_context):
+    @limit_concurrency(busy_limit(), has_stale=lambda: True)
+    def view():
+        assert serving_stale()
+        return jsonify({'success': True})
+
+    response = view()
+    assert response.headers['X-Load-Shed'] == 'stale'
+    assert not serving_stale()
+
+
+def test_async_views_are_limited_too(app_context):
+    @limit_concurrency(busy_limit(), has_stale=lambda: True)
+    async def view():
+        assert serving_stale()
+        return jsonify({'success': True})
+
+    response = asyncio.run(view())
+    assert response.headers['X-Load-Shed'] == 'stale'
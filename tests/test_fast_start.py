@@ -0,0 +1,58 @@
+import json
+import pytest
+from flask import Flask
+import app as app_package
+from app.config import env_flag
+from app.routes import docs
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1', True), ('true', True), (' Yes ', True), ('ON', True),
+    ('0', False), ('false', False), ('no', False), ('off', False), ('', False)
+])
+def test_env_flag_parses_booleans(monkeypatch, value, expected):
+    monkeypatch.setenv('TEST_FLAG', value)
+    assert env_flag('TEST_FLAG') is expected
+
+
+def test_env_flag_default_applies_only_when_unset(monkeypatch):
+    monkeypatch.delenv('TEST_FLAG', raising=False)
+    assert env_flag('TEST_FLAG') is False
+    assert env_flag('TEST_FLAG', default=True) is True
+
+
+@pytest.fixture
+def prebuilt_spec(tmp_path, monkeypatch):
+    path = tmp_path / 'apispec.json'
+    monkeypatch.setattr(app_package, 'PREBUILT_APISPEC_PATH', str(path))
+    monkeypatch.setattr(docs, 'PREBUILT_APISPEC_PATH', str(path))
+    return path
+
+
+def docs_app():
+    flask_app = Flask(__name__)
+    app_package._init_docs(flask_app)
+    return flask_app
+
+
+def test_fast_start_serves_the_prebuilt_spec(prebuilt_spec, monkeypatch):
+    prebuilt_spec.write_text(json.dumps({'swagger': '2.0', 'paths': {'/rates/': {}}}), encoding='utf-8')
+    monkeypatch.setenv('FAST_START', '1')
+
+    flask_app = docs_app()
+    assert 'flasgger' not in flask_app.blueprints
+    assert flask_app.test_client().get('/apispec.json').get_json()['paths'] == {'/rates/': {}}
+
+
+def test_missing_prebuilt_spec_falls_back_to_flasgger(prebuilt_spec, monkeypatch):
+    monkeypatch.setenv('FAST_START', '1')
+    assert 'flasgger' in docs_app().blueprints
+
+
+def test_spec_is_built_at_runtime_without_fast_start(prebuilt_spec, monkeypatch):
+    prebuilt_spec.write_text('{}', encoding='utf-8')
+    monkeypatch.setenv('FAST_START', '0')
+
+    flask_app = docs_app()
+    assert 'flasgger' in flask_app.blueprints
+    assert 'docs' not in flask_app.blueprints
@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+from app import db
+from app.routes.health import health_bp
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(db, 'pool_stats', db._PoolStats())
+    app = Flask(__name__)
+    app.config['RATELIMIT_ENABLED'] = False
+    app.register_blueprint(health_bp)
+    return app.test_client()
+
+
+def test_shallow_health_never_touches_the_database(client, monkeypatch):
+    monkeypatch.setattr(db, 'ping', lambda: pytest.fail('/health pinged MongoDB'))
+    assert client.get('/health').get_json() == {'status': 'ok'}
+
+
+def test_deep_health_needs_mongodb(client, monkeypatch):
+    monkeypatch.delenv('MONGODB_URI', raising=False)
+    response = client.get('/health/deep')
+    assert response.status_code == 503
+    assert response.get_json()['mongo']['error'] == 'MONGODB_URI is not configured'
+
+
+def test_deep_health_reports_ping_and_pool(client, monkeypatch):
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://db.example.com')
+    monkeypatch.setattr(db, 'ping', lambda: 12.345)
+    db.pool_stats.add(open=2, checked_out=1, checkouts=5)
+
+    body = client.get('/health/deep').get_json()
+    assert body['status'] == 'ok'
+    assert body['mongo']['ping_ms'] == 12.35
+    assert body['mongo']['pool'] == {
+        'max_pool_size': None, 'open_connections': 2, 'checked_out': 1,
+        'total_checkouts': 5, 'checkout_failures': 0
+    }
+
+
+def test_deep_health_fails_when_the_ping_does(client, monkeypatch):
+    def ping():
+        raise TimeoutError('No servers found yet')
+
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://db.example.com')
+    monkeypatch.setattr(db, 'ping', ping)
+
+    response = client.get('/health/deep')
+    assert response.status_code == 503
+    assert response.get_json()['mongo']['error'] == 'No servers found yet'
+    assert 'pool' in response.get_json()['mongo']
+
+
+def test_pool_listener_counts_connections(monkeypatch):
+    pytest.importorskip('pymongo')
+    stats = db._PoolStats()
+    monkeypatch.setattr(db, 'pool_stats', stats)
+    listener = db._pool_listener()
+
+    for _ in range(2):
+        listener.connection_created(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_in(None)
+    listener.connection_check_out_failed(None)
+    listener.connection_closed(None)
+
+    assert stats.snapshot() == {
+        'max_pool_size': None, 'open_connections': 1, 'checked_out': 1,
+        'total_checkouts': 2, 'checkout_failures': 1
+    }
+
+
+def test_pool_options_come_from_the_environment(monkeypatch):
+    pytest.importorskip('pymongo')
+    monkeypatch.setenv('MONGODB_MAX_POOL_SIZE', '25')
+    monkeypatch.delenv('MONGODB_MIN_POOL_SIZE', raising=False)
+
+    options = db._client_options()
+    assert (options['minPoolSize'], options['maxPoolSize']) == (1, 25)
+    assert options['serverSelectionTimeoutMS'] == 5000
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+from datetime import date
+import pytest
+from app.services.history_store import HistoryStore, SQLiteHistoryStore
+
+
+def entry(bcv_date, usd, timestamp):
+    return {'date': bcv_date, 'USD': usd, 'EUR': '1,00', 'timestamp': timestamp}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteHistoryStore(str(tmp_path / 'history.sqlite3'))
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class Incomplete(HistoryStore):
+        def save_rates(self, entries):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize('path', [':memory:', ''])
+def test_in_memory_database_is_rejected(path):
+    with pytest.raises(ValueError):
+        SQLiteHistoryStore(path)
+
+
+def test_every_thread_sees_the_same_database(store):
+    store.save_rates([entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00')])
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(store.get('Jueves, 15 Enero 2026')))
+    thread.start()
+    thread.join()
+    assert seen[0]['USD'] == '339,14'
+
+
+def test_save_rates_reports_new_dates_and_upserts(store):
+    assert store.save_rates([entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00')]) == ['Jueves, 15 Enero 2026']
+    assert store.save_rates([
+        entry('Jueves, 15 Enero 2026', '340,00', '2026-01-14T18:00:00'),
+        entry('Viernes, 16 Enero 2026', '341,00', '2026-01-15T17:00:00')
+    ]) == ['Viernes, 16 Enero 2026']
+
+    assert store.get('Jueves, 15 Enero 2026') == {'USD': '340,00', 'EUR': '1,00', 'timestamp': '2026-01-14T18:00:00'}
+    assert store.get('Lunes, 01 Enero 2024') is None
+    assert set(store.get_all()) == {'Jueves, 15 Enero 2026', 'Viernes, 16 Enero 2026'}
+
+
+def test_last_entry_wins_within_a_batch(store):
+    store.save_rates([
+        entry('Jueves, 15 Enero 2026', '1,00', '2026-01-14T17:00:00'),
+        entry('Jueves, 15 Enero 2026', '2,00', '2026-01-14T18:00:00')
+    ])
+    assert store.get('Jueves, 15 Enero 2026')['USD'] == '2,00'
+
+
+def test_latest_and_dates_order_by_timestamp(store):
+    store.save_rates([
+        entry('Miércoles, 14 Enero 2026', '1,00', '2026-01-13T17:00:00'),
+        entry('Viernes, 16 Enero 2026', '3,00', '2026-01-15T17:00:00'),
+        entry('Jueves, 15 Enero 2026', '2,00', '2026-01-14T17:00:00')
+    ])
+    assert [bcv_date for bcv_date, _ in store.get_latest(2)] == ['Viernes, 16 Enero 2026', 'Jueves, 15 Enero 2026']
+    assert store.get_dates() == ['Viernes, 16 Enero 2026', 'Jueves, 15 Enero 2026', 'Miércoles, 14 Enero 2026']
+
+
+def test_get_since_filters_on_the_bcv_date(store):
+    store.save_rates([
+        entry('Miércoles, 14 Enero 2026', '1,00', '2026-01-13T17:00:00'),
+        entry('Jueves, 15 Enero 2026', '2,00', '2026-01-14T17:00:00'),
+        entry('Lunes, 02 Febrero 2026', '3,00', '2026-01-30T17:00:00')
+    ])
+    assert sorted(bcv_date for bcv_date, _ in store.get_since(date(2026, 1, 14))) == [
+        'Jueves, 15 Enero 2026', 'Lunes, 02 Febrero 2026'
+    ]
+
+
+def test_get_since_fills_in_days_for_databases_created_before_them(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE rates_history (date TEXT PRIMARY KEY, usd TEXT NOT NULL, eur TEXT NOT NULL, timestamp TEXT NOT NULL)")
+    connection.executemany("INSERT INTO rates_history VALUES (?, ?, ?, ?)", [
+        ('Miércoles, 14 Enero 2026', '1,00', '1,00', '2026-01-13T17:00:00'),
+        ('Jueves, 15 Enero 2026', '2,00', '1,00', '2026-01-14T17:00:00'),
+        ('not a date', '3,00', '1,00', '2026-01-15T17:00:00')
+    ])
+    connection.commit()
+    connection.close()
+
+    store = SQLiteHistoryStore(path)
+    assert [bcv_date for bcv_date, _ in store.get_since(date(2026, 1, 14))] == ['Jueves, 15 Enero 2026']
+
+    days = dict(sqlite3.connect(path).execute("SELECT date, day FROM rates_history"))
+    assert days == {'Miércoles, 14 Enero 2026': '2026-01-14', 'Jueves, 15 Enero 2026': '2026-01-15', 'not a date': ''}
+
+
+def test_webhooks_are_scoped_to_their_owner(store):
+    subscription = {'id': 'a1', 'owner': 'k1', 'url': 'https://example.com/hook', 'secret': 's', 'created_at': '2026-01-15T00:00:00+00:00'}
+    store.save_webhook(subscription)
+    assert store.get_webhooks() == [subscription]
+    assert store.get_webhooks('k1') == [subscription]
+    assert store.get_webhooks('k2') == []
+
+    assert not store.delete_webhook('a1', 'k2')
+    assert store.delete_webhook('a1', 'k1')
+    assert not store.delete_webhook('a1', 'k1')
+    assert store.get_webhooks() == []
+
+
+def test_webhooks_saved_before_owners_belong_to_no_key(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE webhook_subscriptions (id TEXT PRIMARY KEY, url TEXT NOT NULL, secret TEXT NOT NULL, created_at TEXT NOT NULL)")
+    connection.execute("INSERT INTO webhook_subscriptions VALUES ('a1', 'https://example.com/hook', 's', '2026-01-15T00:00:00+00:00')")
+    connection.commit()
+    connection.close()
+
+    store = SQLiteHistoryStore(path)
+    assert [subscription['owner'] for subscription in store.get_webhooks()] == [None]
+    assert store.get_webhooks('k1') == []
+
+
+def test_api_keys(store):
+    api_key = {'id': 'k1', 'name': 'billing', 'key_hash': 'h1', 'quota': '5 per minute', 'created_at': '2026-01-15T00:00:00+00:00'}
+    store.save_api_key(api_key)
+    assert store.get_api_key('h1') == api_key
+    assert store.get_api_key('h2') is None
+    assert store.get_api_keys() == [api_key]
+
+    assert store.delete_api_key('k1') == api_key
+    assert store.delete_api_key('k1') is None
+    assert store.get_api_key('h1') is None
+
+
+def test_insert_rates_leaves_stored_dates_untouched(store):
+    store.save_rates([entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00')])
+
+    assert store.insert_rates([
+        entry('Jueves, 15 Enero 2026', '1,00', '2026-01-14T00:00:00'),
+        entry('Viernes, 16 Enero 2026', '341,00', '2026-01-15T00:00:00'),
+        entry('Viernes, 16 Enero 2026', '2,00', '2026-01-15T00:00:00')
+    ]) == ['Viernes, 16 Enero 2026']
+    assert store.get('Jueves, 15 Enero 2026')['USD'] == '339,14'
+    assert store.get('Viernes, 16 Enero 2026')['USD'] == '341,00'
+    assert [bcv_date for bcv_date, _ in store.get_since(date(2026, 1, 15))] == ['Viernes, 16 Enero 2026']
@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import queue
+import sys
+import pytest
+from flask import Flask
+from app import logs
+
+
+def make_record(msg='hello %s', args=('world',), exc_info=None, **extra):
+    record = logging.LogRecord('app.test', logging.WARNING, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_records_are_formatted_as_one_json_object_with_extra_fields():
+    line = logs.JsonFormatter().format(make_record(request_id='abc', duration_ms=1.5))
+    entry = json.loads(line)
+
+    assert '\n' not in line
+    assert entry['level'] == 'WARNING'
+    assert entry['logger'] == 'app.test'
+    assert entry['message'] == 'hello world'
+    assert entry['time'].endswith('+00:00')
+    assert entry['request_id'] == 'abc'
+    assert entry['duration_ms'] == 1.5
+    assert 'args' not in entry and 'lineno' not in entry
+
+
+def test_queued_records_carry_the_rendered_message_and_traceback():
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+
+    handler = logs._NonBlockingQueueHandler(queue.Queue())
+    prepared = handler.prepare(record)
+    entry = json.loads(logs.JsonFormatter().format(prepared))
+
+    assert entry['message'] == 'hello world'
+    assert entry['exception'].startswith('Traceback') and 'ValueError: boom' in entry['exception']
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = logs._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.dropped == 1
+
+
+def test_sampled_records_are_dropped_at_their_rate():
+    context = logs._ContextFilter()
+    assert context.filter(make_record(sample_rate=1.0))
+    assert not context.filter(make_record(sample_rate=0.0))
+
+
+def test_invalid_level_overrides_are_ignored():
+    assert logs._parse_levels('app.access=warning, app.x=LOUD, app.y') == {'app.access': 'WARNING'}
+
+
+@pytest.fixture
+def access_log():
+    """JSON lines written for "app.access", tagged like the queue handler tags them"""
+    output = io.StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logs.JsonFormatter())
+    handler.addFilter(logs._ContextFilter())
+    access_logger = logging.getLogger('app.access')
+    access_logger.addHandler(handler)
+    yield lambda: [json.loads(line) for line in output.getvalue().splitlines()]
+    access_logger.removeHandler(handler)
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    logs.init_app(app)
+
+    @app.route('/ok')
+    def ok():
+        return 'ok'
+
+    return app.test_client()
+
+
+def test_requests_are_logged_with_their_id(client, access_log):
+    response = client.get('/ok', headers={'X-Request-ID': 'client-id.1'})
+    assert response.headers['X-Request-ID'] == 'client-id.1'
+
+    entry = access_log()[-1]
+    assert entry['message'] == 'GET /ok 200'
+    assert entry['request_id'] == 'client-id.1'
+    assert (entry['method'], entry['path'], entry['endpoint'], entry['status']) == ('GET', '/ok', 'ok', 200)
+    assert entry['duration_ms'] >= 0
+
+
+def test_invalid_request_ids_are_replaced(client, access_log):
+    response = client.get('/ok', headers={'X-Request-ID': 'has spaces'})
+    request_id = response.headers['X-Request-ID']
+    assert len(request_id) == 32 and access_log()[-1]['request_id'] == request_id
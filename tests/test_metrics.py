@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from app.metrics import Counter, Histogram, WEBHOOK_DELIVERIES
+from app.routes.metrics import metrics_bp
+
+
+def test_counter_renders_prometheus_text():
+    counter = Counter('test_events_total', 'Events by kind', ('kind',))
+    counter.inc(kind='a')
+    counter.inc(2, kind='b')
+    assert counter.render() == [
+        '# HELP test_events_total Events by kind',
+        '# TYPE test_events_total counter',
+        'test_events_total{kind="a"} 1',
+        'test_events_total{kind="b"} 2'
+    ]
+
+
+def test_decorated_calls_are_timed_separately():
+    histogram = Histogram('test_call_seconds', 'Call latency', buckets=(0.05, 1.0))
+
+    @histogram.time()
+    def call(delay):
+        time.sleep(delay)
+
+    threads = [threading.Thread(target=call, args=(delay,)) for delay in (0.0, 0.2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = histogram.render()
+    assert 'test_call_seconds_bucket{le="0.05"} 1' in lines
+    assert 'test_call_seconds_count 2' in lines
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(metrics_bp)
+    return app.test_client()
+
+
+def test_metrics_needs_a_configured_token(client, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    monkeypatch.delenv('ADMIN_API_KEY', raising=False)
+    assert client.get('/metrics').status_code == 500
+
+
+def test_metrics_accepts_the_bearer_token_or_admin_key(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-token')
+    monkeypatch.setenv('ADMIN_API_KEY', 'admin-key')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Basic scrape-token'}).status_code == 401
+    assert client.get('/metrics', headers={'X-Admin-Key': 'admin-key'}).status_code == 200
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+
+def test_webhook_metrics_carry_no_subscription_ids(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-token')
+    WEBHOOK_DELIVERIES.inc(outcome='delivered')
+
+    body = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'}).get_data(as_text=True)
+    deliveries = [line for line in body.splitlines() if line.startswith('webhook_deliveries_total{')]
+    assert deliveries and all(line.startswith('webhook_deliveries_total{outcome=') for line in deliveries)
+    assert 'subscription=' not in body
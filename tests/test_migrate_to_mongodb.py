@@ -0,0 +1,62 @@
+import io
+import json
+import sqlite3
+from datetime import date
+import pytest
+import migrate_to_mongodb
+from app.services.history_store import SQLiteHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setattr(migrate_to_mongodb, 'get_store', lambda: store)
+    return store
+
+
+def rate(usd, timestamp):
+    return {'USD': usd, 'EUR': '1,00', 'timestamp': timestamp}
+
+
+@pytest.mark.parametrize('fmt, text', [
+    ('json', '{"Jueves, 15 Enero 2026": {"USD": "1,00", "EUR": "2,00", "timestamp": "t"}}'),
+    ('json', '[{"date": "Jueves, 15 Enero 2026", "USD": "1,00", "EUR": "2,00", "timestamp": "t"}]'),
+    ('ndjson', '{"date": "Jueves, 15 Enero 2026", "USD": "1,00", "EUR": "2,00", "timestamp": "t"}\n'),
+    ('csv', 'date,USD,EUR,timestamp\n"Jueves, 15 Enero 2026","1,00","2,00",t\n')
+])
+def test_every_format_yields_the_same_entry(fmt, text):
+    entries = [migrate_to_mongodb.to_entry(doc) for doc in migrate_to_mongodb.iter_documents(io.StringIO(text), fmt)]
+    assert entries == [{'date': 'Jueves, 15 Enero 2026', 'USD': '1,00', 'EUR': '2,00', 'timestamp': 't'}]
+
+
+def test_import_writes_through_the_history_store(tmp_path, store):
+    path = tmp_path / 'rates_history.json'
+    path.write_text(json.dumps({
+        'Miércoles, 14 Enero 2026': rate('1,00', '2026-01-13T17:00:00'),
+        'Jueves, 15 Enero 2026': rate('2,00', '2026-01-14T17:00:00'),
+        'incomplete': {'USD': '3,00'}
+    }), encoding='utf-8')
+
+    totals = migrate_to_mongodb.run_import(str(path), 'json', batch_size=1)
+    assert (totals['inserted'], totals['updated'], totals['invalid']) == (2, 0, 1)
+    assert not (tmp_path / 'rates_history.json.checkpoint').exists()
+
+    days = dict(sqlite3.connect(store.path).execute("SELECT date, day FROM rates_history"))
+    assert days == {'Miércoles, 14 Enero 2026': '2026-01-14', 'Jueves, 15 Enero 2026': '2026-01-15'}
+    assert [bcv_date for bcv_date, _ in store.get_since(date(2026, 1, 14))] == ['Jueves, 15 Enero 2026']
+
+    totals = migrate_to_mongodb.run_import(str(path), 'json', batch_size=10)
+    assert (totals['inserted'], totals['updated']) == (0, 2)
+
+
+def test_import_resumes_after_the_checkpoint(tmp_path, store):
+    path = tmp_path / 'rates.ndjson'
+    path.write_text(''.join(
+        json.dumps({'date': f'{day:02d} Enero 2026', **rate('1,00', f'2026-01-{day:02d}T17:00:00')}) + '\n'
+        for day in range(1, 5)
+    ), encoding='utf-8')
+    migrate_to_mongodb.Checkpoint(str(path)).save(3)
+
+    totals = migrate_to_mongodb.run_import(str(path), 'ndjson', batch_size=10)
+    assert totals['inserted'] == 1
+    assert list(store.get_all()) == ['04 Enero 2026']
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services import p2p_history
+
+mongomock = pytest.importorskip('mongomock')
+
+START = datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = mongomock.MongoClient(tz_aware=True)['bcv_scrape'][p2p_history.COLLECTION_NAME]
+    monkeypatch.setattr(p2p_history, 'get_collection', lambda: collection)
+    monkeypatch.setattr(p2p_history, 'is_configured', lambda: True)
+    monkeypatch.setattr(p2p_history, '_MAX_RAW_POINTS', 3)
+    return collection
+
+
+def add_prices(collection, prices, asset='USDT'):
+    collection.insert_many([
+        {'timestamp': START + timedelta(minutes=5 * index), 'meta': {'asset': asset, 'fiat': 'VES'}, 'price': price, 'samples': 10}
+        for index, price in enumerate(prices)
+    ])
+
+
+def test_raw_range_within_the_limit(collection):
+    add_prices(collection, [400.0, 401.0])
+    add_prices(collection, [1.0], asset='USDC')
+
+    points, truncated = p2p_history.get_price_history(start=START, end=START + timedelta(days=1))
+    assert [point['price'] for point in points] == [400.0, 401.0]
+    assert points[0]['timestamp'] == START.isoformat()
+    assert not truncated
+
+
+def test_raw_range_over_the_limit_keeps_the_newest_points(collection):
+    add_prices(collection, [400.0, 401.0, 402.0, 403.0, 404.0])
+
+    points, truncated = p2p_history.get_price_history(start=START, end=START + timedelta(days=1))
+    assert [point['price'] for point in points] == [402.0, 403.0, 404.0]
+    assert truncated
+
+
+def test_unknown_interval_is_rejected(collection):
+    with pytest.raises(ValueError):
+        p2p_history.get_price_history(interval='minute')
+
+
+def test_nothing_is_recorded_or_read_without_mongodb(monkeypatch):
+    monkeypatch.setattr(p2p_history, 'is_configured', lambda: False)
+    monkeypatch.setattr(p2p_history, '_writer', None)  # would raise if used
+
+    p2p_history.record_p2p_price('USDT', 'VES', 400.0, 10)
+    assert p2p_history.get_price_history() == ([], False)
+    assert p2p_history.get_latest_price() is None
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+import pytest
+from flask import Flask
+from app import profiling
+from app.profiling import phase, server_timing
+from app.routes.debug import debug_bp
+
+ADMIN = {'X-Admin-Key': 'admin-key'}
+
+
+def test_server_timing_sums_phases_in_milliseconds():
+    header = server_timing({'bcv_fetch': [0.25, 1], 'binance_page': [0.5, 3]})
+    assert header == 'bcv_fetch;dur=250.0, binance_page;dur=500.0;desc="3x"'
+
+
+def test_phase_outside_a_request_does_nothing():
+    with phase('outside'):
+        pass
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 0)
+    monkeypatch.setenv('ADMIN_API_KEY', 'admin-key')
+
+    app = Flask(__name__)
+    profiling.init_app(app)
+    app.register_blueprint(debug_bp)
+
+    @app.route('/sync')
+    def sync_view():
+        for _ in range(2):
+            with phase('parse'):
+                pass
+        return 'ok'
+
+    @app.route('/async')
+    async def async_view():
+        async def page():
+            with phase('page'):
+                await asyncio.sleep(0)
+        await asyncio.gather(page(), page(), page())
+        return 'ok'
+
+    @app.route('/plain')
+    def plain_view():
+        return 'ok'
+
+    return app.test_client()
+
+
+def test_phases_are_reported_in_server_timing(client):
+    assert client.get('/sync').headers['Server-Timing'].endswith(';desc="2x"')
+    assert client.get('/async').headers['Server-Timing'].startswith('page;dur=')
+    assert 'Server-Timing' not in client.get('/plain').headers
+
+
+def test_profiling_needs_the_admin_key(client):
+    assert 'X-Profile-Id' not in client.get('/plain', headers={'X-Profile': '1'}).headers
+    assert 'X-Profile-Id' not in client.get('/plain', headers={'X-Profile': '1', 'X-Admin-Key': 'wrong'}).headers
+
+
+def test_profiled_request_can_be_fetched(client):
+    response = client.get('/async', headers={'X-Profile': '1', **ADMIN})
+    profile_id = response.headers['X-Profile-Id']
+    assert response.headers['Server-Timing'].startswith('page;dur=')
+
+    listed = client.get('/debug/profiles', headers=ADMIN).get_json()['data']
+    assert [profile['id'] for profile in listed] == [profile_id]
+    assert ' GET /async async_view ' in listed[0]['request']
+
+    report = client.get(f'/debug/profiles/{profile_id}', headers=ADMIN)
+    assert report.status_code == 200
+    assert 'function calls' in report.get_data(as_text=True)
+    assert client.get(f'/debug/profiles/{profile_id}').status_code == 401
+    assert client.get('/debug/profiles/' + '0' * 32, headers=ADMIN).status_code == 404
+
+
+def test_only_the_newest_profiles_are_kept(client, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_KEEP', 2)
+    ids = []
+    for age in (2, 1, 0):
+        ids.append(client.get('/plain', headers={'X-Profile': '1', **ADMIN}).headers['X-Profile-Id'])
+        # Distinct mtimes, oldest first, however coarse the filesystem's clock
+        modified = time.time() - age * 60
+        os.utime(profiling.profile_path(ids[-1]), (modified, modified))
+
+    assert profiling.profile_path(ids[0]) is None
+    assert all(profiling.profile_path(profile_id) for profile_id in ids[1:])
@@ -0,0 +1,76 @@
+from datetime import date, datetime, time
+import pytest
+from app.services import publication_schedule as schedule
+from app.services.publication_schedule import CARACAS
+
+
+def caracas_timestamps(*times):
+    return [f'2026-01-{index + 1:02d}T{moment}:00-04:00' for index, moment in enumerate(times)]
+
+
+def test_learn_window_brackets_publication_times_with_padding():
+    times = [f'{16 + minutes // 60}:{minutes % 60:02d}' for minutes in range(0, 100, 10)]  # 16:00 .. 17:30
+    assert schedule.learn_window(caracas_timestamps(*times)) == (time(15, 40), time(18, 0))
+
+
+def test_learn_window_converts_to_caracas_time():
+    timestamps = [f'2026-01-{day:02d}T21:00:00+00:00' for day in range(1, 11)]  # 17:00 in Caracas
+    assert schedule.learn_window(timestamps) == (time(16, 30), time(17, 30))
+
+
+def test_learn_window_needs_enough_samples():
+    assert schedule.learn_window(caracas_timestamps('16:00', '16:30', '17:00', '17:30')) == schedule.DEFAULT_WINDOW
+
+
+def test_learn_window_ignores_backfilled_midnight_timestamps():
+    timestamps = caracas_timestamps(*['00:00'] * 10) + caracas_timestamps('16:00', '17:00')
+    assert schedule.learn_window(timestamps) == schedule.DEFAULT_WINDOW
+
+
+@pytest.fixture
+def window(monkeypatch):
+    monkeypatch.setattr(schedule, 'get_window', lambda: (time(16, 0), time(18, 0)))
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 1, day, hour, minute, tzinfo=CARACAS)
+
+
+THURSDAY = {'date': 'Jueves, 15 Enero 2026'}
+
+
+@pytest.mark.parametrize('now, expected', [
+    (at(15, 10), schedule.BEFORE_WINDOW_MAX_AGE),
+    (at(15, 16), schedule.IN_WINDOW_MAX_AGE),
+    (at(15, 18), schedule.IN_WINDOW_MAX_AGE),
+    (at(15, 18, 1), schedule.LATE_MAX_AGE)
+])
+def test_max_age_on_a_business_day(window, now, expected):
+    assert schedule.max_age(THURSDAY, now) == expected
+
+
+def test_max_age_once_the_next_date_is_published(window):
+    assert schedule.max_age({'date': 'Viernes, 16 Enero 2026'}, at(15, 17)) == schedule.DONE_MAX_AGE
+
+
+def test_max_age_on_weekends_and_holidays(window):
+    assert schedule.max_age(THURSDAY, at(17, 17)) == schedule.OFF_DAY_MAX_AGE  # Saturday
+    assert schedule.max_age(THURSDAY, at(1, 17)) == schedule.OFF_DAY_MAX_AGE   # New Year's Day
+
+
+def test_max_age_without_cached_rates(window):
+    assert schedule.max_age(None, at(15, 17)) == schedule.IN_WINDOW_MAX_AGE
+
+
+def test_max_age_converts_now_to_caracas_time(window):
+    # 21:00 UTC is 17:00 in Caracas
+    now = datetime.fromisoformat('2026-01-15T21:00:00+00:00')
+    assert schedule.max_age(THURSDAY, now) == schedule.IN_WINDOW_MAX_AGE
+
+
+def test_extra_holidays(monkeypatch):
+    assert schedule._parse_holidays(' 2026-02-16, bad,,2026-02-17') == {date(2026, 2, 16), date(2026, 2, 17)}
+
+    monkeypatch.setattr(schedule, '_EXTRA_HOLIDAYS', frozenset({date(2026, 2, 16)}))
+    assert not schedule.is_business_day(date(2026, 2, 16))
+    assert schedule.is_business_day(date(2026, 2, 18))
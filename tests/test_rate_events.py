@@ -0,0 +1,108 @@
+import pytest
+from flask import Flask
+from app import create_stream_app
+from app.routes.stream import stream_bp
+from app.services import rate_events
+
+HEADERS = {'X-API-Key': 'built-in-key'}
+
+
+def test_subscribers_are_capped_until_one_leaves():
+    broadcaster = rate_events.Broadcaster(max_subscribers=2)
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    assert first is not None and second is not None
+    assert broadcaster.subscribe() is None
+
+    broadcaster.unsubscribe(first)
+    assert broadcaster.subscribe() is not None
+
+
+def test_new_subscribers_get_the_latest_event_of_each_kind():
+    broadcaster = rate_events.Broadcaster()
+    broadcaster.publish('rates', {'date': 'a'})
+    broadcaster.publish('rates', {'date': 'b'})
+    broadcaster.publish('p2p', {'price': 1})
+
+    subscription = broadcaster.subscribe()
+    assert [subscription.get_nowait()[1:] for _ in range(2)] == [('rates', {'date': 'b'}), ('p2p', {'price': 1})]
+    assert subscription.empty()
+
+
+def test_slow_subscribers_lose_the_oldest_events():
+    broadcaster = rate_events.Broadcaster()
+    subscription = broadcaster.subscribe()
+    for price in range(rate_events._QUEUE_SIZE + 5):
+        broadcaster.publish('p2p', {'price': price})
+
+    prices = [subscription.get_nowait()[2]['price'] for _ in range(subscription.qsize())]
+    assert prices == list(range(5, rate_events._QUEUE_SIZE + 5))
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    """A fresh broadcaster with room for one stream, and no upstream poller"""
+    broadcaster = rate_events.Broadcaster(max_subscribers=1)
+    monkeypatch.setattr(rate_events, 'broadcaster', broadcaster)
+    monkeypatch.setattr(rate_events, '_ensure_poller', lambda: None)
+    monkeypatch.setenv('API_KEY', 'built-in-key')
+    return broadcaster
+
+
+@pytest.fixture
+def client(broadcaster):
+    app = Flask(__name__)
+    app.register_blueprint(stream_bp)
+    return app.test_client()
+
+
+def test_stream_sends_the_latest_rates_on_connect(client, broadcaster):
+    broadcaster.publish('rates', {'USD': '36,50', 'date': 'Martes, 30 Diciembre 2025'})
+
+    response = client.get('/rates/stream', headers=HEADERS)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    chunks = response.response
+    assert next(chunks) == b'retry: 5000\n\n'
+    assert next(chunks) == b'id: 1\nevent: rates\ndata: {"USD": "36,50", "date": "Martes, 30 Diciembre 2025"}\n\n'
+    assert broadcaster.subscriber_count == 1
+
+    response.close()
+    assert broadcaster.subscriber_count == 0
+
+
+def test_stream_past_the_cap_gets_503(client, broadcaster):
+    broadcaster.publish('rates', {'date': 'a'})
+    open_stream = client.get('/rates/stream', headers=HEADERS)
+    next(open_stream.response)
+
+    busy = client.get('/rates/stream', headers=HEADERS)
+    assert busy.status_code == 503
+    assert busy.headers['Retry-After'] == '60'
+
+    open_stream.close()
+    assert client.get('/rates/stream', headers=HEADERS).status_code == 200
+
+
+def test_stream_needs_an_api_key(client):
+    assert client.get('/rates/stream').status_code == 401
+
+
+def test_stream_redirects_to_the_stream_service(broadcaster):
+    app = Flask(__name__)
+    app.config['RATES_STREAM_URL'] = 'https://stream.example.com/'
+    app.register_blueprint(stream_bp)
+
+    response = app.test_client().get('/rates/stream', headers=HEADERS)
+    assert response.status_code == 307
+    assert response.headers['Location'] == 'https://stream.example.com/rates/stream'
+    assert broadcaster.subscriber_count == 0
+
+
+def test_stream_app_serves_only_the_stream_and_health_checks():
+    app = create_stream_app({'WARM_START': False, 'RATELIMIT_ENABLED': False})
+    rules = {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+    assert '/rates/stream' in rules
+    assert all(rule == '/rates/stream' or rule.startswith('/health') for rule in rules)
+    assert 'RATES_STREAM_URL' not in app.config
@@ -0,0 +1,93 @@
+import pytest
+from flask import Flask
+from app.routes.rates import rates_bp
+from app.services import rates_history
+from app.services.batch_writer import BatchWriter
+from app.services.history_store import SQLiteHistoryStore
+
+HEADERS = {'X-API-Key': 'built-in-key'}
+
+
+def entry(bcv_date, usd, timestamp):
+    return {'date': bcv_date, 'USD': usd, 'EUR': '1,00', 'timestamp': timestamp}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setattr(rates_history, 'get_store', lambda: store)
+    return store
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setenv('API_KEY', 'built-in-key')
+    app = Flask(__name__)
+    app.config['RATELIMIT_ENABLED'] = False
+    app.register_blueprint(rates_bp)
+    return app.test_client()
+
+
+def test_columnar_history_is_ordered_by_bcv_date(store):
+    # Saved out of order, and with a timestamp order that differs from the BCV date order
+    store.save_rates([
+        entry('Viernes, 16 Enero 2026', '341,00', '2026-01-15T17:00:00'),
+        entry('Martes, 30 Diciembre 2025', '300,00', '2026-01-16T09:00:00'),
+        entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00'),
+        entry('not a date', '1,00', '2026-01-14T17:00:00')
+    ])
+
+    assert rates_history.get_columnar_history() == {
+        'date': ['2025-12-30', '2026-01-15', '2026-01-16'],
+        'USD': ['300,00', '339,14', '341,00'],
+        'EUR': ['1,00', '1,00', '1,00']
+    }
+
+
+def test_columnar_route_returns_only_days_after_since(client, store):
+    store.save_rates([
+        entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00'),
+        entry('Viernes, 16 Enero 2026', '341,00', '2026-01-15T17:00:00')
+    ])
+
+    response = client.get('/rates/history/columnar?since=2026-01-15', headers=HEADERS)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert 'Accept' in response.headers['Vary']
+    assert response.get_json()['data'] == {'date': ['2026-01-16'], 'USD': ['341,00'], 'EUR': ['1,00']}
+
+    everything = client.get('/rates/history/columnar', headers=HEADERS).get_json()['data']
+    assert everything['date'] == ['2026-01-15', '2026-01-16']
+
+
+def test_columnar_route_rejects_an_invalid_since(client):
+    response = client.get('/rates/history/columnar?since=15/01/2026', headers=HEADERS)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_columnar_route_sends_msgpack_when_asked(client, store):
+    msgpack = pytest.importorskip('msgpack')
+    store.save_rates([entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00')])
+
+    response = client.get('/rates/history/columnar', headers={**HEADERS, 'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data)['data']['date'] == ['2026-01-15']
+
+
+def test_saves_are_queued_and_only_new_dates_announced(store, monkeypatch):
+    announced = []
+    monkeypatch.setattr(rates_history, 'notify_rate_published', lambda date, entry: announced.append((date, entry['USD'])))
+    writer = BatchWriter(rates_history._write_batch, flush_interval=60)
+    monkeypatch.setattr(rates_history, '_writer', writer)
+    store.save_rates([entry('Jueves, 15 Enero 2026', '339,14', '2026-01-14T17:00:00')])
+
+    rates_history.save_rate_to_history('Jueves, 15 Enero 2026', '339,50', '1,00')
+    rates_history.save_rate_to_history('Viernes, 16 Enero 2026', '340,00', '1,00')
+    rates_history.save_rate_to_history('Viernes, 16 Enero 2026', '341,00', '1,00')
+    assert store.get('Viernes, 16 Enero 2026') is None
+
+    writer.flush()
+    assert store.get('Jueves, 15 Enero 2026')['USD'] == '339,50'
+    assert store.get('Viernes, 16 Enero 2026')['USD'] == '341,00'
+    assert announced == [('Viernes, 16 Enero 2026', '341,00')]
@@ -0,0 +1,76 @@
+import json
+import shutil
+import subprocess
+import pytest
+from flask import Flask
+from app import assets
+from app.routes.calculator import calculator_bp
+
+needs_node = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+# Minimal service worker globals: records which requests the worker answers itself
+HARNESS = """
+const listeners = {};
+globalThis.self = {
+    location: { origin: 'https://bcv.example' },
+    addEventListener: (type, listener) => { listeners[type] = listener; },
+    skipWaiting: () => {},
+    clients: { claim: () => {} }
+};
+globalThis.caches = {
+    open: async () => ({ match: async () => undefined, put: async () => {}, addAll: async () => {} }),
+    keys: async () => []
+};
+globalThis.fetch = async () => ({ ok: true, clone() { return this; } });
+
+%s
+
+const handled = [];
+for (const [method, url] of %s) {
+    listeners.fetch({
+        request: { method, url },
+        respondWith: () => handled.push(`${method} ${url}`),
+        waitUntil: () => {}
+    });
+}
+console.log(JSON.stringify(handled));
+"""
+
+
+@pytest.fixture
+def client():
+    app = Flask('app')
+    assets.init_app(app)
+    app.register_blueprint(calculator_bp)
+    return app.test_client()
+
+
+def test_service_worker_is_never_cached(client):
+    response = client.get('/sw.js')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/javascript'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    body = response.get_data(as_text=True)
+    assert f'const VERSION = {json.dumps(assets.version())};' in body
+    assert '"/calculator"' in body
+
+
+@needs_node
+def test_columnar_history_and_streams_bypass_the_cache(client, tmp_path):
+    requests = [
+        ['GET', 'https://bcv.example/calculator'],
+        ['GET', 'https://bcv.example/assets/main.0123456789.js'],
+        ['GET', 'https://bcv.example/rates/'],
+        ['GET', 'https://bcv.example/rates/history/2026-01-15'],
+        ['GET', 'https://bcv.example/p2p/usdt'],
+        ['GET', 'https://bcv.example/rates/history/columnar?since=2026-01-15'],
+        ['GET', 'https://bcv.example/rates/stream'],
+        ['POST', 'https://bcv.example/rates/'],
+        ['GET', 'https://cdn.example/rates/']
+    ]
+    script = tmp_path / 'sw_harness.js'
+    script.write_text(HARNESS % (client.get('/sw.js').get_data(as_text=True), json.dumps(requests)), encoding='utf-8')
+
+    output = subprocess.run(['node', str(script)], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output) == [f'{method} {url}' for method, url in requests[:5]]
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services import bcv_scraper, spread
+from app.services.ttl_cache import TTLCache
+
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = FakeWriter()
+    monkeypatch.setattr(spread, '_writer', writer)
+    monkeypatch.setattr(spread, 'is_configured', lambda: True)
+    monkeypatch.setattr(spread, '_last_bcv', None)
+    monkeypatch.setattr(spread, '_last_p2p', None)
+    monkeypatch.setattr(spread, '_latest', None)
+    return writer
+
+
+def test_spread_is_computed_against_the_other_side(writer):
+    spread.on_p2p_price('USDT', 'VES', 400.0)
+    assert writer.rows == []
+
+    spread.on_bcv_rate('Jueves, 15 Enero 2026', '320,00')
+    assert len(writer.rows) == 1
+    assert writer.rows[0]['spread'] == 80.0
+    assert writer.rows[0]['spread_pct'] == 25.0
+    assert spread.get_latest_spread()['bcv_date'] == 'Jueves, 15 Enero 2026'
+
+
+def test_same_bcv_rate_adds_no_row(writer):
+    spread.on_p2p_price('USDT', 'VES', 400.0)
+    spread.on_bcv_rate('Jueves, 15 Enero 2026', '320,00')
+    spread.on_bcv_rate('Jueves, 15 Enero 2026', '320,00')
+    assert len(writer.rows) == 1
+
+    spread.on_bcv_rate('Viernes, 16 Enero 2026', '321,00')
+    assert len(writer.rows) == 2
+
+
+def test_other_pairs_are_ignored(writer):
+    spread.on_bcv_rate('Jueves, 15 Enero 2026', '320,00')
+    spread.on_p2p_price('USDT', 'COP', 4000.0)
+    assert writer.rows == []
+
+
+def test_seeding_keeps_values_seen_meanwhile(writer, monkeypatch):
+    monkeypatch.setattr(spread, '_latest_bcv_from_history', lambda: ('Miércoles, 14 Enero 2026', 319.0))
+    monkeypatch.setattr(spread, '_latest_p2p_from_history', lambda: 390.0)
+    spread.on_p2p_price('USDT', 'VES', 400.0)
+
+    spread.seed_from_history()
+    spread.on_bcv_rate('Jueves, 15 Enero 2026', '320,00')
+    assert writer.rows[-1]['p2p_price'] == 400.0
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    """Scrapes return whatever rates are put in the returned list's last item"""
+    pages = []
+    seen = []
+
+    async def fetch_homepage():
+        return b''
+
+    monkeypatch.setattr(bcv_scraper, '_cache', TTLCache(ttl_seconds=60))
+    monkeypatch.setattr(bcv_scraper, '_fetch_homepage', fetch_homepage)
+    monkeypatch.setattr(bcv_scraper, '_parse_rates', lambda content: dict(pages[-1]))
+    monkeypatch.setattr(bcv_scraper, 'save_rate_to_history', lambda *args: None)
+    monkeypatch.setattr(bcv_scraper, 'publish_rates', lambda rates: None)
+    monkeypatch.setattr(bcv_scraper, 'on_bcv_rate', lambda date, usd: seen.append((date, usd)))
+    return pages, seen
+
+
+def test_scraper_reports_each_bcv_date_to_the_spread_once(scraper):
+    pages, seen = scraper
+    rates = {'USD': '320,00', 'EUR': '370,00', 'date': 'Jueves, 15 Enero 2026'}
+
+    pages.append(rates)
+    for _ in range(3):
+        asyncio.run(bcv_scraper.scrape_exchange_rates_async(max_age=0))
+    assert seen == [('Jueves, 15 Enero 2026', '320,00')]
+
+    pages.append({**rates, 'USD': '321,00', 'date': 'Viernes, 16 Enero 2026'})
+    asyncio.run(bcv_scraper.scrape_exchange_rates_async(max_age=0))
+    assert seen[-1] == ('Viernes, 16 Enero 2026', '321,00')
@@ -0,0 +1,120 @@
+import json
+import pytest
+from flask import Flask
+from app import tracing
+from app.tracing import span
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+def traceparent(flags):
+    return {'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-{flags}'}
+
+
+def test_traceparent_is_parsed_and_invalid_ones_ignored():
+    assert tracing._parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01') == (TRACE_ID, PARENT_ID, True)
+    assert tracing._parse_traceparent(f'00-{TRACE_ID.upper()}-{PARENT_ID}-00') == (TRACE_ID, PARENT_ID, False)
+    assert tracing._parse_traceparent(None) is None
+    assert tracing._parse_traceparent(f'ff-{TRACE_ID}-{PARENT_ID}-01') is None
+    assert tracing._parse_traceparent(f'00-{"0" * 32}-{PARENT_ID}-01') is None
+    assert tracing._parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}') is None
+
+
+def test_forced_samples_are_capped_per_minute():
+    limit = tracing._ForcedSampleLimit(2)
+    assert [limit.allow() for _ in range(3)] == [True, True, False]
+
+    # The count starts over in the next one-minute window
+    limit._window -= 1
+    assert limit.allow()
+
+
+def test_span_outside_a_sampled_request_is_a_no_op():
+    with span('idle', key='value') as current:
+        current.set('more', 1)
+    assert current is tracing._NOOP_SPAN
+
+
+class Collector:
+    def __init__(self):
+        self.spans = []
+
+    def add(self, finished):
+        self.spans.append(finished)
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Finished spans, as handed to the export queue"""
+    collector = Collector()
+    monkeypatch.setattr(tracing, '_writer', collector)
+    monkeypatch.setattr(tracing, 'TRACE_SAMPLE_RATE', 0)
+    monkeypatch.setattr(tracing, '_forced_samples', tracing._ForcedSampleLimit(2))
+    return collector.spans
+
+
+@pytest.fixture
+def client(spans):
+    app = Flask(__name__)
+    tracing.init_app(app)
+
+    @app.route('/work')
+    def work():
+        with span('outer'):
+            with span('inner', page=1):
+                pass
+        return 'ok'
+
+    return app.test_client()
+
+
+def test_sampled_parent_is_continued(client, spans):
+    response = client.get('/work', headers=traceparent('01'))
+    assert response.headers['X-Trace-Id'] == TRACE_ID
+
+    by_name = {finished['name']: finished for finished in spans}
+    assert set(by_name) == {'http.request', 'outer', 'inner'}
+    assert all(finished['trace_id'] == TRACE_ID for finished in spans)
+    assert by_name['http.request']['parent_id'] == PARENT_ID
+    assert by_name['outer']['parent_id'] == by_name['http.request']['span_id']
+    assert by_name['inner']['parent_id'] == by_name['outer']['span_id']
+    assert by_name['inner']['attributes'] == {'page': 1}
+    assert by_name['http.request']['attributes']['http.status_code'] == 200
+    assert by_name['http.request']['attributes']['http.route'] == 'work'
+
+
+def test_unsampled_requests_are_not_traced(client, spans):
+    assert 'X-Trace-Id' not in client.get('/work').headers
+    assert 'X-Trace-Id' not in client.get('/work', headers=traceparent('00')).headers
+    assert spans == []
+
+
+def test_clients_cannot_force_more_than_the_cap(client):
+    traced = ['X-Trace-Id' in client.get('/work', headers=traceparent('01')).headers for _ in range(3)]
+    assert traced == [True, True, False]
+
+
+def test_sample_rate_starts_new_traces(client, spans, monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_SAMPLE_RATE', 1)
+    trace_id = client.get('/work').headers['X-Trace-Id']
+    assert len(trace_id) == 32 and trace_id != TRACE_ID
+
+    root = next(finished for finished in spans if finished['name'] == 'http.request')
+    assert root['parent_id'] is None
+
+
+def test_file_exporter_appends_json_lines(tmp_path):
+    exporter = tracing.FileExporter(str(tmp_path / 'traces' / 'spans.jsonl'))
+    exporter.export([{'name': 'a'}])
+    exporter.export([{'name': 'b'}])
+
+    with open(exporter.path, encoding='utf-8') as f:
+        assert [json.loads(line)['name'] for line in f] == ['a', 'b']
+
+
+def test_exporter_spec_must_name_a_factory():
+    assert isinstance(tracing.load_exporter('stdout'), tracing.StdoutExporter)
+    assert isinstance(tracing.load_exporter('app.tracing:FileExporter'), tracing.FileExporter)
+    with pytest.raises(ValueError):
+        tracing.load_exporter('app.tracing')
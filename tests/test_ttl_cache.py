@@ -0,0 +1,69 @@
+import threading
+from app.metrics import CACHE_REQUESTS
+from app.services.ttl_cache import TTLCache
+
+
+def lookups(name):
+    """Lookups of one cache by result, from the rendered cache_requests_total counter"""
+    prefix = f'{CACHE_REQUESTS.name}{{cache="{name}",result="'
+    values = dict(line.rsplit(' ', 1) for line in CACHE_REQUESTS.render() if line.startswith(prefix))
+    return {labels[len(prefix):-len('"}')]: int(value) for labels, value in values.items()}
+
+
+def test_get_reports_freshness_and_counts_lookups():
+    cache = TTLCache(ttl_seconds=60, name='test_get')
+    assert cache.get('key') == (None, False)
+
+    cache.set('key', 'value')
+    assert cache.get('key') == ('value', True)
+    assert cache.get('key', max_age=0) == ('value', False)
+    assert lookups('test_get') == {'miss': 1, 'hit': 1, 'stale': 1}
+
+
+def test_peek_is_not_counted():
+    cache = TTLCache(ttl_seconds=60, name='test_peek')
+    assert cache.peek('key') is None
+
+    cache.seed('key', 'old', timestamp=0)
+    assert cache.peek('key') == 'old'
+    assert lookups('test_peek') == {}
+
+
+def test_snapshot_is_written_later_and_restored(tmp_path, monkeypatch):
+    monkeypatch.setenv('CACHE_SNAPSHOT_DIR', str(tmp_path))
+    cache = TTLCache(ttl_seconds=60, name='test_snapshot', persist=True)
+    cache.set(('USDT', 'VES'), 400.0)
+    cache.set('rates', {'USD': '320,00'})
+    assert not (tmp_path / 'test_snapshot.json').exists()
+    assert cache._dump_timer is not None
+
+    cache.dump()
+    assert cache._dump_timer is None
+    assert [path.name for path in tmp_path.iterdir()] == ['test_snapshot.json']
+
+    restored = TTLCache(ttl_seconds=60, name='test_snapshot')
+    assert restored.load() == 2
+    assert restored.peek(('USDT', 'VES')) == 400.0
+    assert restored.get('rates') == ({'USD': '320,00'}, True)
+
+
+def test_concurrent_sets_and_dumps_keep_the_snapshot_whole(tmp_path, monkeypatch):
+    monkeypatch.setenv('CACHE_SNAPSHOT_DIR', str(tmp_path))
+    cache = TTLCache(ttl_seconds=60, name='test_concurrent', persist=True, max_entries=50)
+
+    def work(worker):
+        for i in range(200):
+            cache.set((worker, i), i)
+            if i % 100 == 0:
+                cache.dump()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.dump()
+
+    restored = TTLCache(ttl_seconds=60, name='test_concurrent')
+    assert restored.load() == 50
+    assert [path.name for path in tmp_path.iterdir()] == ['test_concurrent.json']
@@ -0,0 +1,132 @@
+import hashlib
+import hmac
+import socket
+import pytest
+from flask import Flask
+from app.routes.webhooks import webhooks_bp
+from app.services import api_keys, webhooks
+from app.services.history_store import SQLiteHistoryStore
+
+
+def test_sign_is_hmac_sha256_of_timestamp_and_body():
+    body = b'{"event": "rate.published"}'
+    expected = hmac.new(b'secret', b'1768500000.' + body, hashlib.sha256).hexdigest()
+    assert webhooks.sign('secret', '1768500000', body) == expected
+
+
+def test_signature_depends_on_secret_timestamp_and_body():
+    body = b'{}'
+    signature = webhooks.sign('secret', '1768500000', body)
+    assert webhooks.sign('other', '1768500000', body) != signature
+    assert webhooks.sign('secret', '1768500001', body) != signature
+    assert webhooks.sign('secret', '1768500000', b'{ }') != signature
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    """Maps hostnames to the addresses getaddrinfo returns for them"""
+    addresses = {}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host not in addresses:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port)) for address in addresses[host]]
+
+    monkeypatch.setattr(webhooks.socket, 'getaddrinfo', getaddrinfo)
+    return addresses
+
+
+def test_public_url_is_accepted(resolve):
+    resolve['hooks.example.com'] = ['93.184.216.34']
+    assert webhooks.url_error('https://hooks.example.com/bcv') is None
+
+
+@pytest.mark.parametrize('address', [
+    '127.0.0.1',          # loopback
+    '10.0.0.5',           # private
+    '192.168.1.1',        # private
+    '169.254.169.254',    # link-local (cloud metadata)
+    '100.64.0.1',         # shared address space
+    '0.0.0.0',            # unspecified
+    '224.0.0.1',          # multicast
+    '::1',                # IPv6 loopback
+    'fe80::1%eth0',       # IPv6 link-local with zone
+    '::ffff:10.0.0.5'     # IPv4-mapped private
+])
+def test_non_public_addresses_are_rejected(resolve, address):
+    resolve['hooks.example.com'] = [address]
+    assert webhooks.url_error('https://hooks.example.com/bcv') == "'url' must resolve to a public address"
+
+
+def test_host_with_any_non_public_address_is_rejected(resolve):
+    resolve['hooks.example.com'] = ['93.184.216.34', '127.0.0.1']
+    assert webhooks.url_error('https://hooks.example.com/bcv') == "'url' must resolve to a public address"
+
+
+def test_invalid_and_unresolvable_urls(resolve):
+    assert webhooks.url_error('ftp://hooks.example.com/') == "'url' must be an http(s) URL"
+    assert webhooks.url_error('https:///path') == "'url' must be an http(s) URL"
+    assert webhooks.url_error(None) == "'url' must be an http(s) URL"
+    assert webhooks.url_error('https://missing.example.com/') == "'url' host could not be resolved"
+
+
+def test_pinned_request_keeps_host_and_server_name():
+    assert webhooks._pinned_request('https://hooks.example.com:8443/bcv?x=1', '93.184.216.34') == (
+        'https://93.184.216.34:8443/bcv?x=1', {'Host': 'hooks.example.com:8443'}, {'sni_hostname': 'hooks.example.com'}
+    )
+    assert webhooks._pinned_request('http://hooks.example.com/bcv', '2606:2800::1') == (
+        'http://[2606:2800::1]/bcv', {'Host': 'hooks.example.com'}, {}
+    )
+
+
+def test_delivery_is_blocked_when_host_now_resolves_inward(resolve, monkeypatch):
+    posted = []
+    monkeypatch.setattr(webhooks, '_client', type('Client', (), {'post': lambda self, *a, **k: posted.append(a)})())
+    resolve['hooks.example.com'] = ['127.0.0.1']
+
+    webhooks._deliver({'id': 's1', 'url': 'https://hooks.example.com/bcv', 'secret': 's'}, b'{}')
+    assert posted == []
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, resolve):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setattr(webhooks, 'get_store', lambda: store)
+    monkeypatch.setattr(api_keys, 'get_store', lambda: store)
+    monkeypatch.setenv('API_KEY', 'built-in-key')
+    api_keys._known.clear()
+    api_keys._unknown.clear()
+    resolve['hooks.example.com'] = ['93.184.216.34']
+
+    app = Flask(__name__)
+    app.register_blueprint(webhooks_bp)
+    yield app.test_client()
+    api_keys._known.clear()
+    api_keys._unknown.clear()
+
+
+def issued_key(name):
+    return {'X-API-Key': api_keys.create_key(name)['key']}
+
+
+def test_built_in_key_cannot_manage_webhooks(client):
+    headers = {'X-API-Key': 'built-in-key'}
+    assert client.post('/webhooks/', json={'url': 'https://hooks.example.com/bcv'}, headers=headers).status_code == 403
+    assert client.get('/webhooks/', headers=headers).status_code == 403
+    assert client.delete('/webhooks/abc', headers=headers).status_code == 403
+    assert client.get('/webhooks/').status_code == 401
+
+
+def test_subscriptions_are_only_visible_to_the_key_that_created_them(client):
+    billing, other = issued_key('billing'), issued_key('other')
+
+    created = client.post('/webhooks/', json={'url': 'https://hooks.example.com/bcv'}, headers=billing)
+    assert created.status_code == 201
+    subscription_id = created.get_json()['data']['id']
+
+    assert [s['id'] for s in client.get('/webhooks/', headers=billing).get_json()['data']] == [subscription_id]
+    assert client.get('/webhooks/', headers=other).get_json()['data'] == []
+
+    assert client.delete(f'/webhooks/{subscription_id}', headers=other).status_code == 404
+    assert client.delete(f'/webhooks/{subscription_id}', headers=billing).status_code == 200
+    assert client.get('/webhooks/', headers=billing).get_json()['data'] == []